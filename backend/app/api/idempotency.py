@@ -0,0 +1,41 @@
+from typing import Any, Callable
+
+from fastapi import Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services import idempotency
+
+
+def idempotency_key_header(
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+) -> str | None:
+    return idempotency_key
+
+
+def run_idempotent(key: str | None, scope: str, payload: Any, handler: Callable[[], Any]) -> Any:
+    """Run `handler` at most once per (scope, Idempotency-Key).
+
+    Without a key the handler simply runs. A replay with the same payload gets
+    the stored response (marked with Idempotent-Replayed); a different payload
+    is rejected with 422 and a concurrent duplicate with 409.
+    """
+    if not key:
+        return handler()
+    req_hash = idempotency.request_hash(payload)
+    try:
+        stored = idempotency.claim(scope, key, req_hash)
+    except idempotency.IdempotencyMismatch:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    except idempotency.IdempotencyInProgress:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    if stored is not None:
+        return JSONResponse(stored.body, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"})
+
+    try:
+        result = handler()
+    except BaseException:
+        idempotency.release(scope, key)
+        raise
+    idempotency.complete(scope, key, status_code=200, body=jsonable_encoder(result))
+    return result
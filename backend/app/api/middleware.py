@@ -0,0 +1,97 @@
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.db import query_stats
+
+logger = logging.getLogger("app.slow_requests")
+
+
+def route_label(scope: Scope) -> str:
+    """Templated route (e.g. "GET /events/{event_id}") so metrics don't explode per id."""
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+class QueryStatsMiddleware:
+    """Counts SQL statements per request and reports them via Server-Timing.
+
+    Pure ASGI (not BaseHTTPMiddleware) so streaming responses pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.query_stats_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        slow_ms = settings.slow_request_ms
+        token = query_stats.begin(keep_statements=slow_ms > 0)
+        stats = query_stats.current()
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - started) * 1000.0
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", app;dur={app_ms:.2f}',
+                )
+                headers.append("X-DB-Query-Count", str(stats.count))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.end(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            label = route_label(scope)
+            query_stats.registry.observe(label, stats)
+            metrics.DB_QUERIES_PER_REQUEST.observe(stats.count, route=label)
+            if slow_ms > 0 and elapsed_ms >= slow_ms:
+                lines = "\n".join(f"  {ms:8.2f}ms  {sql}" for ms, sql in (stats.statements or []))
+                logger.warning(
+                    "Slow request %s took %.1fms (%d queries, %.1fms in DB)\n%s",
+                    label, elapsed_ms, stats.count, stats.total_ms, lines,
+                )
+
+
+class MetricsMiddleware:
+    """Records per-route latency histograms for /metrics."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope.get("method", ""),
+                route=route,
+                status=str(status["code"]),
+            )
@@ -1,27 +1,95 @@
-from fastapi import APIRouter, Depends, Query
+import base64
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 
 from app.api.deps import db_session
+from app.db import query_stats
 from app.db.models.email_log import EmailLog
-from app.schemas.email_log import EmailLogRead
+from app.integrations.email.bodies import load_body
+from app.schemas.email_log import EmailLogDetail, EmailLogRead
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
+def _encode_cursor(created_at: datetime, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{log_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# List projection: everything but the body reference, so pages never touch email_body
+_LIST_COLUMNS = (
+    EmailLog.id,
+    EmailLog.to_email,
+    EmailLog.subject,
+    EmailLog.template_name,
+    EmailLog.status,
+    EmailLog.created_at,
+    EmailLog.event_id,
+    EmailLog.ticket_id,
+    EmailLog.purchase_id,
+    EmailLog.context,
+)
+
+
 @router.get("/email_logs", response_model=list[EmailLogRead])
 def list_email_logs(
+    response: Response,
     db: Session = Depends(db_session),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    event_id: int | None = None,
+    ticket_id: int | None = None,
+    purchase_id: int | None = None,
+    status: str | None = Query(None, description="sent|failed"),
+    to_email: str | None = Query(None, description="Exact recipient address"),
+    template_name: str | None = None,
 ):
-    rows = (
-        db.query(EmailLog)
-        .order_by(EmailLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-        .all()
-    )
-    # Include text_body for preview; omit html_body for size/perf
+    """Newest first, keyset-paginated on (created_at, id); every filter has a matching index."""
+    q = select(*_LIST_COLUMNS)
+    for column, value in (
+        (EmailLog.event_id, event_id),
+        (EmailLog.ticket_id, ticket_id),
+        (EmailLog.purchase_id, purchase_id),
+        (EmailLog.status, status),
+        (EmailLog.to_email, to_email),
+        (EmailLog.template_name, template_name),
+    ):
+        if value is not None:
+            q = q.where(column == value)
+    if cursor:
+        q = q.where(tuple_(EmailLog.created_at, EmailLog.id) < tuple_(*_decode_cursor(cursor)))
+    rows = db.execute(q.order_by(EmailLog.created_at.desc(), EmailLog.id.desc()).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
     return rows
 
+
+@router.get("/email_logs/{log_id}", response_model=EmailLogDetail)
+def get_email_log(log_id: int, db: Session = Depends(db_session)):
+    row = db.query(EmailLog).filter(EmailLog.id == log_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Email log not found")
+    text_body, html_body = load_body(db, row.body_hash)
+    return EmailLogDetail.model_validate(row).model_copy(update={"text_body": text_body, "html_body": html_body})
+
+
+@router.get("/query_stats")
+def get_query_stats(reset: bool = Query(False, description="Clear aggregates after reading")):
+    """Per-route SQL counts and DB time collected by QueryStatsMiddleware."""
+    items = query_stats.registry.snapshot()
+    if reset:
+        query_stats.registry.reset()
+    return items
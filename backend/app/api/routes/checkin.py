@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import db_session
-from app.schemas.checkin import CheckinRequest, CheckinResponse
+from app.schemas.checkin import CheckinRequest, CheckinResponse, CheckinVerifyRequest, CheckinVerifyResponse
 from app.services.checkin import check_in_by_code
+from app.services.qr_signing import verify
 
 router = APIRouter(tags=["checkin"])
 
@@ -11,18 +12,34 @@ router = APIRouter(tags=["checkin"])
 @router.post("/checkin", response_model=CheckinResponse)
 def checkin(req: CheckinRequest, db: Session = Depends(db_session)):
     try:
-        t = check_in_by_code(db, event_id=req.event_id, code=req.code)
+        t = check_in_by_code(db, event_id=req.event_id, code=req.code, gate=req.gate, device=req.device)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
 
     return CheckinResponse(
-        ticket_id=t.id,
+        ticket_id=t.ticket_id,
         event_id=t.event_id,
-        short_code=t.short_code or "",
-        previous_status=getattr(t, "previous_status", "unknown"),
+        short_code=t.short_code,
+        previous_status=t.previous_status,
         new_status=t.status,
         checked_in_at=t.checked_in_at,
     )
 
+
+@router.post("/checkin/verify", response_model=CheckinVerifyResponse)
+def checkin_verify(req: CheckinVerifyRequest):
+    """Check a signed QR payload's signature and event without touching the database."""
+    try:
+        signed = verify(req.code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if signed.event_id != req.event_id:
+        raise HTTPException(status_code=409, detail="Ticket is for a different event")
+    return CheckinVerifyResponse(
+        event_id=signed.event_id,
+        ticket_id=signed.ticket_id,
+        short_code=signed.code,
+        ticket_type_id=signed.ticket_type_id,
+    )
@@ -8,6 +8,7 @@ from app.db.models.purchase import Purchase
 from app.db.models.ticket import Ticket
 from app.db.models.event import Event
 from app.db.models.ticket_type import TicketType
+from app.services.contact_search import list_contacts_page
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
@@ -18,100 +19,27 @@ def list_contacts(
     db: Session = Depends(db_session),
     search: str | None = Query(default=None),
     roles: str | None = Query(default=None, description="Comma-separated: buyer,holder"),
+    sort: str | None = Query(default=None, pattern="^(id|last_activity|tickets_held)$"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ):
-    # Base query
-    q = db.query(Contact)
-    if search:
-        s = f"%{search.strip()}%"
-        q = q.filter(
-            func.lower(Contact.email).like(func.lower(s))
-            | func.lower(Contact.first_name).like(func.lower(s))
-            | func.lower(Contact.last_name).like(func.lower(s))
-            | func.lower(Contact.phone).like(func.lower(s))
-        )
-
-    # Fetch page of contacts
-    contacts = q.order_by(Contact.id.asc()).limit(limit).offset(offset).all()
-    ids = [c.id for c in contacts]
-    if not ids:
-        return []
-
-    # events purchased per contact (count distinct event_id via purchase -> tickets)
-    ev_counts = dict(
-        db.execute(
-            select(Purchase.buyer_contact_id, func.count(func.distinct(Ticket.event_id)))
-            .join(Ticket, Ticket.purchase_id == Purchase.id)
-            .where(Purchase.buyer_contact_id.in_(ids))
-            .group_by(Purchase.buyer_contact_id)
-        ).all()
-    )
-    # tickets held per contact
-    tix_counts = dict(
-        db.execute(
-            select(Ticket.holder_contact_id, func.count(Ticket.id))
-            .where(Ticket.holder_contact_id.in_(ids))
-            .group_by(Ticket.holder_contact_id)
-        ).all()
-    )
-    # last activity per contact (max of purchase.created_at, ticket.created_at, ticket.checked_in_at, ticket.delivered_at)
-    last_purchase = dict(
-        db.execute(
-            select(Purchase.buyer_contact_id, func.max(Purchase.created_at))
-            .where(Purchase.buyer_contact_id.in_(ids))
-            .group_by(Purchase.buyer_contact_id)
-        ).all()
-    )
-    last_ticket = dict(
-        db.execute(
-            select(
-                Ticket.holder_contact_id,
-                func.max(func.greatest(Ticket.created_at, Ticket.checked_in_at, Ticket.delivered_at)),
-            )
-            .where(Ticket.holder_contact_id.in_(ids))
-            .group_by(Ticket.holder_contact_id)
-        ).all()
-    )
-
     buyer_filter = holder_filter = False
     if roles:
         parts = [r.strip().lower() for r in roles.split(",") if r.strip()]
         buyer_filter = "buyer" in parts
         holder_filter = "holder" in parts
-
-    items = []
-    for c in contacts:
-        evs = int(ev_counts.get(c.id, 0) or 0)
-        tix = int(tix_counts.get(c.id, 0) or 0)
-        if roles:
-            show = False
-            if buyer_filter and evs > 0:
-                show = True
-            if holder_filter and tix > 0:
-                show = True
-            if not show:
-                continue
-        lp = last_purchase.get(c.id)
-        lt = last_ticket.get(c.id)
-        last_activity = None
-        if lp and lt:
-            last_activity = max(lp, lt)
-        else:
-            last_activity = lp or lt
-        items.append(
-            {
-                "id": c.id,
-                "first_name": c.first_name,
-                "last_name": c.last_name,
-                "email": c.email,
-                "phone": c.phone,
-                "events_purchased": evs,
-                "tickets_held": tix,
-                "last_activity": last_activity.isoformat() if last_activity else None,
-            }
-        )
-    return items
+        if not (buyer_filter or holder_filter):
+            return []
+
+    return list_contacts_page(
+        db,
+        search=search,
+        buyer_only=buyer_filter,
+        holder_only=holder_filter,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
 
 
 @router.get("/{contact_id}")
@@ -204,6 +132,7 @@ def list_holder_tickets(contact_id: int, db: Session = Depends(db_session)):
                 Ticket.id,
                 Ticket.ticket_number,
                 Ticket.short_code,
+                Ticket.uuid.label("ticket_uuid"),
                 Ticket.payment_status,
                 Ticket.status,
                 Ticket.checked_in_at,
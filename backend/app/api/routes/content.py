@@ -4,37 +4,29 @@ from datetime import datetime, timezone, timedelta
 import os
 
 from app.api.deps import db_session
+from app.api.idempotency import idempotency_key_header, run_idempotent
+from app.core import metrics
 from app.db.models.event import Event
 from app.db.models.ticket import Ticket
 from app.db.models.ticket_type import TicketType
-from app.db.models.customer import Customer
 from app.schemas.content import CheckoutRequest, CheckoutResponse, MultiCheckoutRequest, MultiCheckoutResponse, ReserveConfirmRequest, ReserveConfirmResponse
 from app.utils.codes import generate_short_code
-from sqlalchemy import select
-from app.db.models.contact import Contact
 from app.db.models.purchase import Purchase
 from app.services.allocator import allocate_next_ticket_number
+from app.services.holds import format_expiry, hold_expiry
+from app.services.identity import PersonInput, resolve_identities, resolve_identity
+from app.services.qr_signing import qr_payload
 from app.services.emailer import (
     format_event_datetime,
     build_ticket_lines,
     send_reservation_confirmation_buyer,
     send_reserved_assignment_holder,
-    send_ticket_email_active,
+    send_tickets_email,
 )
 
 router = APIRouter(prefix="/content", tags=["content"])
 
 
-def find_or_create_customer(db: Session, email: str, first_name: str | None, last_name: str | None, phone: str | None) -> Customer:
-    existing = db.execute(select(Customer).where(Customer.email == email)).scalar_one_or_none()
-    if existing:
-        return existing
-    c = Customer(email=email, first_name=first_name, last_name=last_name, phone=phone)
-    db.add(c)
-    db.flush()
-    return c
-
-
 @router.post("/checkout", response_model=CheckoutResponse)
 def content_checkout(req: CheckoutRequest, db: Session = Depends(db_session)):
     ev = db.get(Event, req.event_id)
@@ -71,7 +63,7 @@ def content_checkout(req: CheckoutRequest, db: Session = Depends(db_session)):
         db.flush()
 
     # Attach customer
-    cust = find_or_create_customer(
+    identity = resolve_identity(
         db,
         email=req.customer.email,
         first_name=req.customer.first_name,
@@ -84,16 +76,18 @@ def content_checkout(req: CheckoutRequest, db: Session = Depends(db_session)):
 
     # Assign ticket
     now = datetime.now(timezone.utc)
-    ticket.customer_id = cust.id
+    ticket.customer_id = identity.customer_id
     ticket.ticket_type_id = req.ticket_type_id
     ticket.short_code = code
     ticket.status = "assigned"
     ticket.assigned_at = now
     ticket.payment_status = "unpaid"
+    ticket.hold_expires_at = hold_expiry(now)
     ticket.delivery_status = "not_sent"
     db.add(ticket)
     db.commit()
     db.refresh(ticket)
+    metrics.TICKET_RESERVATIONS.inc(ticket_type_id=req.ticket_type_id)
 
     return CheckoutResponse(
         ticket_id=ticket.id,
@@ -105,37 +99,38 @@ def content_checkout(req: CheckoutRequest, db: Session = Depends(db_session)):
 
 
 @router.post("/checkout_multi", response_model=MultiCheckoutResponse)
-def content_checkout_multi(req: MultiCheckoutRequest, db: Session = Depends(db_session)):
+def content_checkout_multi(
+    req: MultiCheckoutRequest,
+    db: Session = Depends(db_session),
+    idempotency_key: str | None = Depends(idempotency_key_header),
+):
+    return run_idempotent(
+        idempotency_key, "content.checkout_multi", req.model_dump(mode="json"), lambda: _checkout_multi(req, db)
+    )
+
+
+def _checkout_multi(req: MultiCheckoutRequest, db: Session) -> MultiCheckoutResponse:
     ev = db.get(Event, req.event_id)
     if not ev:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    # Buyer contact + customer
-    buyer_contact = db.execute(select(Contact).where(Contact.email == req.buyer.email)).scalar_one_or_none()
-    if not buyer_contact:
-        buyer_contact = Contact(
-            email=req.buyer.email,
-            first_name=req.buyer.first_name,
-            last_name=req.buyer.last_name,
-            phone=req.buyer.phone,
-        )
-        db.add(buyer_contact)
-        db.flush()
-    buyer_customer = find_or_create_customer(
-        db,
-        email=req.buyer.email,
-        first_name=req.buyer.first_name,
-        last_name=req.buyer.last_name,
-        phone=req.buyer.phone,
-    )
+    # Buyer and every assignee resolved up front: two upserts for the whole order
+    people = [PersonInput(email=req.buyer.email, first_name=req.buyer.first_name, last_name=req.buyer.last_name, phone=req.buyer.phone)]
+    for item in req.items:
+        for a in item.assignees or []:
+            people.append(PersonInput(email=a.email, first_name=a.first_name, last_name=a.last_name))
+    identities = resolve_identities(db, people)
+    buyer = identities[req.buyer.email]
 
     # Create purchase
     from uuid import uuid4
-    purchase = Purchase(buyer_contact_id=buyer_contact.id, uuid=str(uuid4()))
+    purchase = Purchase(buyer_contact_id=buyer.contact_id, uuid=str(uuid4()))
     db.add(purchase)
     db.flush()
 
     created_ticket_ids: list[int] = []
+    created_per_type: dict[int, int] = {}
+    to_deliver: dict[str, list[Ticket]] = {}
 
     # For each item, create tickets for assignees or, if omitted, create qty tickets owned by buyer (unassigned)
     for item in req.items:
@@ -178,12 +173,7 @@ def content_checkout_multi(req: MultiCheckoutRequest, db: Session = Depends(db_s
                 db.flush()
 
             # Holder customer + contact
-            holder_cust = find_or_create_customer(db, email=a.email, first_name=a.first_name, last_name=a.last_name, phone=None)
-            holder_contact = db.execute(select(Contact).where(Contact.email == a.email)).scalar_one_or_none()
-            if not holder_contact:
-                holder_contact = Contact(email=a.email, first_name=a.first_name, last_name=a.last_name)
-                db.add(holder_contact)
-                db.flush()
+            holder = identities[a.email]
 
             # Assign code and number
             code = generate_short_code(db, req.event_id)
@@ -192,25 +182,27 @@ def content_checkout_multi(req: MultiCheckoutRequest, db: Session = Depends(db_s
             except Exception:
                 ticket.ticket_number = None
 
-            ticket.customer_id = holder_cust.id
-            ticket.holder_contact_id = holder_contact.id
+            ticket.customer_id = holder.customer_id
+            ticket.holder_contact_id = holder.contact_id
             ticket.ticket_type_id = item.ticket_type_id
             ticket.short_code = code
             ticket.status = "assigned"
             ticket.assigned_at = datetime.now(timezone.utc)
             ticket.payment_status = "unpaid" if (req.pay_later is None or req.pay_later) else "paid"
+            ticket.hold_expires_at = hold_expiry() if ticket.payment_status == "unpaid" else None
             ticket.purchase_id = purchase.id
             ticket.delivery_status = "not_sent"
             db.add(ticket)
             db.flush()
             created_ticket_ids.append(ticket.id)
+            created_per_type[item.ticket_type_id] = created_per_type.get(item.ticket_type_id, 0) + 1
 
             # Email behavior: pay_later -> reserved assignment; buy_now -> ticket email
             try:
                 event_dt = format_event_datetime(ev.starts_at, ev.ends_at)
                 if req.pay_later is None or req.pay_later:
                     buyer_name = (req.buyer.first_name or '') + ((' ' + req.buyer.last_name) if req.buyer.last_name else '')
-                    expires = (datetime.now(timezone.utc) + timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
+                    expires = format_expiry(ticket.hold_expires_at)
                     app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
                     view_link = f"{app_origin2}/ticket?ref={ticket.uuid}"
                     line = f"1 x {tt.name} — {tt.price_baht or 0} THB each"
@@ -229,18 +221,7 @@ def content_checkout_multi(req: MultiCheckoutRequest, db: Session = Depends(db_s
                         related={'event_id': ev.id, 'ticket_id': ticket.id, 'purchase_id': purchase.id},
                     )
                 else:
-                    ok = send_ticket_email_active(
-                        db,
-                        to_email=a.email,
-                        event_title=ev.title,
-                        event_when_iso=ev.starts_at.isoformat() if ev and ev.starts_at else "",
-                        short_code=ticket.short_code or "",
-                        ticket_number=ticket.ticket_number,
-                        related={'event_id': ev.id, 'ticket_id': ticket.id, 'purchase_id': purchase.id},
-                    )
-                    if ok:
-                        ticket.delivery_status = "sent"
-                        db.add(ticket)
+                    to_deliver.setdefault(a.email, []).append(ticket)
             except Exception as _e:
                 print('[email] holder email send failed', _e)
 
@@ -281,38 +262,46 @@ def content_checkout_multi(req: MultiCheckoutRequest, db: Session = Depends(db_s
                     ticket.ticket_number = None
 
                 # Mark owned by buyer; holder remains unassigned (null)
-                ticket.customer_id = buyer_customer.id
+                ticket.customer_id = buyer.customer_id
                 ticket.holder_contact_id = None
                 ticket.ticket_type_id = item.ticket_type_id
                 ticket.short_code = code2
                 ticket.status = "held"  # allocated; holder unassigned
                 ticket.assigned_at = datetime.now(timezone.utc)
                 ticket.payment_status = "unpaid" if (req.pay_later is None or req.pay_later) else "paid"
+                ticket.hold_expires_at = hold_expiry() if ticket.payment_status == "unpaid" else None
                 ticket.purchase_id = purchase.id
                 ticket.delivery_status = "not_sent"
                 db.add(ticket)
                 db.flush()
                 created_ticket_ids.append(ticket.id)
+                created_per_type[item.ticket_type_id] = created_per_type.get(item.ticket_type_id, 0) + 1
 
                 # Email buyer directly on buy_now (send ticket email)
-                try:
-                    if not (req.pay_later is None or req.pay_later):
-                        ok = send_ticket_email_active(
-                            db,
-                            to_email=req.buyer.email,
-                            event_title=ev.title,
-                            event_when_iso=ev.starts_at.isoformat() if ev and ev.starts_at else "",
-                            short_code=ticket.short_code or "",
-                            ticket_number=ticket.ticket_number,
-                            related={'event_id': ev.id, 'ticket_id': ticket.id, 'purchase_id': purchase.id},
-                        )
-                        if ok:
-                            ticket.delivery_status = "sent"
-                            db.add(ticket)
-                except Exception as _e:
-                    print('[email] buyer ticket send failed', _e)
+                if not (req.pay_later is None or req.pay_later):
+                    to_deliver.setdefault(req.buyer.email, []).append(ticket)
+
+    # buy_now: one ticket email per recipient for the whole order
+    for to_email, tickets in to_deliver.items():
+        try:
+            ok = send_tickets_email(
+                db,
+                to_email=to_email,
+                event_title=ev.title,
+                event_when_iso=ev.starts_at.isoformat() if ev and ev.starts_at else "",
+                tickets=[{'id': t.id, 'short_code': t.short_code or "", 'ticket_number': t.ticket_number, 'token': t.uuid, 'qr': qr_payload(t)} for t in tickets],
+                related={'event_id': ev.id, 'purchase_id': purchase.id},
+            )
+            if ok:
+                for t in tickets:
+                    t.delivery_status = "sent"
+        except Exception as _e:
+            print('[email] ticket send failed', _e)
 
     db.commit()
+    sold_metric = metrics.TICKET_RESERVATIONS if (req.pay_later is None or req.pay_later) else metrics.TICKET_CHECKOUTS
+    for tt_id, n in created_per_type.items():
+        sold_metric.inc(n, ticket_type_id=tt_id)
     return MultiCheckoutResponse(purchase_id=purchase.id, ticket_ids=created_ticket_ids)
 
 
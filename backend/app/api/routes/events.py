@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Literal
 
 from app.api.deps import db_session
+from app.core.cache import LocalCache, cache, event_key, event_public_key, promotion_key, public_page_key, ticket_types_key
 from app.db.models.event import Event
 from app.db.models.ticket import Ticket
 from app.schemas.event import EventCreate, EventRead, EventUpdate
+from app.schemas.event_page import PublicEventPage
 import uuid
-from app.schemas.ticket import TicketRead, AttendeeRead
+from app.schemas.ticket import TicketRead, AttendeeRead, TicketQrRead
 from app.schemas.ticket_type import TicketTypeRead, TicketTypeCreate, TicketTypeUpdate
 from app.db.models.event_promotion import EventPromotion
 from app.schemas.event_promotion import EventPromotionRead, EventPromotionUpsert
@@ -18,9 +22,67 @@ from app.db.models.purchase import Purchase
 from sqlalchemy import func, case
 from app.db.models.purchase import Purchase
 from sqlalchemy import select, func
+from app.core.broadcast import SSE_KEEPALIVE, sse_event
+from app.db.session import SessionLocal
+from app.services.availability import remaining_by_type
+from app.services.availability_feed import feed as availability_feed
+from app.services.jobs import enqueue
+from app.services.qr import QrBusy, renderer as qr_renderer
+from app.services.print_sheets import stream_sheet
+from app.services.qr_signing import qr_payload
+from app.services.seeding import seed_event_tickets as seed_tickets
+from app.schemas.job import JobRead
+import base64
+import gzip
+import hashlib
+import json
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+# The assembled public page embeds live availability, so it is only reused for a couple of seconds
+PUBLIC_PAGE_TTL_SECONDS = 2
+# gzip bodies keyed by ETag; identical pages are compressed once per worker
+_public_page_gzip = LocalCache(max_entries=1024)
+
+
+def _invalidate_event(ev: Event, *keys: str) -> None:
+    public_keys = [event_public_key(ev.public_id), public_page_key(ev.public_id)] if ev.public_id else []
+    cache.delete(*keys, *public_keys)
+
+
+def _public_event(db: Session, public_id: str) -> dict | None:
+    def load():
+        ev = db.query(Event).filter(Event.public_id == public_id).first()
+        return EventRead.model_validate(ev).model_dump(mode="json") if ev else None
+
+    return cache.get_or_load(event_public_key(public_id), load)
+
+
+def _ticket_types(db: Session, event_id: int) -> list[dict] | None:
+    def load():
+        if not db.get(Event, event_id):
+            return None
+        items = db.query(TicketType).filter(TicketType.event_id == event_id).order_by(TicketType.id.asc()).all()
+        return [TicketTypeRead.model_validate(tt).model_dump(mode="json") for tt in items]
+
+    return cache.get_or_load(ticket_types_key(event_id), load)
+
+
+def _promotion(db: Session, event_id: int) -> dict | None:
+    def load():
+        if not db.get(Event, event_id):
+            return None
+        ep = db.query(EventPromotion).filter(EventPromotion.event_id == event_id).one_or_none()
+        content = ep.content if ep and ep.content else {}
+        return {
+            "event_id": event_id,
+            "description": content.get("description"),
+            "speakers": content.get("speakers"),
+            "audience": content.get("audience"),
+        }
+
+    return cache.get_or_load(promotion_key(event_id), load)
+
 
 @router.get("", response_model=list[EventRead])
 def list_events(
@@ -65,15 +127,21 @@ def create_event(payload: EventCreate, db: Session = Depends(db_session)):
 
 @router.get("/{event_id}", response_model=EventRead)
 def get_event(event_id: int, db: Session = Depends(db_session)):
-    ev = db.get(Event, event_id)
-    if not ev:
+    def load():
+        ev = db.get(Event, event_id)
+        if not ev:
+            return None
+        if not ev.public_id:
+            ev.public_id = str(uuid.uuid4())
+            db.add(ev)
+            db.commit()
+            db.refresh(ev)
+        return EventRead.model_validate(ev).model_dump(mode="json")
+
+    data = cache.get_or_load(event_key(event_id), load)
+    if data is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    if not ev.public_id:
-        ev.public_id = str(uuid.uuid4())
-        db.add(ev)
-        db.commit()
-        db.refresh(ev)
-    return ev
+    return data
 
 
 @router.patch("/{event_id}", response_model=EventRead)
@@ -112,21 +180,22 @@ def update_event(event_id: int, payload: EventUpdate, db: Session = Depends(db_s
     db.add(ev)
     db.commit()
     db.refresh(ev)
+    _invalidate_event(ev, event_key(ev.id))
     return ev
 
 
 @router.post("/{event_id}/seed")
-def seed_event_tickets(event_id: int, db: Session = Depends(db_session)):
-    ev = db.get(Event, event_id)
-    if not ev:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    existing = db.query(Ticket).filter(Ticket.event_id == event_id).count()
-    to_create = max(ev.capacity - existing, 0)
-    if to_create > 0:
-        db.add_all([Ticket(event_id=event_id) for _ in range(to_create)])
-        db.commit()
-    return {"event_id": event_id, "capacity": ev.capacity, "existing": existing, "created": to_create}
+def seed_event_tickets(event_id: int, background: bool = False, db: Session = Depends(db_session)):
+    """Top up available tickets to capacity; `background=true` queues it as a job (202 + job)."""
+    if background:
+        if not db.get(Event, event_id):
+            raise HTTPException(status_code=404, detail="Event not found")
+        job = enqueue(db, "events.seed_tickets", {"event_id": event_id})
+        return JSONResponse(status_code=202, content=JobRead.model_validate(job).model_dump(mode="json"))
+    try:
+        return seed_tickets(db, event_id=event_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.get("/{event_id}/tickets", response_model=list[TicketRead])
@@ -237,10 +306,9 @@ def list_event_purchases(event_id: int, db: Session = Depends(db_session)):
 
 @router.get("/{event_id}/ticket_types", response_model=list[TicketTypeRead])
 def list_ticket_types(event_id: int, db: Session = Depends(db_session)):
-    ev = db.get(Event, event_id)
-    if not ev:
+    items = _ticket_types(db, event_id)
+    if items is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    items = db.query(TicketType).filter(TicketType.event_id == event_id).order_by(TicketType.id.asc()).all()
     return items
 
 
@@ -260,30 +328,174 @@ def create_ticket_type(event_id: int, payload: TicketTypeCreate, db: Session = D
     db.add(tt)
     db.commit()
     db.refresh(tt)
+    _invalidate_event(ev, ticket_types_key(event_id))
     return tt
 
 
 @router.get("/public/{public_id}", response_model=EventRead)
 def resolve_event(public_id: str, db: Session = Depends(db_session)):
-    ev = db.query(Event).filter(Event.public_id == public_id).first()
-    if not ev:
+    data = _public_event(db, public_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return ev
+    return data
+
+
+@router.get("/public/{public_id}/page", response_model=PublicEventPage)
+def public_event_page(public_id: str, request: Request, db: Session = Depends(db_session)):
+    """Everything the public event page needs in one response.
+
+    Event, ticket types and promotion come from the read-through cache; the only
+    SQL on a warm cache is one grouped count for remaining tickets, and the
+    assembled body is itself reused for PUBLIC_PAGE_TTL_SECONDS. Responses carry
+    an ETag (304 on If-None-Match) and are served pre-gzipped when accepted.
+    """
+    def build():
+        ev = _public_event(db, public_id)
+        if ev is None:
+            return None
+        types = [t for t in (_ticket_types(db, ev["id"]) or []) if t["active"]]
+        remaining = remaining_by_type(db, ev["id"], {t["id"]: t["max_quantity"] for t in types})
+        body = json.dumps(
+            {
+                "event": ev,
+                "ticket_types": [{**t, "remaining": remaining.get(t["id"])} for t in types],
+                "promotion": _promotion(db, ev["id"]),
+            },
+            separators=(",", ":"),
+        )
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+        return {"etag": etag, "body": body}
+
+    page = cache.get_or_load(public_page_key(public_id), build, ttl=PUBLIC_PAGE_TTL_SECONDS)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    etag = page["etag"]
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        gz = _public_page_gzip.get(etag, None)
+        if gz is None:
+            gz = gzip.compress(page["body"].encode("utf-8"), compresslevel=6)
+            _public_page_gzip.set(etag, gz, cache.ttl)
+        return Response(gz, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(page["body"], media_type="application/json", headers=headers)
+
+
+def _event_exists(event_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.get(Event, event_id) is not None
+
+
+@router.get("/{event_id}/availability/stream")
+async def availability_stream(event_id: int, request: Request):
+    """Server-Sent Events feed of remaining tickets per active type.
+
+    Sends a `snapshot` first, then `availability` events carrying only the
+    types whose remaining count changed, plus a keepalive comment every 15s.
+    No DB session is held for the life of the stream.
+    """
+    if not await run_in_threadpool(_event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    availability_feed.ensure_listening()
+
+    async def stream():
+        async with availability_feed.broadcaster.subscribe(event_id) as sub:
+            snapshot = await run_in_threadpool(availability_feed.snapshot, event_id)
+            yield sse_event("snapshot", {
+                "event_id": event_id,
+                "ticket_types": [{"id": tt, "remaining": n} for tt, n in snapshot.items()],
+            })
+            while not await request.is_disconnected():
+                msg = await sub.get(timeout=15)
+                if msg is None:
+                    yield SSE_KEEPALIVE
+                    continue
+                yield sse_event("availability", {
+                    "event_id": event_id,
+                    "ticket_types": [{"id": tt, "remaining": n} for tt, n in msg["changed"].items()],
+                    "removed": msg["removed"],
+                })
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _issued_codes(event_id: int) -> list[tuple[int, str | None, str, str]] | None:
+    with SessionLocal() as db:
+        if db.get(Event, event_id) is None:
+            return None
+        tickets = db.execute(
+            select(Ticket).where(Ticket.event_id == event_id, Ticket.short_code.is_not(None)).order_by(Ticket.id)
+        ).scalars()
+        return [(t.id, t.ticket_number, t.short_code, qr_payload(t)) for t in tickets]
+
+
+@router.get("/{event_id}/qr_codes", response_model=list[TicketQrRead])
+async def event_qr_codes(
+    event_id: int,
+    scale: int = Query(6, ge=1, le=40),
+    format: Literal["svg", "png"] = "png",
+):
+    """QR image for every ticket of the event that has a code, rendered in parallel across the QR process pool."""
+    rows = await run_in_threadpool(_issued_codes, event_id)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    try:
+        images = await qr_renderer.render_many([payload for *_, payload in rows], scale, format)
+    except QrBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return [
+        TicketQrRead(
+            ticket_id=tid,
+            ticket_number=number,
+            short_code=code,
+            content=img.decode("utf-8") if format == "svg" else base64.b64encode(img).decode("ascii"),
+        )
+        for (tid, number, code, _), img in zip(rows, images)
+    ]
+
+
+def _event_title(event_id: int) -> str | None:
+    with SessionLocal() as db:
+        ev = db.get(Event, event_id)
+        return (ev.title or "Event") if ev else None
+
+
+@router.get("/{event_id}/print_sheet")
+async def print_sheet(
+    event_id: int,
+    layout: Literal["tickets", "badges"] = "tickets",
+    ticket_type_ids: list[int] | None = Query(None),
+    statuses: list[Literal['available', 'held', 'assigned', 'delivered', 'checked_in', 'void']] | None = Query(None),
+    payment_statuses: list[Literal['unpaid', 'paid', 'waived', 'refunding', 'refunded', 'voiding', 'voided']] | None = Query(None),
+):
+    """Print-ready sheet (HTML of A4 SVG pages) for every coded ticket matching the filter, streamed page by page."""
+    title = await run_in_threadpool(_event_title, event_id)
+    if title is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    filters = {"event_id": event_id, "ticket_type_ids": ticket_type_ids, "statuses": statuses, "payment_statuses": payment_statuses}
+    return StreamingResponse(
+        stream_sheet(title, filters, layout),
+        media_type="text/html; charset=utf-8",
+        headers={"Content-Disposition": f'inline; filename="event-{event_id}-{layout}.html"'},
+    )
 
 
 @router.get("/{event_id}/promotion", response_model=EventPromotionRead)
 def get_event_promotion(event_id: int, db: Session = Depends(db_session)):
-    ev = db.get(Event, event_id)
-    if not ev:
+    data = _promotion(db, event_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    ep = db.query(EventPromotion).filter(EventPromotion.event_id == event_id).one_or_none()
-    content = ep.content if ep and ep.content else {}
-    return {
-        "event_id": event_id,
-        "description": content.get("description"),
-        "speakers": content.get("speakers"),
-        "audience": content.get("audience"),
-    }
+    return data
 
 
 @router.put("/{event_id}/promotion", response_model=EventPromotionRead)
@@ -304,6 +516,7 @@ def upsert_event_promotion(event_id: int, payload: EventPromotionUpsert, db: Ses
         ep.content = content
         db.add(ep)
     db.commit()
+    _invalidate_event(ev, promotion_key(event_id))
     return {
         "event_id": event_id,
         "description": content.get("description"),
@@ -330,4 +543,8 @@ def update_ticket_type(ticket_type_id: int, payload: TicketTypeUpdate, db: Sessi
     db.add(tt)
     db.commit()
     db.refresh(tt)
+    if ev:
+        _invalidate_event(ev, ticket_types_key(tt.event_id))
+    else:
+        cache.delete(ticket_types_key(tt.event_id))
     return tt
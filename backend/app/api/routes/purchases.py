@@ -3,13 +3,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 from app.api.deps import db_session
+from app.api.idempotency import idempotency_key_header, run_idempotent
+from app.core import metrics
 from app.db.models.purchase import Purchase
 from app.db.models.contact import Contact
 from app.db.models.ticket import Ticket
 from app.db.models.event import Event
 from app.db.models.ticket_type import TicketType
 from app.schemas.purchase import PurchaseRead, PurchaseTicket
-from app.services.emailer import send_reservation_confirmation_buyer, format_event_datetime, send_ticket_email_active
+from app.services.emailer import send_reservation_confirmation_buyer, format_event_datetime, send_tickets_email
+from app.services.qr_signing import qr_payload
+from app.services.holds import format_expiry, hold_lapsed
 from sqlalchemy import func
 
 
@@ -105,6 +109,7 @@ def resend_purchase_payment(purchase_id: int, db: Session = Depends(db_session))
                 Ticket.id,
                 Ticket.event_id,
                 Ticket.ticket_type_id,
+                Ticket.hold_expires_at,
                 TicketType.name.label("type_name"),
                 TicketType.price_baht.label("type_price"),
                 Event.title.label("event_title"),
@@ -141,8 +146,9 @@ def resend_purchase_payment(purchase_id: int, db: Session = Depends(db_session))
     # Prefer purchase GUID deep link to payment page
     secure_link = f"{app_origin}/pay?purchase={p.uuid}"
 
-    from datetime import datetime, timezone, timedelta
-    expires = (datetime.now(timezone.utc) + timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
+    # Quote the earliest hold in the purchase; that is when tickets start being released
+    holds = [r["hold_expires_at"] for r in rows if r.get("hold_expires_at")]
+    expires = format_expiry(min(holds) if holds else None)
     full_name = ' '.join([buyer.first_name or '', buyer.last_name or '']).strip() or buyer.email
     ok = send_reservation_confirmation_buyer(
         db,
@@ -170,29 +176,52 @@ def get_purchase_by_guid(guid: str, db: Session = Depends(db_session)):
 
 
 @router.post("/{purchase_id}/pay")
-def pay_purchase(purchase_id: int, db: Session = Depends(db_session)):
+def pay_purchase(
+    purchase_id: int,
+    db: Session = Depends(db_session),
+    idempotency_key: str | None = Depends(idempotency_key_header),
+):
+    return run_idempotent(
+        idempotency_key, "purchases.pay", {"purchase_id": purchase_id}, lambda: _pay_purchase(purchase_id, db)
+    )
+
+
+def _pay_purchase(purchase_id: int, db: Session) -> dict:
     p = db.get(Purchase, purchase_id)
     if not p:
         raise HTTPException(status_code=404, detail="Purchase not found")
     # Mark all tickets paid and send ticket emails
+    # Locked against the hold sweeper, which drops released tickets from their purchase
     tickets = db.execute(
-        select(Ticket).where(Ticket.purchase_id == purchase_id)
+        select(Ticket).where(Ticket.purchase_id == purchase_id).order_by(Ticket.id).with_for_update()
     ).scalars().all()
+    if not tickets:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="No tickets for purchase")
+    if any(hold_lapsed(t) for t in tickets):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Reservation expired; the tickets were released")
+    newly_paid = [t.ticket_type_id for t in tickets if t.payment_status != 'paid']
     for t in tickets:
         t.payment_status = 'paid'
+        t.hold_expires_at = None
         db.add(t)
     db.commit()
+    for tt_id in newly_paid:
+        metrics.TICKET_CHECKOUTS.inc(ticket_type_id=tt_id or "none")
+    # One ticket email per recipient (and event) listing all their tickets
+    by_recipient: dict[tuple[str, int], list[Ticket]] = {}
     for t in tickets:
         if t.customer and t.customer.email and t.short_code:
-            ev = db.get(Event, t.event_id)
-            send_ticket_email_active(
-                db,
-                to_email=t.customer.email,
-                event_title=ev.title if ev else 'Event',
-                event_when_iso=ev.starts_at.isoformat() if ev and ev.starts_at else '',
-                short_code=t.short_code,
-                ticket_number=t.ticket_number,
-                token=t.uuid,
-                related={'event_id': t.event_id, 'ticket_id': t.id, 'purchase_id': purchase_id},
-            )
+            by_recipient.setdefault((t.customer.email, t.event_id), []).append(t)
+    for (to_email, event_id), group in by_recipient.items():
+        ev = db.get(Event, event_id)
+        send_tickets_email(
+            db,
+            to_email=to_email,
+            event_title=ev.title if ev else 'Event',
+            event_when_iso=ev.starts_at.isoformat() if ev and ev.starts_at else '',
+            tickets=[{'id': t.id, 'short_code': t.short_code, 'ticket_number': t.ticket_number, 'token': t.uuid, 'qr': qr_payload(t)} for t in group],
+            related={'event_id': event_id, 'purchase_id': purchase_id},
+        )
     return {"paid": True, "tickets": len(tickets)}
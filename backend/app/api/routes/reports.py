@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import db_session
+from app.core.broadcast import SSE_KEEPALIVE, sse_event
+from app.db.models.event import Event
+from app.db.session import SessionLocal
+from app.services.checkin_feed import feed as checkin_feed
 from app.services.reports import reconciliation_summary, reconciliation_csv
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -25,3 +31,48 @@ def reconciliation_csv_export(event_id: int, db: Session = Depends(db_session)):
     csv_text = reconciliation_csv(summary)
     return Response(content=csv_text, media_type="text/csv")
 
+
+
+def _event_exists(event_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.get(Event, event_id) is not None
+
+
+@router.get("/checkins/stream")
+async def checkins_stream(event_id: int, request: Request):
+    """Server-Sent Events feed for a live check-in dashboard.
+
+    Sends a `snapshot` of running totals first, then at most one `checkins`
+    event per second carrying the arrivals in that interval (overall, per
+    ticket type, per gate and per device) together with the updated totals.
+    A keepalive comment goes out every 15s. No DB session is held for the
+    life of the stream.
+    """
+    if not await run_in_threadpool(_event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    checkin_feed.ensure_listening()
+
+    async def stream():
+        async with checkin_feed.broadcaster.subscribe(event_id) as sub:
+            totals = await run_in_threadpool(checkin_feed.snapshot, event_id)
+            yield sse_event("snapshot", {"event_id": event_id, "totals": totals})
+            while not await request.is_disconnected():
+                msg = await sub.get(timeout=15)
+                if msg is None:
+                    yield SSE_KEEPALIVE
+                elif msg["kind"] == "snapshot":
+                    yield sse_event("snapshot", {"event_id": event_id, "totals": msg["totals"]})
+                else:
+                    yield sse_event("checkins", {
+                        "event_id": event_id,
+                        "at": msg["at"],
+                        "interval_seconds": checkin_feed.interval,
+                        **msg["delta"],
+                        "totals": msg["totals"],
+                    })
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from tempfile import SpooledTemporaryFile
+from typing import Literal
 
 from app.api.deps import db_session
+from app.api.idempotency import idempotency_key_header, run_idempotent
+from app.core import metrics
+from app.core.config import settings
 from app.schemas.assign import AssignRequest, AssignResponse, AssignPreviewRequest, AssignPreviewResponse
 from app.schemas.resend import ResendRequest, ResendResponse
 from app.schemas.pay import TicketLookupResponse, PayRequest, PayResponse
+from app.services.bulk_import import import_holders, iter_records, result_header, result_line
 from app.services.tickets import assign_ticket, resend_code, unassign_ticket, refund_ticket, reassign_ticket
+from app.services.holds import format_expiry, hold_lapsed
+from app.services.identity import resolve_identity
+from app.services.qr_signing import qr_payload, qr_url as ticket_qr_url
 from app.utils.codes import generate_short_code
 from app.db.models.event import Event
 from app.db.models.ticket import Ticket
@@ -14,9 +25,13 @@ from app.integrations.email import templates
 from app.db.models.ticket_type import TicketType
 import os
 from app.schemas.ticket_actions import UnassignRequest, UnassignResponse, RefundRequest, RefundResponse, TicketByCodeResponse, ReassignRequest, ReassignResponse
+from app.schemas.ticket_actions import BulkRefundRequest, BulkResendRequest, BulkUnassignRequest
+from app.schemas.job import JobRead
+from app.services import bulk_tickets  # noqa: F401  (registers the bulk job handlers)
+from app.services.jobs import enqueue
 from sqlalchemy import select
-from app.db.models.contact import Contact
 from app.db.models.purchase import Purchase
+from app.db.session import SessionLocal
 
 router = APIRouter(tags=["tickets"])
 
@@ -49,6 +64,46 @@ def assign(req: AssignRequest, db: Session = Depends(db_session)):
     )
 
 
+def _event_exists(event_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.get(Event, event_id) is not None
+
+
+@router.post("/assign/import")
+async def assign_import(
+    request: Request,
+    event_id: int,
+    format: Literal["csv", "ndjson"] | None = None,
+):
+    """Bulk-assign holders from a CSV (with header row) or NDJSON body.
+
+    Columns/keys: email, first_name, last_name, phone, ticket_type (id or name),
+    payment_status. The response is a per-row result file in the same format,
+    streamed as chunks commit. Each chunk queues an email job for its tickets as it commits.
+    """
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if not await run_in_threadpool(_event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    # Spool the upload (spills to disk past 8 MB) so rows are parsed without holding the body in memory
+    upload = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for part in request.stream():
+        upload.write(part)
+    upload.seek(0)
+
+    def results():
+        with upload, SessionLocal() as db:
+            yield result_header(fmt)
+            for r in import_holders(db, event_id=event_id, records=iter_records(upload, fmt)):
+                yield result_line(r, fmt)
+
+    return StreamingResponse(
+        results(),
+        media_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="import-{event_id}-results.{fmt}"'},
+    )
+
+
 @router.post("/assign/preview", response_model=AssignPreviewResponse)
 def assign_preview(req: AssignPreviewRequest, db: Session = Depends(db_session)):
     ev = db.get(Event, req.event_id)
@@ -112,31 +167,44 @@ def lookup_ticket(
 
 
 @router.post("/tickets/pay", response_model=PayResponse)
-def pay_ticket(req: PayRequest, db: Session = Depends(db_session)):
+def pay_ticket(
+    req: PayRequest,
+    db: Session = Depends(db_session),
+    idempotency_key: str | None = Depends(idempotency_key_header),
+):
+    return run_idempotent(idempotency_key, "tickets.pay", req.model_dump(mode="json"), lambda: _pay_ticket(req, db))
+
+
+def _pay_ticket(req: PayRequest, db: Session) -> PayResponse:
+    # Locked so a concurrent hold sweep either finishes first (and we see the release) or waits for us
     if req.token:
-        t = db.query(Ticket).filter(Ticket.uuid == req.token).first()
+        t = db.query(Ticket).filter(Ticket.uuid == req.token).with_for_update().first()
     else:
         t = (
             db.query(Ticket)
             .filter(Ticket.event_id == req.event_id, Ticket.short_code == req.code)
+            .with_for_update()
             .first()
         )
     if not t:
         raise HTTPException(status_code=404, detail="Ticket not found for event and code")
+    if hold_lapsed(t):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Reservation expired; the ticket was released")
+    was_paid = t.payment_status == "paid"
     t.payment_status = "paid"
+    t.hold_expires_at = None
     db.add(t)
     db.commit()
     db.refresh(t)
+    if not was_paid:
+        metrics.TICKET_CHECKOUTS.inc(ticket_type_id=t.ticket_type_id or "none")
     # Create a Purchase if not present and associate to ticket
     try:
         cust_email = t.customer.email if t.customer and t.customer.email else None
         if cust_email and not t.purchase_id:
-            contact = db.query(Contact).filter(Contact.email == cust_email).first()
-            if not contact:
-                contact = Contact(email=cust_email, first_name=t.customer.first_name if t.customer else None, last_name=t.customer.last_name if t.customer else None, phone=t.customer.phone if t.customer else None)
-                db.add(contact)
-                db.flush()
-            p = Purchase(buyer_contact_id=contact.id, external_payment_ref=(req.token or None))
+            identity = resolve_identity(db, email=cust_email, first_name=t.customer.first_name, last_name=t.customer.last_name, phone=t.customer.phone)
+            p = Purchase(buyer_contact_id=identity.contact_id, external_payment_ref=(req.token or None))
             db.add(p)
             db.flush()
             t.purchase_id = p.id
@@ -148,8 +216,7 @@ def pay_ticket(req: PayRequest, db: Session = Depends(db_session)):
     # Send ticket email with QR now that it's paid
     ev = db.get(Event, t.event_id)
     event_when = ev.starts_at.isoformat() if ev else ""
-    api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-    qr_url = f"{api_origin}/qr?data={t.short_code}&scale=6" if t.short_code else None
+    qr_url = ticket_qr_url(t) if t.short_code else None
     cust_email = (t.customer.email if t.customer and t.customer.email else None)
     if cust_email and t.short_code:
         try:
@@ -189,8 +256,7 @@ def resend_payment(req: ResendRequest, db: Session = Depends(db_session)):
     # Simple event datetime string
     s = ev.starts_at; e = ev.ends_at if ev else None
     event_dt = f"{s.strftime('%d/%m/%Y %I:%M%p')}" + (f" — {e.strftime('%d/%m/%Y %I:%M%p')}" if e else '')
-    import datetime as _dt
-    expires = (_dt.datetime.now(_dt.timezone.utc) + _dt.timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
+    expires = format_expiry(t.hold_expires_at)
     subject, text, html = templates.confirm_ticket_reservation(ev.title if ev else "Event", event_dt, 1, lines, total, expires, pay_link)
     ok = send_and_log(to_email=t.customer.email, subject=subject, text=text, html=html, template_name='confirm_ticket_reservation', context={'event_id': ev.id if ev else None, 'payment_link': pay_link}, db=db, related={'event_id': ev.id if ev else None, 'ticket_id': t.id})
     if not ok:
@@ -247,6 +313,9 @@ def ticket_by_code(code: str, db: Session = Depends(db_session)):
     ticket_dict = {
         "number": t.ticket_number,
         "code": t.short_code,
+        # Never the signed payload here: anyone can walk all 1,000 codes. Only
+        # the uuid token (by-token) hands out a QR that passes verification.
+        "qr": None if settings.qr_signing_secret else qr_payload(t),
         "type_id": t.ticket_type_id,
         "type_name": (t.ticket_type.name if getattr(t, 'ticket_type', None) else None),
         "payment_status": t.payment_status,
@@ -280,6 +349,8 @@ def ticket_by_token(token: str, db: Session = Depends(db_session)):
     ticket_dict = {
         "number": t.ticket_number,
         "code": t.short_code,
+        # What the ticket's QR encodes (signed when QR_SIGNING_SECRET is set)
+        "qr": qr_payload(t),
         "type_id": t.ticket_type_id,
         "type_name": (t.ticket_type.name if getattr(t, 'ticket_type', None) else None),
         "payment_status": t.payment_status,
@@ -334,8 +405,7 @@ def resend_ticket(req: ResendRequest, db: Session = Depends(db_session)):
         raise HTTPException(status_code=400, detail="Ticket code missing")
     ev = db.get(Event, t.event_id)
     event_when = ev.starts_at.isoformat() if ev else ""
-    api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-    qr_url = f"{api_origin}/qr?data={t.short_code}&scale=6&format=png"
+    qr_url = ticket_qr_url(t)
     app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
     view_link = f"{app_origin2}/ticket?ref={t.uuid}"
     subject, text, html = templates.ticket_email(ev.title if ev else "Event", event_when, t.short_code, qr_url, view_link, t.ticket_number)
@@ -346,3 +416,28 @@ def resend_ticket(req: ResendRequest, db: Session = Depends(db_session)):
     db.add(t)
     db.commit()
     return {"resent": True}
+
+
+def _enqueue_bulk(db: Session, kind: str, req, max_attempts: int | None = None) -> JobRead:
+    if not db.get(Event, req.filter.event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    return enqueue(db, kind, req.model_dump(), max_attempts=max_attempts)
+
+
+@router.post("/tickets/bulk/refund", response_model=JobRead, status_code=202)
+def bulk_refund(req: BulkRefundRequest, db: Session = Depends(db_session)):
+    """Start refunding every paid ticket matching the filter; poll GET /jobs/{id} for progress."""
+    return _enqueue_bulk(db, "tickets.bulk_refund", req)
+
+
+@router.post("/tickets/bulk/unassign", response_model=JobRead, status_code=202)
+def bulk_unassign(req: BulkUnassignRequest, db: Session = Depends(db_session)):
+    """Start unassigning every unpaid/waived assigned ticket matching the filter."""
+    return _enqueue_bulk(db, "tickets.bulk_unassign", req)
+
+
+@router.post("/tickets/bulk/resend", response_model=JobRead, status_code=202)
+def bulk_resend(req: BulkResendRequest, db: Session = Depends(db_session)):
+    """Start resending each matching holder's ticket or payment email."""
+    # Not retried: a second pass would email holders that already got theirs
+    return _enqueue_bulk(db, "tickets.bulk_resend", req, max_attempts=1)
@@ -6,8 +6,7 @@ from app.integrations.email.service import send_and_log
 from app.integrations.email.registry import code_for
 from app.integrations.email.renderer import render
 from app.api.deps import require_auth
-import segno
-import io
+from app.services.qr import KINDS, QrBusy, renderer as qr_renderer
 from sqlalchemy.orm import Session
 from app.api.deps import db_session
 
@@ -15,20 +14,16 @@ router = APIRouter(tags=["utils"])
 
 
 @router.get("/qr")
-def qr(data: str = Query(min_length=1, max_length=256), scale: int = 4, format: str = Query("svg", pattern="^(svg|png)$")):
+async def qr(data: str = Query(min_length=1, max_length=256), scale: int = Query(4, ge=1, le=40), format: str = Query("svg", pattern="^(svg|png)$")):
+    kind = 'png' if format == 'png' else 'svg'
     try:
-        q = segno.make(data, error='m')
-        buf = io.BytesIO()
-        kind = 'png' if format == 'png' else 'svg'
-        q.save(buf, kind=kind, scale=scale)
-        if kind == 'svg':
-            svg = buf.getvalue().decode('utf-8')
-            return Response(content=svg, media_type="image/svg+xml")
-        else:
-            png = buf.getvalue()
-            return Response(content=png, media_type="image/png")
+        content = await qr_renderer.render_async(data, scale, kind)
+    except QrBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # Same input, same image: let browsers and proxies keep it
+    return Response(content=content, media_type=KINDS[kind], headers={"Cache-Control": "public, max-age=86400, immutable"})
 
 
 @router.post("/test_email")
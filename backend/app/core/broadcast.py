@@ -0,0 +1,85 @@
+"""In-process pub/sub from worker threads to asyncio subscribers (SSE streams).
+
+Publishers (e.g. the LISTEN thread) call `publish(key, message)` from any
+thread; every subscriber of `key` gets the message on its own bounded queue.
+A subscriber that stops reading loses its oldest messages rather than
+growing memory, so one stalled client cannot hurt the others.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, message: Any) -> None:
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Any:
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    def __init__(self, queue_size: int = 64) -> None:
+        self.queue_size = queue_size
+        self._subs: dict[Hashable, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, key: Hashable) -> AsyncIterator[Subscription]:
+        sub = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subs[key].add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subs.get(key)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[key]
+
+    def keys(self) -> list[Hashable]:
+        with self._lock:
+            return list(self._subs)
+
+    def subscriber_count(self, key: Hashable) -> int:
+        with self._lock:
+            return len(self._subs.get(key, ()))
+
+    def publish(self, key: Hashable, message: Any) -> None:
+        """Thread-safe: deliver `message` to every current subscriber of `key`."""
+        with self._lock:
+            subs = list(self._subs.get(key, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, message)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+SSE_KEEPALIVE = ": keepalive\n\n"
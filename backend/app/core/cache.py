@@ -0,0 +1,256 @@
+"""Read-through cache for hot public reads (events, ticket types, promotions).
+
+Two tiers:
+- an in-process TTL LRU, always on;
+- an optional shared tier speaking the Redis protocol (RESP), enabled by
+  CACHE_URL=redis://host:port/db. Anything that understands GET/SET EX/DEL
+  works: Redis, Valkey, KeyDB, or a local stand-in.
+
+Values are JSON-compatible (already serialised response bodies). Writers call
+`cache.delete(...)` after committing. That only reaches this process's copy
+(and the shared tier), so in-process copies live for at most
+CACHE_LOCAL_TTL_SECONDS whether or not a shared tier exists, and other workers
+converge quickly. The shared tier is best-effort: any error is treated as a miss and the
+tier is skipped for a short back-off, so Redis trouble never fails a request.
+
+Kept dependency-free on purpose, like app.core.metrics.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for k in keys:
+                self._data.pop(k, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RespClient:
+    """Minimal Redis protocol client: one socket, serialised by a lock, reconnects on error."""
+
+    def __init__(self, url: str, timeout: float = 0.25) -> None:
+        u = urlparse(url)
+        self.host = u.hostname or "localhost"
+        self.port = u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._file = sock, sock.makefile("rb")
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", str(self.db))
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _roundtrip(self, *args: str | bytes) -> Any:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            parts.append(f"${len(b)}\r\n".encode() + b + b"\r\n")
+        self._sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self) -> Any:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self._file.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RuntimeError(f"unexpected reply {line!r}")
+
+    def execute(self, *args: str | bytes) -> Any:
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._roundtrip(*args)
+            except Exception:
+                self.close()
+                raise
+
+
+class Cache:
+    def __init__(
+        self,
+        *,
+        url: str = "",
+        ttl: float = 300,
+        local_ttl: float | None = None,
+        max_entries: int = 10_000,
+        prefix: str = "fa:",
+    ) -> None:
+        self.ttl = ttl
+        self.prefix = prefix
+        self.local = LocalCache(max_entries)
+        self.shared = RespClient(url) if url else None
+        # Short even without a shared tier: other workers never hear of a delete, only of expiry
+        self.local_ttl = min(ttl, local_ttl) if local_ttl is not None else ttl
+        self._shared_down_until = 0.0
+
+    # -- shared tier (best effort) ---------------------------------------
+
+    def _shared_ok(self) -> bool:
+        return self.shared is not None and time.monotonic() >= self._shared_down_until
+
+    def _shared_call(self, *args: str | bytes) -> Any:
+        try:
+            return self.shared.execute(*args)
+        except Exception as exc:
+            logger.warning("Shared cache unavailable (%s); using in-process tier only for 5s", exc)
+            self._shared_down_until = time.monotonic() + 5.0
+            return _MISSING
+
+    # -- public API ---------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not _MISSING:
+            metrics.CACHE_LOOKUPS.inc(tier="local", result="hit")
+            return value
+        metrics.CACHE_LOOKUPS.inc(tier="local", result="miss")
+        if self._shared_ok():
+            raw = self._shared_call("GET", self.prefix + key)
+            if raw is _MISSING:
+                metrics.CACHE_LOOKUPS.inc(tier="shared", result="error")
+            elif raw is not None:
+                metrics.CACHE_LOOKUPS.inc(tier="shared", result="hit")
+                value = json.loads(raw)
+                self.local.set(key, value, self.local_ttl)
+                return value
+            else:
+                metrics.CACHE_LOOKUPS.inc(tier="shared", result="miss")
+        return _MISSING
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = ttl or self.ttl
+        self.local.set(key, value, min(ttl, self.local_ttl))
+        if self._shared_ok():
+            self._shared_call("SET", self.prefix + key, json.dumps(value, separators=(",", ":")), "EX", str(int(ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        self.local.delete(*keys)
+        if self._shared_ok():
+            self._shared_call("DEL", *[self.prefix + k for k in keys])
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: float | None = None) -> Any:
+        """Read-through: return the cached value or call `loader` and cache its result.
+
+        A loader returning None is not cached (e.g. a 404), so lookups for missing
+        rows always reach the database.
+        """
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+
+cache = Cache(
+    url=settings.cache_url,
+    ttl=settings.cache_ttl_seconds,
+    local_ttl=settings.cache_local_ttl_seconds,
+    max_entries=settings.cache_max_entries,
+)
+
+
+# Key helpers shared by readers and writers so invalidation can't drift from reads
+
+def event_key(event_id: int) -> str:
+    return f"event:{event_id}"
+
+
+def event_public_key(public_id: str) -> str:
+    return f"event:public:{public_id}"
+
+
+def ticket_types_key(event_id: int) -> str:
+    return f"event:{event_id}:ticket_types"
+
+
+def promotion_key(event_id: int) -> str:
+    return f"event:{event_id}:promotion"
+
+
+def public_page_key(public_id: str) -> str:
+    return f"event:public:{public_id}:page"
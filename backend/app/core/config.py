@@ -5,6 +5,61 @@ class Settings(BaseSettings):
     database_url: str = "postgresql+psycopg://app:app@db:5432/fa_tickets"
     backend_port: int = 8000
     auth_token: str = ""  # when set, API requires X-Auth-Token header to match
+    # Per-request SQL accounting (Server-Timing header + /admin/query_stats)
+    query_stats_enabled: bool = True
+    # Log the full statement list for requests slower than this (ms); 0 disables
+    slow_request_ms: int = 0
+    # Unpaid reservations are released after this many hours
+    hold_ttl_hours: int = 24
+    # Background hold sweeper cadence (seconds); 0 disables it in this process
+    hold_sweep_interval_seconds: int = 60
+    hold_sweep_batch_size: int = 500
+    # Stored Idempotency-Key responses are replayed for this long
+    idempotency_ttl_hours: int = 24
+    # Read-through cache for public event reads; CACHE_URL (redis://host:port/db) adds a shared tier
+    cache_url: str = ""
+    cache_ttl_seconds: int = 300
+    # In-process copies expire after this so invalidations reach every worker; the shared tier keeps CACHE_TTL_SECONDS
+    cache_local_ttl_seconds: int = 5
+    cache_max_entries: int = 10000
+    # Rows per transaction for POST /assign/import
+    bulk_import_chunk_size: int = 500
+    # Job worker threads embedded in each API process; 0 leaves jobs to `python -m app.worker`
+    job_threads: int = 2
+    job_max_attempts: int = 3
+    # How often an idle worker thread polls the queue (seconds)
+    job_poll_interval_seconds: float = 1.0
+    # email_log rows are buffered and written in batches by a background thread
+    email_log_queue_size: int = 10000
+    email_log_batch_size: int = 500
+    email_log_flush_interval_seconds: float = 0.5
+    # Sender threads and per-transport send rate (emails/second, bursts up to twice that); unlisted transports are unlimited
+    email_send_threads: int = 4
+    email_rate_limits: dict[str, float] = {"sendgrid": 10.0, "smtp": 5.0}
+    # A send still queued after this long fails instead of holding up its caller
+    email_queue_timeout_seconds: float = 30.0
+    # Email transports fail fast after this many consecutive provider errors, retrying one send every reset period
+    email_breaker_failure_threshold: int = 5
+    email_breaker_reset_seconds: float = 30.0
+    # Bounds for the adaptive provider timeout (tracks observed send latency)
+    email_timeout_min_seconds: float = 2.0
+    email_timeout_max_seconds: float = 15.0
+    # Render our /qr images into the message as inline cid: parts instead of linking to the API
+    email_inline_qr: bool = True
+    # QR renders run in this many spawned processes (0 renders in the request thread)
+    qr_processes: int = 2
+    # Distinct QR renders allowed in flight before /qr answers 503
+    qr_max_pending: int = 256
+    # HMAC key for signed ticket QR payloads; empty keeps QRs to the bare short code
+    qr_signing_secret: str = ""
+    # With a signing secret, /checkin takes only signed payloads unless manual 3-digit entry is allowed here
+    checkin_allow_unsigned: bool = False
+    # Whole months of email_log kept (older monthly partitions are dropped); 0 keeps everything
+    email_log_retention_months: int = 12
+    # Monthly email_log partitions created ahead of time
+    email_log_partitions_ahead: int = 2
+    # Housekeeping loop cadence (seconds): email_log partitions and retention, expired Idempotency-Key rows, queued contact stats; 0 disables it in this process
+    maintenance_interval_seconds: int = 300
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,267 @@
+"""Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Counters, gauges and histograms live in process memory, so each uvicorn
+worker exposes its own series; Prometheus aggregates across scrape targets.
+Kept dependency-free on purpose: a handful of metric types is all we need.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Iterable[str], values: Iterable[str], extra: tuple[str, str] | None = None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> list[str]:  # pragma: no cover - overridden
+        return []
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, collect: Callable[[], Iterable[tuple[dict, float]]] | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelKey, float] = {}
+        # Optional callback evaluated at scrape time (e.g. connection pool state)
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list[str]:
+        if self._collect is not None:
+            try:
+                for labels, value in self._collect():
+                    self.set(value, **labels)
+            except Exception:
+                pass
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[LabelKey, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][idx] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(c), s[0])) for k, (c, s) in self._values.items()]
+        out: list[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, ('le', _fmt_value(bound)))} {cumulative}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics:
+            lines.extend(m.header())
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, documentation: str, labelnames: tuple[str, ...] = (), collect=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames, collect=collect))  # type: ignore[return-value]
+
+
+def histogram(name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets=buckets))  # type: ignore[return-value]
+
+
+# --- HTTP / DB ---------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = gauge("http_requests_in_flight", "Requests currently being served")
+DB_QUERIES_PER_REQUEST = histogram(
+    "db_queries_per_request", "SQL statements issued per request", ("route",),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+
+
+def _pool_stats() -> list[tuple[dict, float]]:
+    from app.db.session import engine
+
+    pool = engine.pool
+    stats = []
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats.append(({"state": name}, float(fn())))
+    return stats
+
+
+DB_POOL = gauge("db_pool_connections", "SQLAlchemy connection pool state", ("state",), collect=_pool_stats)
+
+# --- Ticketing ---------------------------------------------------------------
+
+CHECKINS = counter("checkins_total", "Successful check-ins", ("event_id",))
+TICKET_RESERVATIONS = counter("ticket_reservations_total", "Tickets held or assigned unpaid", ("ticket_type_id",))
+TICKET_CHECKOUTS = counter("ticket_checkouts_total", "Tickets marked paid", ("ticket_type_id",))
+ALLOCATOR_LOCK_WAIT = histogram(
+    "allocator_lock_wait_seconds", "Time spent waiting for the per-event allocator lock",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# --- Cache -------------------------------------------------------------------
+
+CACHE_LOOKUPS = counter("cache_lookups_total", "Read-through cache lookups by tier and outcome", ("tier", "result"))
+
+# --- Email -------------------------------------------------------------------
+
+EMAIL_SEND_DURATION = histogram("email_send_duration_seconds", "Email transport latency", ("transport",))
+EMAIL_SENDS = counter("email_sends_total", "Email send attempts by outcome", ("transport", "status"))
+
+
+def _email_breaker_states() -> list[tuple[dict, float]]:
+    from app.integrations.email.breaker import states
+
+    return states()
+
+
+def _email_timeouts() -> list[tuple[dict, float]]:
+    from app.integrations.email.breaker import timeouts
+
+    return timeouts()
+
+
+EMAIL_BREAKER_STATE = gauge(
+    "email_breaker_state", "Email circuit breaker state (0 closed, 1 half-open, 2 open)", ("transport",), collect=_email_breaker_states,
+)
+EMAIL_BREAKER_TRANSITIONS = counter("email_breaker_transitions_total", "Email circuit breaker state changes", ("transport", "state"))
+EMAIL_SHORT_CIRCUITS = counter("email_short_circuits_total", "Sends failed fast because the transport's breaker was open", ("transport",))
+EMAIL_SEND_TIMEOUT = gauge("email_send_timeout_seconds", "Current adaptive email send timeout", ("transport",), collect=_email_timeouts)
+EMAIL_QUEUE_DEPTH = gauge("email_queue_depth", "Emails waiting in the send scheduler", ("lane",))
+EMAIL_QUEUE_WAIT = histogram("email_queue_wait_seconds", "Time from submit to send start", ("lane",))
+EMAIL_COALESCED = counter("email_coalesced_total", "Queued emails replaced by a newer one for the same recipient", ("lane",))
+EMAIL_LOG_DROPPED = counter("email_log_dropped_total", "Email log rows discarded instead of written", ("reason",))
+
+# --- QR ----------------------------------------------------------------------
+
+
+def _qr_pending() -> list[tuple[dict, float]]:
+    from app.services.qr import renderer
+
+    return [({}, float(renderer.pending()))]
+
+
+QR_RENDERS = counter("qr_renders_total", "QR images requested by outcome (rendered, coalesced, rejected)", ("outcome",))
+QR_PENDING = gauge("qr_renders_pending", "Distinct QR renders queued or running in the process pool", collect=_qr_pending)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,119 @@
+"""Postgres LISTEN/NOTIFY fan-in: one dedicated connection per worker process.
+
+Handlers subscribe to a channel and receive notification payloads in batches
+(everything that arrived within `batch_window` seconds), on the listener
+thread. Handlers must be quick and must not block; they typically coalesce
+the batch and hand results to an in-process broadcaster.
+
+After a reconnect, handlers are called with `None` so they can resynchronise
+state they may have missed while the connection was down.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable
+
+import psycopg
+from psycopg import sql
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[list[str] | None], None]
+
+
+def _libpq_dsn(database_url: str) -> str:
+    # SQLAlchemy URL (postgresql+psycopg://...) -> plain libpq URL
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class PgListener:
+    def __init__(self, database_url: str, batch_window: float = 0.2) -> None:
+        self.dsn = _libpq_dsn(database_url)
+        self.batch_window = batch_window
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._conn: psycopg.Connection | None = None
+        self._pending_listen: set[str] = set()
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """Register `handler` for `channel`; starts the listener thread on first use."""
+        with self._lock:
+            new_channel = channel not in self._handlers
+            self._handlers[channel].append(handler)
+            if new_channel:
+                self._pending_listen.add(channel)
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen(self, conn: psycopg.Connection, channels: set[str]) -> None:
+        for ch in channels:
+            conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(ch)))
+
+    def _dispatch(self, channel: str, payloads: list[str] | None) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for h in handlers:
+            try:
+                h(payloads)
+            except Exception:
+                logger.exception("Notification handler for %s failed", channel)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    with self._lock:
+                        channels = set(self._handlers)
+                        self._pending_listen.clear()
+                    self._listen(conn, channels)
+                    # Anything may have changed while we were not listening
+                    for ch in channels:
+                        self._dispatch(ch, None)
+                    backoff = 1.0
+                    self._loop(conn)
+            except Exception as exc:
+                if self._stop.is_set():
+                    return
+                logger.warning("LISTEN connection lost (%s); reconnecting in %.0fs", exc, backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _loop(self, conn: psycopg.Connection) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                new_channels, self._pending_listen = self._pending_listen, set()
+            if new_channels:
+                self._listen(conn, new_channels)
+
+            batch: dict[str, list[str]] = defaultdict(list)
+            # Block up to 1s for the first notification, then gather for batch_window
+            for n in conn.notifies(timeout=1.0, stop_after=1):
+                batch[n.channel].append(n.payload)
+            if not batch:
+                continue
+            deadline = time.monotonic() + self.batch_window
+            while (remaining := deadline - time.monotonic()) > 0:
+                for n in conn.notifies(timeout=remaining):
+                    batch[n.channel].append(n.payload)
+            for channel, payloads in batch.items():
+                self._dispatch(channel, payloads)
+
+
+listener = PgListener(settings.database_url)
@@ -0,0 +1,44 @@
+from alembic import op
+
+
+revision = '20261019_0011'
+down_revision = '20240925_0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Collapse duplicate customers (same email) onto the oldest row so email can be unique.
+    # Identity resolution upserts with ON CONFLICT (email), which needs a unique index.
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT id, min(id) OVER (PARTITION BY email) AS keep_id
+            FROM customer
+            WHERE email IS NOT NULL
+        )
+        UPDATE ticket t
+        SET customer_id = r.keep_id
+        FROM ranked r
+        WHERE t.customer_id = r.id AND r.id <> r.keep_id
+        """
+    )
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT id, min(id) OVER (PARTITION BY email) AS keep_id
+            FROM customer
+            WHERE email IS NOT NULL
+        )
+        DELETE FROM customer c
+        USING ranked r
+        WHERE c.id = r.id AND r.id <> r.keep_id
+        """
+    )
+    op.drop_index('ix_customer_email', table_name='customer')
+    op.create_index('uq_customer_email', 'customer', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_customer_email', table_name='customer')
+    op.create_index('ix_customer_email', 'customer', ['email'])
@@ -0,0 +1,39 @@
+from alembic import op
+
+
+revision = '20261019_0012'
+down_revision = '20261019_0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Substring search over the combined document; expression must match
+    # app.services.contact_search.SEARCH_DOCUMENT.
+    op.execute(
+        """
+        CREATE INDEX ix_contact_search_trgm ON contact USING gin (
+            (lower(coalesce(email, '') || ' ' || coalesce(first_name, '') || ' ' ||
+                   coalesce(last_name, '') || ' ' || coalesce(phone, ''))) gin_trgm_ops
+        )
+        """
+    )
+    # Prefix (typeahead) matching for short terms
+    op.execute("CREATE INDEX ix_contact_email_prefix ON contact (lower(email) text_pattern_ops)")
+    op.execute("CREATE INDEX ix_contact_first_name_prefix ON contact (lower(first_name) text_pattern_ops)")
+    op.execute("CREATE INDEX ix_contact_last_name_prefix ON contact (lower(last_name) text_pattern_ops)")
+    op.execute("CREATE INDEX ix_contact_phone_prefix ON contact (lower(phone) text_pattern_ops)")
+    # Per-contact aggregates on the contacts page
+    op.create_index('ix_ticket_holder_contact_id', 'ticket', ['holder_contact_id'])
+    op.create_index('ix_purchase_buyer_contact_id', 'purchase', ['buyer_contact_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_purchase_buyer_contact_id', table_name='purchase')
+    op.drop_index('ix_ticket_holder_contact_id', table_name='ticket')
+    op.execute("DROP INDEX IF EXISTS ix_contact_phone_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_contact_last_name_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_contact_first_name_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_contact_email_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_contact_search_trgm")
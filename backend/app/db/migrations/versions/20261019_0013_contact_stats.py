@@ -0,0 +1,190 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_0013'
+down_revision = '20261019_0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'contact_stats',
+        sa.Column('contact_id', sa.Integer(), sa.ForeignKey('contact.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('events_purchased', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tickets_held', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_purchase_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_ticket_activity_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+    # Sort keys for the contacts list (ties broken by contact_id for stable paging)
+    op.execute("CREATE INDEX ix_contact_stats_last_activity ON contact_stats (last_activity_at DESC NULLS LAST, contact_id)")
+    op.execute("CREATE INDEX ix_contact_stats_tickets_held ON contact_stats (tickets_held DESC, contact_id)")
+    # Role filters
+    op.execute("CREATE INDEX ix_contact_stats_buyers ON contact_stats (contact_id) WHERE events_purchased > 0")
+    op.execute("CREATE INDEX ix_contact_stats_holders ON contact_stats (contact_id) WHERE tickets_held > 0")
+
+    # Recompute the rollup for a set of contacts. Rows are locked in id order
+    # first so concurrent refreshes serialise per contact (and cannot deadlock),
+    # and the aggregate UPDATE then runs with a fresh snapshot that sees
+    # whatever the other transaction committed.
+    op.execute(
+        """
+        CREATE FUNCTION refresh_contact_stats(ids integer[]) RETURNS void
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF ids IS NULL OR cardinality(ids) = 0 THEN
+                RETURN;
+            END IF;
+
+            INSERT INTO contact_stats (contact_id)
+            SELECT c.id FROM contact c WHERE c.id = ANY(ids)
+            ON CONFLICT (contact_id) DO NOTHING;
+
+            PERFORM 1 FROM contact_stats
+            WHERE contact_id = ANY(ids)
+            ORDER BY contact_id
+            FOR UPDATE;
+
+            UPDATE contact_stats s
+            SET events_purchased = coalesce(b.events_purchased, 0),
+                last_purchase_at = b.last_purchase_at,
+                tickets_held = coalesce(h.tickets_held, 0),
+                last_ticket_activity_at = h.last_ticket_activity_at,
+                last_activity_at = greatest(b.last_purchase_at, h.last_ticket_activity_at),
+                updated_at = now()
+            FROM unnest(ids) AS u(contact_id)
+            LEFT JOIN LATERAL (
+                SELECT count(DISTINCT t.event_id) AS events_purchased,
+                       max(p.created_at) AS last_purchase_at
+                FROM purchase p
+                LEFT JOIN ticket t ON t.purchase_id = p.id
+                WHERE p.buyer_contact_id = u.contact_id
+            ) b ON true
+            LEFT JOIN LATERAL (
+                SELECT count(*) AS tickets_held,
+                       max(greatest(t.created_at, t.checked_in_at, t.delivered_at)) AS last_ticket_activity_at
+                FROM ticket t
+                WHERE t.holder_contact_id = u.contact_id
+            ) h ON true
+            WHERE s.contact_id = u.contact_id;
+        END;
+        $$;
+        """
+    )
+
+    # Statement-level triggers with transition tables: one refresh per
+    # statement, however many rows it touched. Transition tables only allow
+    # a single event per trigger, hence one trigger per operation.
+    op.execute(
+        """
+        CREATE FUNCTION contact_stats_on_ticket() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids integer[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT n.holder_contact_id FROM new_rows n
+                    UNION SELECT p.buyer_contact_id FROM new_rows n JOIN purchase p ON p.id = n.purchase_id
+                ) s(x) WHERE x IS NOT NULL;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT o.holder_contact_id FROM old_rows o
+                    UNION SELECT p.buyer_contact_id FROM old_rows o JOIN purchase p ON p.id = o.purchase_id
+                ) s(x) WHERE x IS NOT NULL;
+            ELSE
+                -- Only rows whose rollup inputs changed (payment/delivery status flips are common and irrelevant)
+                WITH changed AS (
+                    SELECT o.holder_contact_id AS old_holder, n.holder_contact_id AS new_holder,
+                           o.purchase_id AS old_purchase, n.purchase_id AS new_purchase
+                    FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.holder_contact_id, o.purchase_id, o.event_id, o.created_at, o.checked_in_at, o.delivered_at)
+                          IS DISTINCT FROM
+                          (n.holder_contact_id, n.purchase_id, n.event_id, n.created_at, n.checked_in_at, n.delivered_at)
+                )
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT old_holder FROM changed
+                    UNION SELECT new_holder FROM changed
+                    UNION SELECT p.buyer_contact_id FROM changed c JOIN purchase p ON p.id IN (c.old_purchase, c.new_purchase)
+                ) s(x) WHERE x IS NOT NULL;
+            END IF;
+            PERFORM refresh_contact_stats(ids);
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION contact_stats_on_purchase() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids integer[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT buyer_contact_id) INTO ids FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT buyer_contact_id) INTO ids FROM old_rows;
+            ELSE
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT o.buyer_contact_id FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.buyer_contact_id, o.created_at) IS DISTINCT FROM (n.buyer_contact_id, n.created_at)
+                    UNION
+                    SELECT n.buyer_contact_id FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.buyer_contact_id, o.created_at) IS DISTINCT FROM (n.buyer_contact_id, n.created_at)
+                ) s(x);
+            END IF;
+            PERFORM refresh_contact_stats(ids);
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION contact_stats_on_contact() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO contact_stats (contact_id)
+            SELECT id FROM new_rows
+            ON CONFLICT (contact_id) DO NOTHING;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    for table, fn in (('ticket', 'contact_stats_on_ticket'), ('purchase', 'contact_stats_on_purchase')):
+        op.execute(
+            f"CREATE TRIGGER {table}_contact_stats_ins AFTER INSERT ON {table} "
+            f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_contact_stats_upd AFTER UPDATE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_contact_stats_del AFTER DELETE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+    op.execute(
+        "CREATE TRIGGER contact_contact_stats_ins AFTER INSERT ON contact "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_on_contact()"
+    )
+
+    # Backfill every existing contact
+    op.execute("SELECT refresh_contact_stats(array_agg(id)) FROM contact")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS contact_contact_stats_ins ON contact")
+    for table in ('ticket', 'purchase'):
+        for suffix in ('ins', 'upd', 'del'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_contact_stats_{suffix} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS contact_stats_on_contact()")
+    op.execute("DROP FUNCTION IF EXISTS contact_stats_on_purchase()")
+    op.execute("DROP FUNCTION IF EXISTS contact_stats_on_ticket()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_contact_stats(integer[])")
+    op.drop_table('contact_stats')
@@ -0,0 +1,30 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_0014'
+down_revision = '20261019_0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ticket', sa.Column('hold_expires_at', sa.DateTime(timezone=True), nullable=True))
+    # Only live holds are indexed, so the sweeper's scan stays small however many tickets exist
+    op.execute(
+        "CREATE INDEX ix_ticket_hold_expires_at ON ticket (hold_expires_at) "
+        "WHERE hold_expires_at IS NOT NULL"
+    )
+    # Existing unpaid reservations get a fresh full hold rather than being released on deploy
+    op.execute(
+        """
+        UPDATE ticket
+        SET hold_expires_at = now() + interval '24 hours'
+        WHERE payment_status = 'unpaid' AND status IN ('held', 'assigned')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ticket_hold_expires_at")
+    op.drop_column('ticket', 'hold_expires_at')
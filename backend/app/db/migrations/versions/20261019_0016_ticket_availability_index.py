@@ -0,0 +1,16 @@
+from alembic import op
+
+
+revision = '20261019_0016'
+down_revision = '20261019_0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Index-only grouped counts for per-type availability (public event page, cap checks)
+    op.create_index('ix_ticket_event_type_status', 'ticket', ['event_id', 'ticket_type_id', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ticket_event_type_status', table_name='ticket')
@@ -0,0 +1,86 @@
+from alembic import op
+
+
+revision = '20261019_0017'
+down_revision = '20261019_0016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NOTIFY ticket_availability, <event_id> once per statement and event whenever
+    # something that affects per-type remaining counts changes. Postgres folds
+    # identical notifications within a transaction, so bulk statements stay cheap.
+    op.execute(
+        """
+        CREATE FUNCTION notify_ticket_availability() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ev integer;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                FOR ev IN SELECT DISTINCT event_id FROM new_rows LOOP
+                    PERFORM pg_notify('ticket_availability', ev::text);
+                END LOOP;
+            ELSIF TG_OP = 'DELETE' THEN
+                FOR ev IN SELECT DISTINCT event_id FROM old_rows LOOP
+                    PERFORM pg_notify('ticket_availability', ev::text);
+                END LOOP;
+            ELSE
+                FOR ev IN
+                    SELECT DISTINCT x FROM (
+                        SELECT o.event_id, n.event_id FROM old_rows o JOIN new_rows n ON n.id = o.id
+                        WHERE (o.status, o.ticket_type_id, o.event_id) IS DISTINCT FROM (n.status, n.ticket_type_id, n.event_id)
+                    ) c(a, b), LATERAL (VALUES (c.a), (c.b)) v(x)
+                LOOP
+                    PERFORM pg_notify('ticket_availability', ev::text);
+                END LOOP;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    # Caps and active flags live on ticket_type
+    op.execute(
+        """
+        CREATE FUNCTION notify_ticket_type_availability() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ev integer;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                FOR ev IN SELECT DISTINCT event_id FROM old_rows LOOP
+                    PERFORM pg_notify('ticket_availability', ev::text);
+                END LOOP;
+            ELSE
+                FOR ev IN SELECT DISTINCT event_id FROM new_rows LOOP
+                    PERFORM pg_notify('ticket_availability', ev::text);
+                END LOOP;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    for table, fn in (('ticket', 'notify_ticket_availability'), ('ticket_type', 'notify_ticket_type_availability')):
+        op.execute(
+            f"CREATE TRIGGER {table}_availability_ins AFTER INSERT ON {table} "
+            f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_availability_upd AFTER UPDATE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_availability_del AFTER DELETE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+
+
+def downgrade() -> None:
+    for table in ('ticket', 'ticket_type'):
+        for suffix in ('ins', 'upd', 'del'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_availability_{suffix} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_ticket_type_availability()")
+    op.execute("DROP FUNCTION IF EXISTS notify_ticket_availability()")
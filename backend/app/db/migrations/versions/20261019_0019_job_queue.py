@@ -0,0 +1,40 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_0019'
+down_revision = '20261019_0018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('job', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('job', sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'))
+    op.add_column('job', sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('job', sa.Column('locked_by', sa.String(length=64), nullable=True))
+    op.add_column('job', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('job', sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+    # Claim scan: oldest due queued job first
+    op.create_index(
+        'ix_job_queued_run_after', 'job', ['run_after', 'id'],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    # Stale-worker recovery scan
+    op.create_index(
+        'ix_job_running_heartbeat', 'job', ['heartbeat_at'],
+        postgresql_where=sa.text("status = 'running'"),
+    )
+    # Jobs left running by the in-process runner cannot resume; queue them again
+    op.execute("UPDATE job SET status = 'queued' WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_running_heartbeat', table_name='job')
+    op.drop_index('ix_job_queued_run_after', table_name='job')
+    op.drop_column('job', 'cancel_requested')
+    op.drop_column('job', 'heartbeat_at')
+    op.drop_column('job', 'locked_by')
+    op.drop_column('job', 'run_after')
+    op.drop_column('job', 'max_attempts')
+    op.drop_column('job', 'attempts')
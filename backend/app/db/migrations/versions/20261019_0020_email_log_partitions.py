@@ -0,0 +1,190 @@
+import hashlib
+import json
+import zlib
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '20261019_0020'
+down_revision = '20261019_0019'
+branch_labels = None
+depends_on = None
+
+BATCH = 1000
+PARTITIONS_AHEAD = 2
+
+# Frozen copies of app.integrations.email.bodies helpers; the stored hashes must match them
+def _hash(text, html):
+    return hashlib.sha256(json.dumps([text, html]).encode('utf-8')).hexdigest()
+
+
+def _pack(value):
+    return None if value is None else zlib.compress(value.encode('utf-8'))
+
+
+def _unpack(value):
+    return None if value is None else zlib.decompress(value).decode('utf-8')
+
+
+def _add_months(d, n):
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+_old = sa.table(
+    'email_log_unpartitioned',
+    sa.column('id'), sa.column('to_email'), sa.column('subject'), sa.column('text_body'), sa.column('html_body'),
+    sa.column('template_name'), sa.column('context', postgresql.JSONB), sa.column('status'), sa.column('error_message'),
+    sa.column('event_id'), sa.column('ticket_id'), sa.column('purchase_id'), sa.column('created_at'),
+)
+_new = sa.table(
+    'email_log',
+    sa.column('id'), sa.column('to_email'), sa.column('subject'), sa.column('body_hash'),
+    sa.column('template_name'), sa.column('context', postgresql.JSONB), sa.column('status'), sa.column('error_message'),
+    sa.column('event_id'), sa.column('ticket_id'), sa.column('purchase_id'), sa.column('created_at'),
+)
+_body = sa.table('email_body', sa.column('hash'), sa.column('text_z'), sa.column('html_z'), sa.column('last_used_at'))
+_META = ('id', 'to_email', 'subject', 'template_name', 'context', 'status', 'error_message', 'event_id', 'ticket_id', 'purchase_id', 'created_at')
+
+
+def _set_aside_email_log() -> None:
+    # Free the names the new table's key and indexes use; keep the id sequence so ids continue
+    op.execute("ALTER SEQUENCE email_log_id_seq OWNED BY NONE")
+    op.drop_index('ix_email_log_template_created', table_name='email_log')
+    op.drop_index('ix_email_log_to_email_created', table_name='email_log')
+    op.rename_table('email_log', 'email_log_unpartitioned')
+    op.execute("ALTER TABLE email_log_unpartitioned RENAME CONSTRAINT email_log_pkey TO email_log_unpartitioned_pkey")
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_body',
+        sa.Column('hash', sa.String(length=64), primary_key=True),
+        sa.Column('text_z', sa.LargeBinary(), nullable=False),
+        sa.Column('html_z', sa.LargeBinary(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+    op.create_index('ix_email_body_last_used_at', 'email_body', ['last_used_at'])
+
+    _set_aside_email_log()
+    op.create_table(
+        'email_log',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('email_log_id_seq')"), nullable=False),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.Text(), nullable=False),
+        sa.Column('body_hash', sa.String(length=64), nullable=True),
+        sa.Column('template_name', sa.String(length=64), nullable=False),
+        sa.Column('context', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('event_id', sa.Integer(), nullable=True),
+        sa.Column('ticket_id', sa.Integer(), nullable=True),
+        sa.Column('purchase_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'created_at', name='email_log_pkey'),
+        sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.ForeignKeyConstraint(['purchase_id'], ['purchase.id'], ),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.execute("ALTER SEQUENCE email_log_id_seq OWNED BY email_log.id")
+    op.create_index('ix_email_log_to_email_created', 'email_log', ['to_email', 'created_at'])
+    op.create_index('ix_email_log_template_created', 'email_log', ['template_name', 'created_at'])
+
+    bind = op.get_bind()
+    first = bind.execute(sa.text("SELECT min(created_at) FROM email_log_unpartitioned")).scalar()
+    now = datetime.now(timezone.utc)
+    month = date((first or now).year, (first or now).month, 1)
+    last = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE email_log_{month.year}{month.month:02d} PARTITION OF email_log"
+            f" FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE email_log_default PARTITION OF email_log DEFAULT")
+
+    # Copy in id batches, storing each distinct body once
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(_old).where(_old.c.id > last_id).order_by(_old.c.id).limit(BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        bodies = {}
+        logs = []
+        for r in rows:
+            h = _hash(r['text_body'], r['html_body'])
+            prev = bodies.get(h)
+            if prev is None:
+                bodies[h] = {'hash': h, 'text_z': _pack(r['text_body']), 'html_z': _pack(r['html_body']), 'last_used_at': r['created_at']}
+            else:
+                prev['last_used_at'] = max(prev['last_used_at'], r['created_at'])
+            logs.append({**{k: r[k] for k in _META}, 'body_hash': h})
+        stmt = postgresql.insert(_body).values(list(bodies.values()))
+        bind.execute(stmt.on_conflict_do_update(
+            index_elements=['hash'],
+            set_={'last_used_at': sa.func.greatest(_body.c.last_used_at, stmt.excluded.last_used_at)},
+        ))
+        bind.execute(sa.insert(_new).values(logs))
+
+    op.drop_table('email_log_unpartitioned')
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE email_log_id_seq OWNED BY NONE")
+    op.drop_index('ix_email_log_template_created', table_name='email_log')
+    op.drop_index('ix_email_log_to_email_created', table_name='email_log')
+    op.rename_table('email_log', 'email_log_partitioned')
+    op.execute("ALTER TABLE email_log_partitioned RENAME CONSTRAINT email_log_pkey TO email_log_partitioned_pkey")
+    op.create_table(
+        'email_log',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('email_log_id_seq')"), primary_key=True),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.Text(), nullable=False),
+        sa.Column('text_body', sa.Text(), nullable=False),
+        sa.Column('html_body', sa.Text(), nullable=True),
+        sa.Column('template_name', sa.String(length=64), nullable=False),
+        sa.Column('context', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('event_id', sa.Integer(), nullable=True),
+        sa.Column('ticket_id', sa.Integer(), nullable=True),
+        sa.Column('purchase_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.ForeignKeyConstraint(['purchase_id'], ['purchase.id'], ),
+    )
+    op.execute("ALTER SEQUENCE email_log_id_seq OWNED BY email_log.id")
+
+    bind = op.get_bind()
+    part = sa.table('email_log_partitioned', *[sa.column(c.name, c.type) for c in _new.c])
+    old = sa.table('email_log', *[sa.column(c.name, c.type) for c in _old.c])
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(part, _body.c.text_z, _body.c.html_z)
+            .select_from(part.outerjoin(_body, _body.c.hash == part.c.body_hash))
+            .where(part.c.id > last_id)
+            .order_by(part.c.id)
+            .limit(BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        bind.execute(sa.insert(old).values([
+            # Pruned bodies come back empty
+            {**{k: r[k] for k in _META}, 'text_body': _unpack(r['text_z']) or '', 'html_body': _unpack(r['html_z'])}
+            for r in rows
+        ]))
+
+    op.drop_table('email_log_partitioned')
+    op.drop_table('email_body')
+    op.create_index('ix_email_log_to_email_created', 'email_log', ['to_email', 'created_at'])
+    op.create_index('ix_email_log_template_created', 'email_log', ['template_name', 'created_at'])
@@ -0,0 +1,37 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_0021'
+down_revision = '20261019_0020'
+branch_labels = None
+depends_on = None
+
+# Each serves one /admin/email_logs filter in (created_at, id) order, so a page is an index range scan
+_REFS = ('event_id', 'ticket_id', 'purchase_id')
+
+
+def upgrade() -> None:
+    op.create_index('ix_email_log_created_id', 'email_log', ['created_at', 'id'])
+    op.create_index('ix_email_log_status_created', 'email_log', ['status', 'created_at', 'id'])
+    for col in _REFS:
+        op.create_index(
+            f'ix_email_log_{col.removesuffix("_id")}_created', 'email_log', [col, 'created_at', 'id'],
+            postgresql_where=sa.text(f'{col} IS NOT NULL'),
+        )
+    # Recipient and template indexes gain the id tiebreaker
+    op.drop_index('ix_email_log_to_email_created', table_name='email_log')
+    op.create_index('ix_email_log_to_email_created', 'email_log', ['to_email', 'created_at', 'id'])
+    op.drop_index('ix_email_log_template_created', table_name='email_log')
+    op.create_index('ix_email_log_template_created', 'email_log', ['template_name', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_log_template_created', table_name='email_log')
+    op.create_index('ix_email_log_template_created', 'email_log', ['template_name', 'created_at'])
+    op.drop_index('ix_email_log_to_email_created', table_name='email_log')
+    op.create_index('ix_email_log_to_email_created', 'email_log', ['to_email', 'created_at'])
+    for col in reversed(_REFS):
+        op.drop_index(f'ix_email_log_{col.removesuffix("_id")}_created', table_name='email_log')
+    op.drop_index('ix_email_log_status_created', table_name='email_log')
+    op.drop_index('ix_email_log_created_id', table_name='email_log')
@@ -0,0 +1,123 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_0022'
+down_revision = '20261019_0021'
+branch_labels = None
+depends_on = None
+
+# The 0013 triggers recomputed contact_stats inline, locking the buyer's and
+# holder's rows FOR UPDATE until commit: concurrent checkouts for one buyer
+# serialised on that row, and transactions touching (A, B) and (B, A) in
+# separate statements could deadlock. The triggers now only append the
+# affected contact ids to contact_stats_dirty, which takes no locks a writer
+# can wait on; drain_contact_stats() recomputes them later, one batch per
+# statement, so every lock it takes is taken in id order within that statement.
+
+_TICKET_IDS = """
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT n.holder_contact_id FROM new_rows n
+                    UNION SELECT p.buyer_contact_id FROM new_rows n JOIN purchase p ON p.id = n.purchase_id
+                ) s(x) WHERE x IS NOT NULL;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT o.holder_contact_id FROM old_rows o
+                    UNION SELECT p.buyer_contact_id FROM old_rows o JOIN purchase p ON p.id = o.purchase_id
+                ) s(x) WHERE x IS NOT NULL;
+            ELSE
+                -- Only rows whose rollup inputs changed (payment/delivery status flips are common and irrelevant)
+                WITH changed AS (
+                    SELECT o.holder_contact_id AS old_holder, n.holder_contact_id AS new_holder,
+                           o.purchase_id AS old_purchase, n.purchase_id AS new_purchase
+                    FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.holder_contact_id, o.purchase_id, o.event_id, o.created_at, o.checked_in_at, o.delivered_at)
+                          IS DISTINCT FROM
+                          (n.holder_contact_id, n.purchase_id, n.event_id, n.created_at, n.checked_in_at, n.delivered_at)
+                )
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT old_holder FROM changed
+                    UNION SELECT new_holder FROM changed
+                    UNION SELECT p.buyer_contact_id FROM changed c JOIN purchase p ON p.id IN (c.old_purchase, c.new_purchase)
+                ) s(x) WHERE x IS NOT NULL;
+            END IF;
+"""
+
+_PURCHASE_IDS = """
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT buyer_contact_id) INTO ids FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT buyer_contact_id) INTO ids FROM old_rows;
+            ELSE
+                SELECT array_agg(DISTINCT x) INTO ids FROM (
+                    SELECT o.buyer_contact_id FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.buyer_contact_id, o.created_at) IS DISTINCT FROM (n.buyer_contact_id, n.created_at)
+                    UNION
+                    SELECT n.buyer_contact_id FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE (o.buyer_contact_id, o.created_at) IS DISTINCT FROM (n.buyer_contact_id, n.created_at)
+                ) s(x);
+            END IF;
+"""
+
+_QUEUE = "INSERT INTO contact_stats_dirty (contact_id) SELECT x FROM unnest(ids) AS u(x) WHERE x IS NOT NULL;"
+_REFRESH = "PERFORM refresh_contact_stats(ids);"
+
+
+def _trigger_functions(action: str) -> None:
+    for fn, collect in (('contact_stats_on_ticket', _TICKET_IDS), ('contact_stats_on_purchase', _PURCHASE_IDS)):
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {fn}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            DECLARE
+                ids integer[];
+            BEGIN
+            {collect}
+                {action}
+                RETURN NULL;
+            END;
+            $$;
+            """
+        )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'contact_stats_dirty',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+    )
+    _trigger_functions(_QUEUE)
+    # Recompute up to `batch` queued contacts; returns how many queue rows were taken.
+    # SKIP LOCKED lets several drainers split the queue without waiting on each other.
+    op.execute(
+        """
+        CREATE FUNCTION drain_contact_stats(batch integer) RETURNS integer
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids integer[];
+            taken integer;
+        BEGIN
+            WITH d AS (
+                DELETE FROM contact_stats_dirty
+                WHERE id IN (
+                    SELECT id FROM contact_stats_dirty ORDER BY id LIMIT batch FOR UPDATE SKIP LOCKED
+                )
+                RETURNING contact_id
+            )
+            SELECT array_agg(DISTINCT contact_id), count(*) INTO ids, taken FROM d;
+            PERFORM refresh_contact_stats(ids);
+            RETURN taken;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS drain_contact_stats(integer)")
+    _trigger_functions(_REFRESH)
+    # Anything still queued is applied before the queue goes away
+    op.execute("SELECT refresh_contact_stats(array_agg(DISTINCT contact_id)) FROM contact_stats_dirty")
+    op.drop_table('contact_stats_dirty')
@@ -0,0 +1,22 @@
+from alembic import op
+
+
+revision = '20261019_0023'
+down_revision = '20261019_0022'
+branch_labels = None
+depends_on = None
+
+# Short contact search terms match substrings again (a sequential scan), and
+# ranking evaluates the prefix test per row, so nothing reads these btrees
+# while every contact write still maintains them.
+_PREFIX_INDEXES = ('email', 'first_name', 'last_name', 'phone')
+
+
+def upgrade() -> None:
+    for col in _PREFIX_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS ix_contact_{col}_prefix")
+
+
+def downgrade() -> None:
+    for col in _PREFIX_INDEXES:
+        op.execute(f"CREATE INDEX ix_contact_{col}_prefix ON contact (lower({col}) text_pattern_ops)")
@@ -5,3 +5,6 @@ from .person import Person  # noqa: F401
 from .ticket import Ticket  # noqa: F401
 from .contact import Contact  # noqa: F401
 from .purchase import Purchase  # noqa: F401
+from .contact_stats import ContactStats  # noqa: F401
+from .idempotency_key import IdempotencyKey  # noqa: F401
+from .job import Job  # noqa: F401
@@ -0,0 +1,25 @@
+from sqlalchemy import Integer, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class ContactStats(Base):
+    """Per-contact activity rollup used by the contacts list.
+
+    Read-only from the application: triggers on contact, ticket and purchase
+    queue affected contacts in contact_stats_dirty, and drain_contact_stats()
+    recomputes them (migrations 20261019_0013 and 20261019_0022; see
+    app.services.contact_search.refresh_queued_stats).
+    """
+
+    __tablename__ = "contact_stats"
+
+    contact_id: Mapped[int] = mapped_column(ForeignKey("contact.id", ondelete="CASCADE"), primary_key=True)
+    # Distinct events with tickets in this contact's purchases (buyer role when > 0)
+    events_purchased: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    # Tickets held (holder role when > 0)
+    tickets_held: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    last_purchase_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_ticket_activity_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_activity_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
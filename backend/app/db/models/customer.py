@@ -19,5 +19,5 @@ class Customer(Base):
     )
 
 
-Index("ix_customer_email", Customer.email)
+Index("uq_customer_email", Customer.email, unique=True)
 
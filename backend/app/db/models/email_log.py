@@ -1,17 +1,18 @@
-from sqlalchemy import Integer, String, Text, DateTime, func, ForeignKey
+from sqlalchemy import Integer, LargeBinary, String, Text, DateTime, func, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 from app.db.base import Base
 
 
 class EmailLog(Base):
+    # Range-partitioned by month on created_at (see app.services.email_log_retention)
     __tablename__ = "email_log"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     to_email: Mapped[str] = mapped_column(String(255), nullable=False)
     subject: Mapped[str] = mapped_column(Text, nullable=False)
-    text_body: Mapped[str] = mapped_column(Text, nullable=False)
-    html_body: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Rendered text/html live once per distinct body in email_body
+    body_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     template_name: Mapped[str] = mapped_column(String(64), nullable=False)
     context: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     status: Mapped[str] = mapped_column(String(16), nullable=False, default="sent")  # sent|failed
@@ -19,5 +20,21 @@ class EmailLog(Base):
     event_id: Mapped[int | None] = mapped_column(ForeignKey("event.id"), nullable=True)
     ticket_id: Mapped[int | None] = mapped_column(ForeignKey("ticket.id"), nullable=True)
     purchase_id: Mapped[int | None] = mapped_column(ForeignKey("purchase.id"), nullable=True)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Part of the key because partitioned tables need the partition column in it
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
 
+
+# (created_at, id) plus one (<filter>, created_at, id) index per list filter are created in migration;
+# event/ticket/purchase ones are partial on NOT NULL
+
+
+class EmailBody(Base):
+    __tablename__ = "email_body"
+
+    # sha256 of the rendered text and html bodies
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # zlib-compressed UTF-8
+    text_z: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    html_z: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Bumped (at most daily) when a new log row reuses the body; retention prunes by it
+    last_used_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
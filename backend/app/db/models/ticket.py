@@ -53,6 +53,8 @@ class Ticket(Base):
     assigned_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     delivered_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     checked_in_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Unpaid reservations are released by the hold sweeper after this time
+    hold_expires_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     attendance_refunded: Mapped[bool] = mapped_column(default=False, nullable=False)
     holder_contact_id: Mapped[int | None] = mapped_column(ForeignKey("contact.id", ondelete="SET NULL"), nullable=True)
     purchase_id: Mapped[int | None] = mapped_column(ForeignKey("purchase.id", ondelete="SET NULL"), nullable=True)
@@ -72,4 +74,5 @@ class Ticket(Base):
         Index("ix_ticket_customer_id", "customer_id"),
         Index("ix_ticket_ticket_type_id", "ticket_type_id"),
         # partial unique index for event+ticket_number will be created in migration
+        # partial index on hold_expires_at (non-null only) is created in migration
     )
@@ -0,0 +1,148 @@
+"""Per-request SQL accounting.
+
+Cursor-level SQLAlchemy hooks record every statement executed while a request
+is in flight. The HTTP middleware (app.api.middleware) opens a collector per
+request, publishes the totals as a Server-Timing header and folds them into
+per-route aggregates exposed at /admin/query_stats.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Keep statements short in headers/logs; full SQL for bulk inserts can be huge.
+_STATEMENT_PREVIEW = 500
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+    # Only populated when the slow-request log is enabled
+    statements: list[tuple[float, str]] | None = None
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement[:_STATEMENT_PREVIEW]
+        if self.statements is not None:
+            self.statements.append((elapsed_ms, statement[:_STATEMENT_PREVIEW]))
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def begin(keep_statements: bool = False) -> Token:
+    """Start collecting for the current context (request)."""
+    return _current.set(QueryStats(statements=[] if keep_statements else None))
+
+
+def end(token: Token) -> QueryStats | None:
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0
+    stats.record(statement, elapsed_ms)
+
+
+def _handle_error(exception_context):
+    # Drop the pending start marker so the stack stays balanced after failures
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def install(engine: Engine) -> None:
+    """Attach the cursor hooks to an engine (idempotent)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@dataclass
+class RouteQueryStats:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_ms: float = 0.0
+    max_db_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+
+
+@dataclass
+class QueryStatsRegistry:
+    """Process-wide per-route aggregates."""
+
+    routes: dict[str, RouteQueryStats] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def observe(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            agg = self.routes.get(route)
+            if agg is None:
+                agg = self.routes[route] = RouteQueryStats()
+            agg.requests += 1
+            agg.queries += stats.count
+            agg.max_queries = max(agg.max_queries, stats.count)
+            agg.db_ms += stats.total_ms
+            agg.max_db_ms = max(agg.max_db_ms, stats.total_ms)
+            if stats.slowest_ms >= agg.slowest_ms and stats.slowest_statement:
+                agg.slowest_ms = stats.slowest_ms
+                agg.slowest_statement = stats.slowest_statement
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            items = list(self.routes.items())
+        out = []
+        for route, agg in items:
+            out.append({
+                "route": route,
+                "requests": agg.requests,
+                "queries": agg.queries,
+                "avg_queries": round(agg.queries / agg.requests, 2) if agg.requests else 0,
+                "max_queries": agg.max_queries,
+                "db_ms": round(agg.db_ms, 2),
+                "avg_db_ms": round(agg.db_ms / agg.requests, 2) if agg.requests else 0,
+                "max_db_ms": round(agg.max_db_ms, 2),
+                "slowest_ms": round(agg.slowest_ms, 2),
+                "slowest_statement": agg.slowest_statement,
+            })
+        out.sort(key=lambda r: r["queries"], reverse=True)
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+
+
+registry = QueryStatsRegistry()
@@ -0,0 +1,71 @@
+"""Deduplicated, compressed storage for rendered email bodies.
+
+A log row keeps only `body_hash`; the text and html it refers to are stored
+once per distinct pair in `email_body`, zlib-compressed. Identical renders
+(test emails, reminders, the same notice to many holders) share one row.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.models.email_log import EmailBody
+
+# How stale last_used_at may get before a reuse refreshes it; retention allows for it
+TOUCH_AFTER = timedelta(days=1)
+
+
+def body_hash(text: str, html: str | None) -> str:
+    return hashlib.sha256(json.dumps([text, html]).encode("utf-8")).hexdigest()
+
+
+def pack(value: str | None) -> bytes | None:
+    return None if value is None else zlib.compress(value.encode("utf-8"))
+
+
+def unpack(value: bytes | None) -> str | None:
+    return None if value is None else zlib.decompress(value).decode("utf-8")
+
+
+def store_bodies(conn: Connection, rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Upsert the bodies of log rows in one statement; returns the rows with `body_hash` in place of the bodies."""
+    out: list[dict[str, Any]] = []
+    bodies: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        row = dict(row)
+        text, html = row.pop("text_body"), row.pop("html_body")
+        h = body_hash(text, html)
+        if h not in bodies:
+            bodies[h] = {"hash": h, "text_z": pack(text), "html_z": pack(html), "last_used_at": row["created_at"]}
+        else:
+            bodies[h]["last_used_at"] = max(bodies[h]["last_used_at"], row["created_at"])
+        row["body_hash"] = h
+        out.append(row)
+    if bodies:
+        stmt = pg_insert(EmailBody).values(list(bodies.values()))
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[EmailBody.hash],
+                set_={"last_used_at": stmt.excluded.last_used_at},
+                where=EmailBody.last_used_at < stmt.excluded.last_used_at - TOUCH_AFTER,
+            )
+        )
+    return out
+
+
+def load_body(db: Session, hash_: str | None) -> tuple[str | None, str | None]:
+    """(text, html) for a log row's body_hash; (None, None) once pruned."""
+    if not hash_:
+        return None, None
+    row = db.execute(select(EmailBody.text_z, EmailBody.html_z).where(EmailBody.hash == hash_)).first()
+    if row is None:
+        return None, None
+    return unpack(row.text_z), unpack(row.html_z)
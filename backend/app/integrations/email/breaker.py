@@ -0,0 +1,145 @@
+"""Per-transport circuit breaker and adaptive send timeout.
+
+After EMAIL_BREAKER_FAILURE_THRESHOLD consecutive provider failures the
+breaker opens and sends fail immediately instead of waiting on a provider
+that is down. Every EMAIL_BREAKER_RESET_SECONDS it half-opens and lets a
+single trial send through: success closes it, failure opens it again.
+
+The timeout handed to the transport follows observed latency the way TCP's
+retransmission timer does: an EWMA of successful send latency plus four
+times its mean deviation, clamped to [EMAIL_TIMEOUT_MIN_SECONDS,
+EMAIL_TIMEOUT_MAX_SECONDS]. Each timeout doubles it (up to the maximum) until
+the next success, so a provider that has merely slowed down is not cut off.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core import metrics
+from app.core.config import settings
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0.0, HALF_OPEN: 1.0, OPEN: 2.0}
+
+# EWMA weights for latency and its deviation (RFC 6298's alpha and beta)
+ALPHA = 0.125
+BETA = 0.25
+# Successful sends before the estimate replaces the maximum timeout
+WARMUP_SAMPLES = 5
+
+
+class BreakerOpen(Exception):
+    """Raised by `CircuitBreaker.acquire` while sends to the transport are short-circuited."""
+
+
+class AdaptiveTimeout:
+    def __init__(self, minimum: float, maximum: float) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self._mean: float | None = None
+        self._dev = 0.0
+        self._samples = 0
+        self._backoff = 1.0
+        self._lock = threading.Lock()
+
+    def current(self) -> float:
+        with self._lock:
+            if self._mean is None or self._samples < WARMUP_SAMPLES:
+                return self.maximum
+            estimate = (self._mean + 4 * self._dev) * self._backoff
+        return min(max(estimate, self.minimum), self.maximum)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            if self._mean is None:
+                self._mean, self._dev = latency, latency / 2
+            else:
+                self._dev = (1 - BETA) * self._dev + BETA * abs(self._mean - latency)
+                self._mean = (1 - ALPHA) * self._mean + ALPHA * latency
+            self._samples += 1
+            self._backoff = 1.0
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self._backoff = min(self._backoff * 2, self.maximum / self.minimum)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, failure_threshold: int, reset_after: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Admit one send or raise BreakerOpen; after admission call `succeeded` or `failed` exactly once."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_after:
+                self._set(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise BreakerOpen(f"{self.name} circuit open")
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != CLOSED:
+                self._set(CLOSED)
+
+    def failed(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != OPEN:
+                    self._set(OPEN)
+
+    def _set(self, state: str) -> None:
+        self.state = state
+        metrics.EMAIL_BREAKER_TRANSITIONS.inc(transport=self.name, state=state)
+
+
+class TransportGuard:
+    """Breaker and timeout for one transport."""
+
+    def __init__(self, name: str) -> None:
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.email_breaker_failure_threshold,
+            reset_after=settings.email_breaker_reset_seconds,
+        )
+        self.timeout = AdaptiveTimeout(settings.email_timeout_min_seconds, settings.email_timeout_max_seconds)
+
+
+_guards: dict[str, TransportGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard(transport: str) -> TransportGuard:
+    with _guards_lock:
+        g = _guards.get(transport)
+        if g is None:
+            g = _guards[transport] = TransportGuard(transport)
+        return g
+
+
+def states() -> list[tuple[dict, float]]:
+    with _guards_lock:
+        items = list(_guards.items())
+    return [({"transport": name}, _STATE_VALUES[g.breaker.state]) for name, g in items]
+
+
+def timeouts() -> list[tuple[dict, float]]:
+    with _guards_lock:
+        items = list(_guards.items())
+    return [({"transport": name}, g.timeout.current()) for name, g in items]
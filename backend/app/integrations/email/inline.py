@@ -0,0 +1,88 @@
+"""Inline QR images for outgoing email.
+
+Ticket and payment emails point their QR `<img>` at our own `/qr` endpoint.
+Left as links, every open of the email (and every image proxy refetch) is a
+request to the API, concentrated right before doors open. At send time
+`embed_qr_images` renders each of those QRs once, swaps the `src` for a
+`cid:` reference and returns the PNGs for the transport to attach as inline
+parts, so opening the email costs the API nothing and works offline.
+
+Only the delivered message changes: the logged html keeps the `/qr` links,
+which is what the admin preview renders.
+"""
+from __future__ import annotations
+
+import hashlib
+import html as htmllib
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+from app.services.qr import renderer as qr_renderer
+
+_SRC_RE = re.compile(r'src="([^"]+)"')
+# Links ask for scale 6; cap what an inline part can cost
+MAX_SCALE = 10
+
+
+@dataclass(frozen=True)
+class InlineImage:
+    cid: str
+    content: bytes
+    subtype: str = "png"
+
+    @property
+    def filename(self) -> str:
+        return f"{self.cid.split('@', 1)[0]}.{self.subtype}"
+
+
+def _api_origin() -> str:
+    return os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000")).rstrip("/")
+
+
+@lru_cache(maxsize=1024)
+def render_qr_png(data: str, scale: int) -> bytes:
+    # In the QR process pool, so sender threads never hold the GIL encoding PNGs
+    return qr_renderer.render(data, scale, "png")
+
+
+def _qr_params(url: str, origin: str) -> tuple[str, int] | None:
+    """(data, scale) when `url` is one of our /qr links, else None."""
+    if not url.startswith(origin + "/qr?"):
+        return None
+    query = parse_qs(urlsplit(url).query)
+    data = (query.get("data") or [""])[0]
+    if not data:
+        return None
+    try:
+        scale = int((query.get("scale") or ["4"])[0])
+    except ValueError:
+        scale = 4
+    return data, min(max(scale, 1), MAX_SCALE)
+
+
+def embed_qr_images(html: str | None) -> tuple[str | None, list[InlineImage]]:
+    """Replace our /qr image links with cid: references; returns the new html and the images to attach."""
+    if not html or "/qr?" not in html:
+        return html, []
+    origin = _api_origin()
+    images: dict[str, InlineImage] = {}
+
+    def repl(m: re.Match) -> str:
+        url = htmllib.unescape(m.group(1))
+        params = _qr_params(url, origin)
+        if params is None:
+            return m.group(0)
+        data, scale = params
+        cid = f"qr-{hashlib.sha1(f'{scale}:{data}'.encode('utf-8')).hexdigest()[:16]}@tickets"
+        if cid not in images:
+            try:
+                images[cid] = InlineImage(cid, render_qr_png(data, scale))
+            except Exception:
+                # Unencodable data: leave the link as it was
+                return m.group(0)
+        return f'src="cid:{cid}"'
+
+    return _SRC_RE.sub(repl, html), list(images.values())
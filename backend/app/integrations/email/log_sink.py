@@ -0,0 +1,202 @@
+"""Buffered, transaction-aware writer for email_log rows.
+
+`send_and_log` used to add its log row to the caller's session and commit,
+which committed whatever business changes the caller had pending and cost a
+round trip per email. Log rows now go through `sink` instead:
+
+- When the caller's session is inside a transaction, the row waits in
+  `session.info` until that transaction ends, then goes to the sink. That
+  includes rollbacks and read-only sessions closed without a commit: the
+  email did go out.
+- Otherwise the row goes straight to the sink.
+
+The sink is a bounded queue drained by one background thread, which writes up
+to `email_log_batch_size` rows per multi-row INSERT on its own connection
+(bodies are compressed and upserted into email_body in the same transaction).
+`put` never blocks: when the queue is full the row is dropped and counted in
+`email_log_dropped_total`, so a slow database can delay logs but never a
+request. A batch the database rejects (typically a ticket or purchase that was
+rolled back) is retried row by row with those references moved into
+`context`.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "email_log_pending"
+# Columns that may reference rows the caller's transaction rolled back
+_TX_REFS = ("ticket_id", "purchase_id")
+
+
+def log_row(
+    *,
+    to_email: str,
+    subject: str,
+    text: str,
+    html: str | None,
+    template_name: str,
+    context: dict[str, Any] | None,
+    ok: bool,
+    related: dict[str, Any] | None,
+    error: str | None = None,
+) -> dict[str, Any]:
+    related = related or {}
+    return {
+        "to_email": to_email,
+        "subject": subject,
+        "text_body": text,
+        "html_body": html,
+        "template_name": template_name,
+        "context": context or {},
+        "status": "sent" if ok else "failed",
+        "error_message": error,
+        "event_id": related.get("event_id"),
+        "ticket_id": related.get("ticket_id"),
+        "purchase_id": related.get("purchase_id"),
+        # Stamped at send time; the row may be written a little later
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _detach_refs(row: dict[str, Any]) -> dict[str, Any]:
+    refs = {k: row[k] for k in _TX_REFS if row.get(k) is not None}
+    if not refs:
+        return row
+    return {**row, **{k: None for k in refs}, "context": {**(row["context"] or {}), **refs}}
+
+
+class EmailLogSink:
+    def __init__(self, maxsize: int, batch_size: int, interval: float) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def put(self, row: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            metrics.EMAIL_LOG_DROPPED.inc(reason="queue_full")
+            logger.warning("Email log queue full; dropped log for %s (%s)", row.get("to_email"), row.get("template_name"))
+            return
+        self._ensure_started()
+
+    def record(self, db: Session | None, row: dict[str, Any]) -> None:
+        """Queue `row` now, or when `db`'s current transaction ends."""
+        if db is not None and db.in_transaction():
+            db.info.setdefault(_PENDING_KEY, []).append(row)
+        else:
+            self.put(row)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="email-log-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=timeout)
+        self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written."""
+        written = 0
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def _take(self, *, block: bool) -> list[dict[str, Any]]:
+        batch: list[dict[str, Any]] = []
+        try:
+            batch.append(self._queue.get(timeout=self.interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict[str, Any]]) -> int:
+        from app.db.models.email_log import EmailLog
+        from app.db.session import engine
+        from app.integrations.email.bodies import store_bodies
+
+        table = EmailLog.__table__
+        with self._write_lock:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(table).values(store_bodies(conn, batch)))
+                return len(batch)
+            except Exception:
+                logger.exception("Email log batch insert failed; retrying %d rows one by one", len(batch))
+            written = 0
+            for row in batch:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(table).values(store_bodies(conn, [_detach_refs(row)])))
+                    written += 1
+                except Exception as exc:
+                    metrics.EMAIL_LOG_DROPPED.inc(reason="error")
+                    logger.warning("Dropped email log for %s (%s): %s", row.get("to_email"), row.get("template_name"), exc)
+            return written
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take(block=True)
+            if batch:
+                self._write(batch)
+
+
+sink = EmailLogSink(
+    maxsize=settings.email_log_queue_size,
+    batch_size=settings.email_log_batch_size,
+    interval=settings.email_log_flush_interval_seconds,
+)
+# Scripts and one-off commands exit without a shutdown hook
+atexit.register(sink.flush)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed(session: Session) -> None:
+    # Releasing a SAVEPOINT also fires after_commit; the outer transaction may still roll back
+    if session.in_nested_transaction():
+        return
+    for row in session.info.pop(_PENDING_KEY, ()):
+        sink.put(row)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _queue_uncommitted(session: Session, transaction: SessionTransaction) -> None:
+    # Rolled back or closed uncommitted; after a commit the list is already gone
+    if transaction.parent is not None:
+        return
+    for row in session.info.pop(_PENDING_KEY, ()):
+        sink.put(row)
@@ -5,6 +5,7 @@ TEMPLATE_CODES = {
     'ticket_email': '003_ticket_email',
     'unassign_email': '004_unassign_email',
     'refund_initiated_email': '005_refund_initiated_email',
+    'purchase_tickets_email': '006_purchase_tickets_email',
 }
 
 
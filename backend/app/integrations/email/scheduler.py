@@ -0,0 +1,235 @@
+"""Rate-limited, prioritised email send queue.
+
+Every send goes through `SendScheduler.submit`, which returns a Future. A
+small pool of sender threads takes messages in lane order (TICKET before
+TRANSACTIONAL before BULK, FIFO within a lane) and only when the active
+transport's token bucket has a token, so a mass resend is paced to the
+provider's quota and a door-time ticket email overtakes everything queued
+behind it.
+
+Lanes come from the template (`ticket_email` and `purchase_tickets_email`
+are TICKET, `unassign_email` is BULK, everything else TRANSACTIONAL) unless
+the caller runs inside `email_lane(BULK)`, which bulk jobs and sweepers use so
+their ticket emails stay behind interactive ones.
+
+Queued messages are coalesced per recipient: a message with the same
+recipient, template and ticket/purchase (or identical content when it has
+neither) as one still waiting replaces it in place, taking the better of the
+two lanes. Only the newest version goes out; every submitter's Future gets
+the result, marked `coalesced` for the ones that were superseded.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from app.core import metrics
+
+TICKET, TRANSACTIONAL, BULK = 0, 1, 2
+LANE_NAMES = {TICKET: "ticket", TRANSACTIONAL: "transactional", BULK: "bulk"}
+TEMPLATE_LANES = {"ticket_email": TICKET, "purchase_tickets_email": TICKET, "unassign_email": BULK}
+
+_lane_override: ContextVar[Optional[int]] = ContextVar("email_lane", default=None)
+
+
+@contextmanager
+def email_lane(lane: int) -> Iterator[None]:
+    """Send every email submitted inside the block in `lane`."""
+    token = _lane_override.set(lane)
+    try:
+        yield
+    finally:
+        _lane_override.reset(token)
+
+
+def lane_for(template_name: str) -> int:
+    override = _lane_override.get()
+    if override is not None:
+        return override
+    return TEMPLATE_LANES.get(template_name, TRANSACTIONAL)
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    error: Optional[str] = None
+    # True when a newer queued message for the same recipient and subject matter went out instead
+    coalesced: bool = False
+
+
+@dataclass
+class Message:
+    to_email: str
+    subject: str
+    text: str
+    html: Optional[str]
+    template_name: str
+    related: dict[str, Any] = field(default_factory=dict)
+
+    def coalesce_key(self) -> tuple:
+        ref = self.related.get("ticket_id") or self.related.get("purchase_id")
+        if ref:
+            return (self.to_email.lower(), self.template_name, ref)
+        return (self.to_email.lower(), self.template_name, self.subject, self.text, self.html)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._at = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available. Caller serialises."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._at) * self.rate)
+        self._at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def refund(self) -> None:
+        self._tokens = min(self.burst, self._tokens + 1)
+
+
+class _Entry:
+    __slots__ = ("message", "lane", "futures", "queued_at", "started")
+
+    def __init__(self, message: Message, lane: int) -> None:
+        self.message = message
+        self.lane = lane
+        self.futures: list[Future] = []
+        self.queued_at = time.monotonic()
+        self.started = False
+
+
+class SendScheduler:
+    def __init__(
+        self,
+        deliver: Callable[[str, str, str, Optional[str]], tuple[bool, Optional[str]]],
+        transport: Callable[[], str],
+        *,
+        rates: dict[str, float],
+        threads: int,
+    ) -> None:
+        self._deliver = deliver
+        self._transport = transport
+        self._rates = rates
+        self._buckets: dict[str, TokenBucket] = {}
+        self.threads = threads
+        self._heap: list[tuple[int, int, _Entry]] = []
+        self._pending: dict[tuple, _Entry] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._workers: list[threading.Thread] = []
+
+    def submit(self, message: Message, lane: Optional[int] = None) -> Future:
+        lane = lane_for(message.template_name) if lane is None else lane
+        future: Future = Future()
+        key = message.coalesce_key()
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is not None and not entry.started:
+                metrics.EMAIL_COALESCED.inc(lane=LANE_NAMES[lane])
+                entry.message = message
+                entry.futures.append(future)
+                if lane < entry.lane:
+                    # Re-queue in the better lane; the old heap slot is skipped when popped
+                    metrics.EMAIL_QUEUE_DEPTH.dec(lane=LANE_NAMES[entry.lane])
+                    metrics.EMAIL_QUEUE_DEPTH.inc(lane=LANE_NAMES[lane])
+                    entry.lane = lane
+                    heapq.heappush(self._heap, (lane, next(self._seq), entry))
+                return future
+            entry = _Entry(message, lane)
+            entry.futures.append(future)
+            self._pending[key] = entry
+            heapq.heappush(self._heap, (lane, next(self._seq), entry))
+            metrics.EMAIL_QUEUE_DEPTH.inc(lane=LANE_NAMES[lane])
+            self._ensure_started()
+            self._cond.notify()
+        return future
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._stop = False
+        for i in range(max(self.threads, 1)):
+            t = threading.Thread(target=self._run, name=f"email-sender-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Stop the senders once the queue is drained (or `timeout` passes)."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            workers, self._workers = self._workers, []
+        deadline = time.monotonic() + timeout
+        for t in workers:
+            t.join(timeout=max(deadline - time.monotonic(), 0))
+
+    def _bucket(self) -> TokenBucket:
+        name = self._transport()
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            rate = self._rates.get(name, 0.0)
+            bucket = self._buckets[name] = TokenBucket(rate, burst=rate * 2)
+        return bucket
+
+    def _next(self) -> Optional[_Entry]:
+        """Block until a message may be sent now; None once stopped and drained."""
+        with self._cond:
+            while True:
+                while self._heap and (self._heap[0][2].started or self._heap[0][0] != self._heap[0][2].lane):
+                    heapq.heappop(self._heap)  # already sent, or moved to a better lane
+                if not self._heap:
+                    if self._stop:
+                        return None
+                    self._cond.wait()
+                    continue
+                wait = self._bucket().take()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, entry = heapq.heappop(self._heap)
+                entry.started = True
+                self._pending.pop(entry.message.coalesce_key(), None)
+                metrics.EMAIL_QUEUE_DEPTH.dec(lane=LANE_NAMES[entry.lane])
+                # Submitters that gave up waiting cancelled their Future; from here on cancel() fails
+                entry.futures = [f for f in entry.futures if f.set_running_or_notify_cancel()]
+                if not entry.futures:
+                    self._bucket().refund()
+                    continue
+                return entry
+
+    def _run(self) -> None:
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            metrics.EMAIL_QUEUE_WAIT.observe(time.monotonic() - entry.queued_at, lane=LANE_NAMES[entry.lane])
+            m = entry.message
+            transport = self._transport()
+            started = time.perf_counter()
+            try:
+                ok, error = self._deliver(m.to_email, m.subject, m.text, m.html)
+            except Exception as exc:
+                ok, error = False, f"{exc.__class__.__name__}: {exc}"
+            metrics.EMAIL_SEND_DURATION.observe(time.perf_counter() - started, transport=transport)
+            metrics.EMAIL_SENDS.inc(transport=transport, status='sent' if ok else 'failed')
+            *superseded, latest = entry.futures
+            for f in superseded:
+                f.set_result(SendResult(ok, error, coalesced=True))
+            latest.set_result(SendResult(ok, error))
@@ -1,11 +1,20 @@
 import os
-from typing import Optional, Any
+from typing import Any, Callable, Optional
 import smtplib
 import ssl
 from email.message import EmailMessage
+import base64
 import json
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from urllib import request, error
+from app.core import metrics
+from app.core.config import settings
 from app.integrations.email import templates
+from app.integrations.email.breaker import BreakerOpen, guard
+from app.integrations.email.inline import embed_qr_images
+from app.integrations.email.log_sink import log_row, sink
+from app.integrations.email.scheduler import Message, SendResult, SendScheduler
 
 
 def _transport() -> str:
@@ -20,20 +29,59 @@ def _transport() -> str:
     return transport
 
 
-def _send_email(to_email: str, subject: str, text: str, html: Optional[str] = None) -> bool:
+class _Rejected(Exception):
+    """The provider answered but refused this message (bad address, invalid payload)."""
+
+
+def _guarded(transport: str, send: Callable[[float], None]) -> tuple[bool, Optional[str]]:
+    """Run `send(timeout)` behind the transport's circuit breaker; returns (ok, error)."""
+    g = guard(transport)
+    try:
+        g.breaker.acquire()
+    except BreakerOpen as exc:
+        metrics.EMAIL_SHORT_CIRCUITS.inc(transport=transport)
+        return False, str(exc)
+    timeout = g.timeout.current()
+    started = time.perf_counter()
+    try:
+        send(timeout)
+    except _Rejected as exc:
+        # The provider is healthy; only this message failed
+        g.breaker.succeeded()
+        return False, str(exc)
+    except Exception as exc:
+        if isinstance(exc, TimeoutError) or isinstance(getattr(exc, "reason", None), TimeoutError):
+            g.timeout.timed_out()
+            error = f"{transport} timed out after {timeout:.1f}s"
+        else:
+            error = f"{transport} {exc.__class__.__name__}: {exc}"
+        g.breaker.failed()
+        print(f"[email] {error}")
+        return False, error
+    g.timeout.observe(time.perf_counter() - started)
+    g.breaker.succeeded()
+    return True, None
+
+
+def _deliver(to_email: str, subject: str, text: str, html: Optional[str] = None) -> tuple[bool, Optional[str]]:
+    """Send one email; returns (ok, error). Provider failures are failures, never a console print."""
     transport = _transport()
 
-    def _console_fallback() -> bool:
+    def _console_fallback() -> tuple[bool, Optional[str]]:
         print("=== EMAIL (console transport) ===")
         print(f"To: {to_email}\nSubject: {subject}\n\n{text}")
         if html:
             print("--- HTML body present (not rendered in console) ---")
         print("=== END EMAIL ===")
-        return True
+        return True, None
 
     if transport == "console":
         return _console_fallback()
 
+    images = []
+    if settings.email_inline_qr and transport in ("sendgrid", "smtp"):
+        html, images = embed_qr_images(html)
+
     if transport == "sendgrid":
         api_key = os.getenv("SENDGRID_API_KEY", "").strip()
         from_addr = os.getenv("EMAIL_FROM", "no-reply@example.com").strip()
@@ -49,6 +97,17 @@ def _send_email(to_email: str, subject: str, text: str, html: Optional[str] = No
             "from": {"email": from_addr},
             "content": ([{"type": "text/plain", "value": text}] + ([{"type": "text/html", "value": html}] if html else [])),
         }
+        if images:
+            payload["attachments"] = [
+                {
+                    "content": base64.b64encode(img.content).decode("ascii"),
+                    "type": f"image/{img.subtype}",
+                    "filename": img.filename,
+                    "disposition": "inline",
+                    "content_id": img.cid,
+                }
+                for img in images
+            ]
 
         data = json.dumps(payload).encode("utf-8")
         req = request.Request(
@@ -61,24 +120,23 @@ def _send_email(to_email: str, subject: str, text: str, html: Optional[str] = No
             method="POST",
         )
 
-        try:
-            with request.urlopen(req, timeout=15) as resp:
-                # SendGrid returns 202 Accepted on success
-                if 200 <= resp.status < 300:
-                    return True
-                else:
-                    print(f"[email] SendGrid non-success status: {resp.status}; falling back to console.")
-                    return _console_fallback()
-        except error.HTTPError as e:
+        def _sendgrid(timeout: float) -> None:
             try:
-                err_body = e.read().decode("utf-8")
-            except Exception:
-                err_body = "<no body>"
-            print(f"[email] SendGrid HTTPError {e.code}: {err_body}; falling back to console.")
-            return _console_fallback()
-        except Exception as exc:
-            print(f"[email] SendGrid send failed: {exc}; falling back to console.")
-            return _console_fallback()
+                with request.urlopen(req, timeout=timeout) as resp:
+                    # SendGrid returns 202 Accepted on success
+                    if not 200 <= resp.status < 300:
+                        raise RuntimeError(f"SendGrid non-success status {resp.status}")
+            except error.HTTPError as e:
+                try:
+                    err_body = e.read().decode("utf-8")[:500]
+                except Exception:
+                    err_body = "<no body>"
+                # Throttling and server errors are the provider's; other 4xx are this message's
+                if e.code == 429 or e.code >= 500:
+                    raise RuntimeError(f"SendGrid HTTPError {e.code}: {err_body}")
+                raise _Rejected(f"SendGrid HTTPError {e.code}: {err_body}")
+
+        return _guarded("sendgrid", _sendgrid)
 
     if transport == "smtp":
         host = os.getenv("SMTP_HOST", "").strip()
@@ -102,38 +160,84 @@ def _send_email(to_email: str, subject: str, text: str, html: Optional[str] = No
         if html:
             try:
                 msg.add_alternative(html, subtype="html")
+                # QR images ride along as multipart/related parts of the html alternative
+                html_part = msg.get_payload()[-1]
+                for img in images:
+                    html_part.add_related(img.content, "image", img.subtype, cid=f"<{img.cid}>", filename=img.filename, disposition="inline")
             except Exception:
                 pass
 
-        try:
-            if port == 465:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(host, port, context=context) as server:
-                    if user and password:
-                        server.login(user, password)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(host, port, timeout=15) as server:
-                    server.ehlo()
-                    try:
-                        server.starttls(context=ssl.create_default_context())
+        def _smtp(timeout: float) -> None:
+            try:
+                if port == 465:
+                    context = ssl.create_default_context()
+                    with smtplib.SMTP_SSL(host, port, context=context, timeout=timeout) as server:
+                        if user and password:
+                            server.login(user, password)
+                        server.send_message(msg)
+                else:
+                    with smtplib.SMTP(host, port, timeout=timeout) as server:
                         server.ehlo()
-                    except Exception:
-                        # Server may not support STARTTLS; continue best-effort
-                        pass
-                    if user and password:
-                        server.login(user, password)
-                    server.send_message(msg)
-            return True
-        except Exception as exc:
-            print(f"[email] SMTP send failed: {exc}; falling back to console.")
-            return _console_fallback()
+                        try:
+                            server.starttls(context=ssl.create_default_context())
+                            server.ehlo()
+                        except Exception:
+                            # Server may not support STARTTLS; continue best-effort
+                            pass
+                        if user and password:
+                            server.login(user, password)
+                        server.send_message(msg)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as exc:
+                raise _Rejected(f"SMTP refused: {exc}")
+
+        return _guarded("smtp", _smtp)
 
     # Fallback when EMAIL_TRANSPORT is unrecognized
     print("EMAIL_TRANSPORT set to unsupported value; defaulting to console")
     return _console_fallback()
 
 
+scheduler = SendScheduler(
+    _deliver,
+    _transport,
+    rates=settings.email_rate_limits,
+    threads=settings.email_send_threads,
+)
+
+
+def _wait(future: Future) -> SendResult:
+    try:
+        return future.result(timeout=settings.email_queue_timeout_seconds)
+    except FutureTimeout:
+        # Give up only if it has not started; a send in progress is waited for
+        if future.cancel():
+            return SendResult(False, f"not sent: queued longer than {settings.email_queue_timeout_seconds:g}s")
+        return future.result()
+
+
+def _send_email(to_email: str, subject: str, text: str, html: Optional[str] = None, template_name: str = "") -> bool:
+    return _wait(scheduler.submit(Message(to_email, subject, text, html, template_name))).ok
+
+
+def _log(db: Any, message: Message, context: Optional[dict[str, Any]], result: SendResult) -> None:
+    if db is None:
+        return
+    if result.coalesced:
+        context = {**(context or {}), "coalesced": True}
+    # Written after the caller's transaction ends; never commits it (see log_sink)
+    sink.record(db, log_row(
+        to_email=message.to_email,
+        subject=message.subject,
+        text=message.text,
+        html=message.html,
+        template_name=message.template_name,
+        context=context,
+        ok=result.ok,
+        error=result.error,
+        related=message.related,
+    ))
+
+
 def send_and_log(
     *,
     to_email: str,
@@ -145,33 +249,24 @@ def send_and_log(
     db: Any = None,
     related: Optional[dict[str, Any]] = None,
 ) -> bool:
-    ok = _send_email(to_email, subject, text, html)
-    try:
-        if db is not None:
-            # Lazy import to avoid circular deps
-            from app.db.models.email_log import EmailLog
-            status = 'sent' if ok else 'failed'
-            ev_id = (related or {}).get('event_id')
-            ticket_id = (related or {}).get('ticket_id')
-            purchase_id = (related or {}).get('purchase_id')
-            row = EmailLog(
-                to_email=to_email,
-                subject=subject,
-                text_body=text,
-                html_body=html,
-                template_name=template_name,
-                context=context or {},
-                status=status,
-                error_message=None,
-                event_id=ev_id,
-                ticket_id=ticket_id,
-                purchase_id=purchase_id,
-            )
-            db.add(row)
-            db.commit()
-    except Exception as e:
-        print(f"[email] log failed: {e}")
-    return ok
+    message = Message(to_email, subject, text, html, template_name, related or {})
+    result = _wait(scheduler.submit(message))
+    _log(db, message, context, result)
+    return result.ok
+
+
+def send_batch_and_log(db: Any, sends: list[dict[str, Any]]) -> list[bool]:
+    """Queue several emails at once (each a dict of send_and_log arguments) and wait for all of them."""
+    queued = []
+    for kw in sends:
+        message = Message(kw["to_email"], kw["subject"], kw["text"], kw.get("html"), kw["template_name"], kw.get("related") or {})
+        queued.append((message, kw.get("context"), scheduler.submit(message)))
+    results = []
+    for message, context, future in queued:
+        result = _wait(future)
+        _log(db, message, context, result)
+        results.append(result.ok)
+    return results
 
 
 def send_payment_email(to_email: str, event_title: str, event_when: str, payment_link: str, qr_url: Optional[str] = None) -> bool:
@@ -181,12 +276,12 @@ def send_payment_email(to_email: str, event_title: str, event_when: str, payment
 
 def send_ticket_email(to_email: str, event_title: str, event_when: str, code: str, qr_url: Optional[str] = None, view_link: Optional[str] = None, ticket_number: Optional[str] = None) -> bool:
     subject, text, html = templates.ticket_email(event_title, event_when, code, qr_url, view_link, ticket_number)
-    return _send_email(to_email, subject, text, html)
+    return _send_email(to_email, subject, text, html, 'ticket_email')
 
 
 def send_unassign_email(to_email: str, event_title: str, event_when: str, reason: Optional[str] = None) -> bool:
     subject, text, html = templates.unassign_email(event_title, event_when, reason)
-    return _send_email(to_email, subject, text, html)
+    return _send_email(to_email, subject, text, html, 'unassign_email')
 
 
 def send_refund_initiated_email(to_email: str, event_title: str, event_when: str, reason: Optional[str] = None, is_comp: bool = False) -> bool:
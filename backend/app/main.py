@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.routing import APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+from sqlalchemy import text
 
 from alembic import command as alembic_command
 from alembic.config import Config as AlembicConfig
@@ -17,6 +18,20 @@ from app.api.deps import require_auth
 from app.api.routes.utils import router as utils_router
 from app.api.routes.purchases import router as purchases_router
 from app.api.routes.contacts import router as contacts_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.middleware import QueryStatsMiddleware, MetricsMiddleware
+from app.core import metrics
+from app.core.config import settings
+from app.db.listener import listener as pg_listener
+from app.db.session import SessionLocal, engine
+from app.integrations.email.log_sink import sink as email_log_sink
+from app.integrations.email.service import scheduler as email_scheduler
+from app.services.checkin_feed import feed as checkin_feed
+from app.services.qr import renderer as qr_renderer
+from app.services.email_log_retention import maintain_if_due
+from app.services.jobs import Worker
+from app.services.holds import HoldSweeper
+from app.services.maintenance import MaintenanceLoop
 
 app = FastAPI(title="FlowEvents")
 
@@ -28,7 +43,10 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Query-Count", "Idempotent-Replayed", "X-Next-Cursor"],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/health")
@@ -36,6 +54,22 @@ def health() -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
 
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """Readiness probe: only report ready when the database answers."""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        return JSONResponse({"status": "unavailable", "database": str(exc.__class__.__name__)}, status_code=503)
+    return JSONResponse({"status": "ok", "database": "ok"})
+
+
+@app.get("/metrics")
+def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root() -> JSONResponse:
     return JSONResponse({"name": "fa-tickets", "version": 1})
@@ -51,6 +85,7 @@ api.include_router(reports_router)
 api.include_router(content_router)
 api.include_router(utils_router)
 api.include_router(admin_router)
+api.include_router(jobs_router)
 
 app.include_router(api)
 
@@ -64,3 +99,76 @@ def run_migrations_on_startup() -> None:
         logging.getLogger(__name__).info("Alembic migrations applied (upgrade head)")
     except Exception as exc:
         logging.getLogger(__name__).warning("Alembic migration failed: %s", exc)
+
+
+@app.on_event("startup")
+def maintain_email_log() -> None:
+    """Make sure this month's email_log partitions exist before the first send."""
+    try:
+        with SessionLocal() as db:
+            maintain_if_due(db)
+    except Exception as exc:
+        logging.getLogger(__name__).warning("email_log maintenance failed: %s", exc)
+
+
+maintenance_loop = MaintenanceLoop(interval=settings.maintenance_interval_seconds)
+
+
+@app.on_event("startup")
+def start_maintenance_loop() -> None:
+    """Keep email_log partitions ahead of the clock for as long as the process runs."""
+    if settings.maintenance_interval_seconds > 0:
+        maintenance_loop.start()
+
+
+@app.on_event("shutdown")
+def stop_maintenance_loop() -> None:
+    maintenance_loop.stop()
+
+
+hold_sweeper = HoldSweeper(interval=settings.hold_sweep_interval_seconds)
+
+
+@app.on_event("startup")
+def start_hold_sweeper() -> None:
+    """Release expired unpaid reservations in the background (safe with several workers)."""
+    if settings.hold_sweep_interval_seconds > 0:
+        hold_sweeper.start()
+
+
+@app.on_event("shutdown")
+def stop_hold_sweeper() -> None:
+    hold_sweeper.stop()
+
+
+job_worker = Worker(concurrency=settings.job_threads)
+
+
+@app.on_event("startup")
+def start_job_worker() -> None:
+    """Run queued jobs in this process too (safe alongside `python -m app.worker` and other workers)."""
+    if settings.job_threads > 0:
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_job_worker() -> None:
+    job_worker.stop()
+
+
+@app.on_event("shutdown")
+def flush_email_log() -> None:
+    # Queued sends finish first so their log rows are flushed too
+    email_scheduler.stop()
+    email_log_sink.stop()
+
+
+@app.on_event("shutdown")
+def stop_qr_renderer() -> None:
+    qr_renderer.stop()
+
+
+@app.on_event("shutdown")
+def stop_pg_listener() -> None:
+    checkin_feed.stop()
+    pg_listener.stop()
@@ -35,3 +35,14 @@ class AssignResponse(BaseModel):
     customer_email: EmailStr
     short_code: str
     status: str
+
+
+class AssignImportRow(BaseModel):
+    """One holder in a bulk import (POST /assign/import), from a CSV row or NDJSON line."""
+    email: EmailStr
+    first_name: str | None = Field(default=None, max_length=100)
+    last_name: str | None = Field(default=None, max_length=100)
+    phone: str | None = Field(default=None, max_length=50)
+    # Ticket type id or name (case-insensitive) within the event
+    ticket_type: str | None = Field(default=None, max_length=100)
+    payment_status: Literal['unpaid','paid','waived'] | None = None
@@ -4,7 +4,11 @@ from pydantic import BaseModel, Field
 
 class CheckinRequest(BaseModel):
     event_id: int
-    code: str = Field(min_length=3, max_length=3)
+    # 3-digit short code, or the signed payload from the ticket's QR
+    code: str = Field(min_length=3, max_length=128)
+    # Optional scanner identification for the live check-in dashboard
+    gate: str | None = Field(default=None, max_length=64)
+    device: str | None = Field(default=None, max_length=64)
 
 
 class CheckinResponse(BaseModel):
@@ -15,3 +19,15 @@ class CheckinResponse(BaseModel):
     new_status: str
     checked_in_at: datetime
 
+
+
+class CheckinVerifyRequest(BaseModel):
+    event_id: int
+    code: str = Field(min_length=3, max_length=128)
+
+
+class CheckinVerifyResponse(BaseModel):
+    event_id: int
+    ticket_id: int
+    short_code: str
+    ticket_type_id: int | None = None
@@ -13,7 +13,13 @@ class EmailLogRead(BaseModel):
     ticket_id: int | None = None
     purchase_id: int | None = None
     context: dict | None = None
-    text_body: str | None = None
 
     class Config:
         from_attributes = True
+
+
+class EmailLogDetail(EmailLogRead):
+    error_message: str | None = None
+    # None once the body has been pruned by retention
+    text_body: str | None = None
+    html_body: str | None = None
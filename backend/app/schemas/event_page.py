@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+from app.schemas.event import EventRead
+from app.schemas.event_promotion import EventPromotionRead
+from app.schemas.ticket_type import TicketTypeRead
+
+
+class PublicTicketType(TicketTypeRead):
+    # None when the type has no max_quantity
+    remaining: int | None = None
+
+
+class PublicEventPage(BaseModel):
+    event: EventRead
+    ticket_types: list[PublicTicketType]
+    promotion: EventPromotionRead
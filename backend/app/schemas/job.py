@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: dict
+    progress_done: int
+    progress_total: int | None = None
+    result: dict | None = None
+    error: str | None = None
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -31,3 +31,11 @@ class AttendeeRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TicketQrRead(BaseModel):
+    ticket_id: int
+    ticket_number: str | None = None
+    short_code: str
+    # SVG markup, or base64 for PNG
+    content: str
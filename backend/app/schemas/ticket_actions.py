@@ -47,3 +47,25 @@ class ReassignResponse(BaseModel):
     customer_email: str | None = None
     holder_contact_id: int | None = None
     short_code: str | None = None
+
+
+class BulkTicketFilter(BaseModel):
+    """Selects the tickets a bulk operation applies to; omitted fields match everything."""
+    event_id: int
+    ticket_type_ids: list[int] | None = None
+    statuses: list[Literal['available','held','assigned','delivered','checked_in','void']] | None = None
+    payment_statuses: list[Literal['unpaid','paid','waived','refunding','refunded','voiding','voided']] | None = None
+
+
+class BulkRefundRequest(BaseModel):
+    filter: BulkTicketFilter
+    reason: str | None = Field(default=None, max_length=500)
+
+
+class BulkUnassignRequest(BaseModel):
+    filter: BulkTicketFilter
+    reason: str | None = Field(default=None, max_length=500)
+
+
+class BulkResendRequest(BaseModel):
+    filter: BulkTicketFilter
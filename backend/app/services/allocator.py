@@ -1,6 +1,7 @@
-from typing import Set
+from typing import Iterator, Set
 from sqlalchemy.orm import Session
 from sqlalchemy import select, text
+from app.core import metrics
 from app.db.models.ticket import Ticket
 
 
@@ -23,7 +24,8 @@ def _existing_numbers(db: Session, event_id: int) -> Set[int]:
 def allocate_next_ticket_number(db: Session, *, event_id: int) -> str:
     # Use a per-event advisory lock to avoid race conditions
     try:
-        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(event_id)})
+        with metrics.ALLOCATOR_LOCK_WAIT.time():
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(event_id)})
     except Exception:
         # If advisory lock not available, proceed best-effort
         pass
@@ -35,3 +37,16 @@ def allocate_next_ticket_number(db: Session, *, event_id: int) -> str:
         n += 1
     return str(n)
 
+
+
+def free_ticket_numbers(db: Session, *, event_id: int) -> Iterator[str]:
+    """Unused ticket numbers in allocation order, for assigning many tickets at once.
+
+    Callers must hold the per-event advisory lock for the life of the iterator.
+    """
+    used = _existing_numbers(db, event_id)
+    n = 1
+    while True:
+        if n not in used:
+            yield str(n)
+        n += 1
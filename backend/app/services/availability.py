@@ -0,0 +1,51 @@
+"""Live per-ticket-type availability for public pages."""
+from __future__ import annotations
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.db.models.ticket import Ticket
+from app.db.models.ticket_type import TicketType
+
+# Statuses that count against a ticket type's max_quantity (same set as the checkout cap checks)
+HOLDING_STATUSES = ("held", "assigned", "checked_in")
+
+
+def remaining_by_type(db: Session, event_id: int, caps: dict[int, int | None]) -> dict[int, int | None]:
+    """Remaining tickets per type in one grouped count; None means unlimited."""
+    capped = [tt_id for tt_id, cap in caps.items() if cap is not None]
+    used: dict[int, int] = {}
+    if capped:
+        used = dict(
+            db.execute(
+                select(Ticket.ticket_type_id, func.count())
+                .where(
+                    Ticket.event_id == event_id,
+                    Ticket.ticket_type_id.in_(capped),
+                    Ticket.status.in_(HOLDING_STATUSES),
+                )
+                .group_by(Ticket.ticket_type_id)
+            ).all()
+        )
+    return {
+        tt_id: (None if cap is None else max(cap - used.get(tt_id, 0), 0))
+        for tt_id, cap in caps.items()
+    }
+
+
+def event_availability(db: Session, event_id: int) -> dict[int, int | None]:
+    """Remaining tickets for every active type of an event, in one joined query."""
+    rows = db.execute(
+        select(TicketType.id, TicketType.max_quantity, func.count(Ticket.id))
+        .outerjoin(
+            Ticket,
+            and_(
+                Ticket.event_id == TicketType.event_id,
+                Ticket.ticket_type_id == TicketType.id,
+                Ticket.status.in_(HOLDING_STATUSES),
+            ),
+        )
+        .where(TicketType.event_id == event_id, TicketType.active.is_(True))
+        .group_by(TicketType.id, TicketType.max_quantity)
+    ).all()
+    return {tt_id: (None if cap is None else max(cap - used, 0)) for tt_id, cap, used in rows}
@@ -0,0 +1,78 @@
+"""Live ticket-type availability pushed to SSE watchers.
+
+Ticket and ticket_type triggers NOTIFY `ticket_availability` with the event
+id (migration 20261019_0017). Each worker has one LISTEN connection
+(app.db.listener); on a batch of notifications it recomputes availability
+once per watched event and publishes only the types whose remaining count
+changed. Watchers therefore cost nothing on the database: the query count
+depends on the rate of changes, not on the number of open streams.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+
+from app.core.broadcast import Broadcaster
+from app.db.listener import listener
+from app.services.availability import event_availability
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ticket_availability"
+
+
+class AvailabilityFeed:
+    def __init__(self) -> None:
+        self.broadcaster = Broadcaster()
+        self._last: dict[int, dict[int, int | None]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def ensure_listening(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        listener.subscribe(CHANNEL, self._on_notify)
+
+    def snapshot(self, event_id: int) -> dict[int, int | None]:
+        """Current availability; served from memory while the event has watchers."""
+        with self._lock:
+            cached = self._last.get(event_id)
+        if cached is not None and self.broadcaster.subscriber_count(event_id):
+            return dict(cached)
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            current = event_availability(db, event_id)
+        with self._lock:
+            self._last[event_id] = current
+        return dict(current)
+
+    def _on_notify(self, payloads: list[str] | None) -> None:
+        watched = set(self.broadcaster.keys())
+        # Forget state for events nobody watches any more
+        with self._lock:
+            for stale in set(self._last) - watched:
+                del self._last[stale]
+        if payloads is None:
+            targets = watched
+        else:
+            targets = {int(p) for p in payloads if p.isdigit()} & watched
+        if not targets:
+            return
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            for event_id in targets:
+                current = event_availability(db, event_id)
+                with self._lock:
+                    previous = self._last.get(event_id, {})
+                    self._last[event_id] = current
+                changed = {tt: n for tt, n in current.items() if previous.get(tt, -1) != n}
+                removed = [tt for tt in previous if tt not in current]
+                if changed or removed:
+                    self.broadcaster.publish(event_id, {"changed": changed, "removed": removed})
+
+
+feed = AvailabilityFeed()
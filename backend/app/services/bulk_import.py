@@ -0,0 +1,332 @@
+"""Bulk holder import for comp lists and corporate blocks (POST /assign/import).
+
+Rows are parsed and validated one at a time from a CSV or NDJSON upload and
+written in chunks. Each chunk is one transaction and a fixed number of
+statements whatever its size: identities are upserted set-based, caps, short
+codes and ticket numbers are computed in memory from one read each under the
+per-event advisory lock (the same lock single-ticket code and number
+allocation takes), available tickets are claimed with SKIP LOCKED and the
+rest inserted in one multi-row INSERT. Emails are not sent here: each chunk queues one email job
+for its tickets in its own transaction, so every committed row gets its email
+even if the client disconnects mid-import.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import IO, Iterable, Iterator
+from uuid import uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models.customer import Customer
+from app.db.models.event import Event
+from app.db.models.purchase import Purchase
+from app.db.models.ticket import Ticket
+from app.db.models.ticket_type import TicketType
+from app.schemas.assign import AssignImportRow
+from app.services.allocator import free_ticket_numbers
+from app.services.availability import remaining_by_type
+from app.services.holds import hold_expiry
+from app.services.identity import PersonInput, resolve_identities
+from app.services.jobs import JobContext, enqueue, register
+from app.services.tickets import send_assignment_email
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ("row", "status", "email", "ticket_id", "short_code", "ticket_number", "error")
+
+
+@dataclass
+class _Pending:
+    row: int
+    data: AssignImportRow
+    ticket_type_id: int | None
+
+
+def _result(row: int, email: str | None, *, error: str | None = None, **fields) -> dict:
+    return {
+        "row": row,
+        "status": "error" if error else "ok",
+        "email": email,
+        "ticket_id": fields.get("ticket_id"),
+        "short_code": fields.get("short_code"),
+        "ticket_number": fields.get("ticket_number"),
+        "error": error,
+    }
+
+
+def _clean(raw: dict) -> dict:
+    # Header names are case/space-insensitive; blank cells mean "not provided"
+    out = {}
+    for k, v in raw.items():
+        if k is None:
+            continue
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            v = str(v)  # NDJSON ids and phone numbers
+        if isinstance(v, str):
+            v = v.strip() or None
+        out[str(k).strip().lower()] = v
+    if out.get("ticket_type") is None and "ticket_type_id" in out:
+        out["ticket_type"] = out.pop("ticket_type_id")
+    return out
+
+
+def iter_records(fp: IO[bytes], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (row number, cleaned record, parse error) without loading the file into memory.
+
+    Row numbers are 1-based data rows (the CSV header is not counted).
+    """
+    stream = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for n, raw in enumerate(csv.DictReader(stream), start=1):
+            yield n, _clean(raw), None
+        return
+    n = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        n += 1
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            yield n, None, "Invalid JSON"
+            continue
+        if not isinstance(raw, dict):
+            yield n, None, "Expected a JSON object"
+            continue
+        yield n, _clean(raw), None
+
+
+def _type_resolver(db: Session, event_id: int):
+    types = db.execute(select(TicketType.id, TicketType.name).where(TicketType.event_id == event_id)).all()
+    by_id = {str(tt_id): tt_id for tt_id, _ in types}
+    by_name = {name.strip().lower(): tt_id for tt_id, name in types}
+
+    def resolve(value: str | None) -> int | None:
+        if value is None:
+            return None
+        tt_id = by_id.get(value.strip()) or by_name.get(value.strip().lower())
+        if tt_id is None:
+            raise LookupError(f"Unknown ticket type '{value}' for this event")
+        return tt_id
+
+    return resolve
+
+
+def _free_codes(db: Session, event_id: int) -> list[str]:
+    used = set(
+        db.execute(
+            select(Ticket.short_code).where(Ticket.event_id == event_id, Ticket.short_code.isnot(None))
+        ).scalars()
+    )
+    free = [f"{i:03d}" for i in range(1000) if f"{i:03d}" not in used]
+    random.shuffle(free)
+    return free
+
+
+def _import_chunk(db: Session, event_id: int, chunk: list[_Pending]) -> list[dict]:
+    # Serialise with single assignments and other imports for this event
+    with metrics.ALLOCATOR_LOCK_WAIT.time():
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(event_id)})
+
+    type_ids = {p.ticket_type_id for p in chunk if p.ticket_type_id is not None}
+    caps = dict(
+        db.execute(select(TicketType.id, TicketType.max_quantity).where(TicketType.id.in_(type_ids))).all()
+    ) if type_ids else {}
+    remaining = remaining_by_type(db, event_id, caps)
+    codes = _free_codes(db, event_id)
+    numbers = free_ticket_numbers(db, event_id=event_id)
+
+    results: dict[int, dict] = {}
+    accepted: list[_Pending] = []
+    for p in chunk:
+        if len(accepted) >= len(codes):
+            results[p.row] = _result(p.row, p.data.email, error="No available short codes for event")
+            continue
+        left = remaining.get(p.ticket_type_id)
+        if left is not None:
+            if left <= 0:
+                results[p.row] = _result(p.row, p.data.email, error="Ticket type at max quantity")
+                continue
+            remaining[p.ticket_type_id] = left - 1
+        accepted.append(p)
+
+    if accepted:
+        identities = resolve_identities(
+            db,
+            [PersonInput(email=p.data.email, first_name=p.data.first_name, last_name=p.data.last_name, phone=p.data.phone) for p in accepted],
+        )
+        now = datetime.now(timezone.utc)
+        values = []
+        for p in accepted:
+            identity = identities[p.data.email]
+            payment_status = p.data.payment_status or "unpaid"
+            values.append({
+                "customer_id": identity.customer_id,
+                "holder_contact_id": identity.contact_id,
+                "ticket_type_id": p.ticket_type_id,
+                "short_code": codes.pop(),
+                "ticket_number": next(numbers),
+                "status": "assigned",
+                "payment_status": payment_status,
+                "delivery_status": "not_sent",
+                "assigned_at": now,
+                "hold_expires_at": hold_expiry(now) if payment_status == "unpaid" else None,
+                "purchase_id": None,
+            })
+
+        # Paid/waived holders get a purchase each, as a single assignment would
+        paid = [v for v in values if v["payment_status"] in ("paid", "waived")]
+        if paid:
+            purchase_ids = db.scalars(
+                insert(Purchase).returning(Purchase.id, sort_by_parameter_order=True),
+                [{"buyer_contact_id": v["holder_contact_id"], "uuid": str(uuid4())} for v in paid],
+            ).all()
+            for v, purchase_id in zip(paid, purchase_ids):
+                v["purchase_id"] = purchase_id
+
+        # Reuse pre-created available tickets first, then create the rest
+        claimed = db.execute(
+            select(Ticket.id)
+            .where(Ticket.event_id == event_id, Ticket.status == "available")
+            .order_by(Ticket.id)
+            .limit(len(values))
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if claimed:
+            db.execute(update(Ticket), [{"id": tid, **v} for tid, v in zip(claimed, values)])
+        fresh = values[len(claimed):]
+        created = db.scalars(
+            insert(Ticket).returning(Ticket.id, sort_by_parameter_order=True),
+            [{"event_id": event_id, "uuid": str(uuid4()), **v} for v in fresh],
+        ).all() if fresh else []
+
+        for p, v, tid in zip(accepted, values, list(claimed) + list(created)):
+            results[p.row] = _result(p.row, p.data.email, ticket_id=tid, short_code=v["short_code"], ticket_number=v["ticket_number"])
+            if v["payment_status"] == "unpaid":
+                metrics.TICKET_RESERVATIONS.inc(ticket_type_id=v["ticket_type_id"] or "none")
+            elif v["payment_status"] == "paid":
+                metrics.TICKET_CHECKOUTS.inc(ticket_type_id=v["ticket_type_id"] or "none")
+        enqueue_import_emails(db, event_id, list(claimed) + list(created))
+
+    db.commit()
+    return [results[p.row] for p in chunk]
+
+
+def import_holders(
+    db: Session,
+    *,
+    event_id: int,
+    records: Iterable[tuple[int, dict | None, str | None]],
+    chunk_size: int | None = None,
+) -> Iterator[dict]:
+    """Validate and assign holders; yields one result per input row, in order.
+
+    A failing chunk is rolled back and reported row by row; later chunks still run.
+    """
+    if not db.get(Event, event_id):
+        raise ValueError("Event not found")
+    chunk_size = chunk_size or settings.bulk_import_chunk_size
+    resolve_type = _type_resolver(db, event_id)
+    # Don't sit in a transaction while the client is still uploading
+    db.rollback()
+
+    buffered: list[dict | _Pending] = []
+
+    def flush() -> Iterator[dict]:
+        chunk = [b for b in buffered if isinstance(b, _Pending)]
+        done: dict[int, dict] = {}
+        if chunk:
+            try:
+                done = {r["row"]: r for r in _import_chunk(db, event_id, chunk)}
+            except Exception as exc:
+                db.rollback()
+                logger.exception("Bulk import chunk failed for event %s", event_id)
+                done = {p.row: _result(p.row, p.data.email, error=f"Import failed: {exc.__class__.__name__}") for p in chunk}
+        for b in buffered:
+            yield done[b.row] if isinstance(b, _Pending) else b
+        buffered.clear()
+
+    for row, record, error in records:
+        if error is None:
+            try:
+                data = AssignImportRow.model_validate(record)
+                buffered.append(_Pending(row, data, resolve_type(data.ticket_type)))
+            except ValidationError as exc:
+                error = "; ".join(f"{'.'.join(str(x) for x in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors())
+            except LookupError as exc:
+                error = str(exc)
+        if error is not None:
+            buffered.append(_result(row, (record or {}).get("email"), error=error))
+        if sum(isinstance(b, _Pending) for b in buffered) >= chunk_size:
+            yield from flush()
+    yield from flush()
+
+
+def result_line(result: dict, fmt: str) -> str:
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(["" if result[k] is None else result[k] for k in RESULT_FIELDS])
+        return buf.getvalue()
+    return json.dumps(result, separators=(",", ":")) + "\n"
+
+
+def result_header(fmt: str) -> str:
+    return ",".join(RESULT_FIELDS) + "\r\n" if fmt == "csv" else ""
+
+
+def deliver_import_emails(event_id: int, ticket_ids: list[int]) -> dict:
+    """Send assignment emails for imported tickets and record deliveries in one UPDATE."""
+    if not ticket_ids:
+        return {"emails_attempted": 0, "tickets_delivered": 0}
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        ev = db.get(Event, event_id)
+        if not ev:
+            return {"emails_attempted": 0, "tickets_delivered": 0}
+        rows = db.execute(
+            select(Ticket, Customer.email, TicketType.name)
+            .join(Customer, Customer.id == Ticket.customer_id)
+            .outerjoin(TicketType, TicketType.id == Ticket.ticket_type_id)
+            .where(Ticket.id.in_(ticket_ids))
+            .order_by(Ticket.id)
+        ).all()
+        delivered = [
+            ticket.id
+            for ticket, email, tt_name in rows
+            if send_assignment_email(db, ev=ev, ticket=ticket, to_email=email, ticket_type_name=tt_name)
+        ]
+        if delivered:
+            db.execute(
+                update(Ticket)
+                .where(Ticket.id.in_(delivered))
+                .values(delivery_status="sent", delivered_at=datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    logger.info("Attempted %d import emails for event %s (%d tickets delivered)", len(rows), event_id, len(delivered))
+    return {"emails_attempted": len(rows), "tickets_delivered": len(delivered)}
+
+
+@register("tickets.import_emails")
+def deliver_import_emails_job(db: Session, ctx: JobContext) -> dict:
+    return deliver_import_emails(ctx.params["event_id"], ctx.params["ticket_ids"])
+
+
+def enqueue_import_emails(db: Session, event_id: int, ticket_ids: list[int]) -> None:
+    """Queue the email job for a chunk's tickets inside the chunk's transaction."""
+    if not ticket_ids:
+        return
+    # Single attempt: a retry would email holders that already got theirs
+    enqueue(db, "tickets.import_emails", {"event_id": event_id, "ticket_ids": ticket_ids}, max_attempts=1, commit=False)
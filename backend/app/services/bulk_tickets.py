@@ -0,0 +1,207 @@
+"""Bulk refund / unassign / resend for whole events or slices of them.
+
+Each operation runs as a tracked job (app.services.jobs). Matching tickets
+are walked in id order in batches: a batch is locked, changed with one
+set-based UPDATE and committed, then its holders' emails are queued together
+in the bulk lane of the send scheduler. Holder emails
+and ticket types for a batch come from one query, so per-ticket cost is the
+email itself. Tickets that no longer qualify when their batch is reached (e.g.
+already refunded) are skipped, matching the single-ticket endpoints' rules.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models.customer import Customer
+from app.db.models.event import Event
+from app.db.models.ticket import Ticket
+from app.db.models.ticket_type import TicketType
+from app.integrations.email import templates
+from app.integrations.email.service import send_batch_and_log
+from app.services.jobs import JobContext, register
+from app.services.tickets import send_assignment_email, send_payment_reminder_email
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _filter(f: dict):
+    clauses = [Ticket.event_id == f["event_id"]]
+    if f.get("ticket_type_ids"):
+        clauses.append(Ticket.ticket_type_id.in_(f["ticket_type_ids"]))
+    if f.get("statuses"):
+        clauses.append(Ticket.status.in_(f["statuses"]))
+    if f.get("payment_statuses"):
+        clauses.append(Ticket.payment_status.in_(f["payment_statuses"]))
+    return and_(*clauses)
+
+
+def _count(db: Session, where) -> int:
+    total = db.execute(select(func.count()).select_from(Ticket).where(where)).scalar_one()
+    db.rollback()
+    return int(total)
+
+
+def _batches(db: Session, where, ctx: JobContext, *, lock: bool):
+    """Yield locked batches of (id, customer_id) rows in id order, reporting progress after each."""
+    total = _count(db, where)
+    ctx.progress(0, total)
+    last_id, done = 0, 0
+    while True:
+        q = select(Ticket.id, Ticket.customer_id).where(where, Ticket.id > last_id).order_by(Ticket.id).limit(BATCH_SIZE)
+        if lock:
+            q = q.with_for_update()
+        rows = db.execute(q).all()
+        if not rows:
+            db.rollback()
+            return
+        last_id = rows[-1].id
+        yield rows
+        done += len(rows)
+        ctx.progress(done, max(total, done))
+
+
+def _event_labels(db: Session, event_id: int) -> tuple[str, str]:
+    # Read once: every batch commits, which would expire an Event instance
+    ev = db.get(Event, event_id)
+    return (ev.title, ev.starts_at.isoformat()) if ev else ("Event", "")
+
+
+def _emails(db: Session, customer_ids) -> dict[int, str]:
+    ids = {c for c in customer_ids if c}
+    if not ids:
+        return {}
+    return dict(db.execute(select(Customer.id, Customer.email).where(Customer.id.in_(ids), Customer.email.isnot(None))).all())
+
+
+def _notify(db: Session, template_name: str, event_id: int, rows, build) -> tuple[int, int]:
+    """Queue a batch's emails together (the scheduler paces them) and count outcomes."""
+    emails = _emails(db, [r.customer_id for r in rows])
+    sends = []
+    for r in rows:
+        to_email = emails.get(r.customer_id)
+        if not to_email:
+            continue
+        subject, text, html = build()
+        sends.append(dict(to_email=to_email, subject=subject, text=text, html=html, template_name=template_name, context={'event_id': event_id}, related={'event_id': event_id, 'ticket_id': r.id}))
+    try:
+        results = send_batch_and_log(db, sends)
+    except Exception:
+        logger.exception("Bulk %s emails failed for event %s", template_name, event_id)
+        results = [False] * len(sends)
+    sent = sum(results)
+    return sent, len(results) - sent
+
+
+@register("tickets.bulk_refund")
+def bulk_refund(db: Session, ctx: JobContext) -> dict:
+    """Mark paid tickets as refunding (as refund_ticket does) and notify holders."""
+    where = and_(_filter(ctx.params["filter"]), Ticket.payment_status == "paid")
+    reason = ctx.params.get("reason")
+    event_id = ctx.params["filter"]["event_id"]
+    title, when = _event_labels(db, event_id)
+    refunded = sent = failed = 0
+    for rows in _batches(db, where, ctx, lock=True):
+        db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_([r.id for r in rows]))
+            .values(
+                payment_status="refunding",
+                ticket_number=None,
+                attendance_refunded=case((Ticket.status == "checked_in", True), else_=Ticket.attendance_refunded),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        refunded += len(rows)
+        s, f = _notify(db, 'refund_initiated_email', event_id, rows,
+                       lambda: templates.refund_initiated_email(title, when, reason, False))
+        sent += s
+        failed += f
+    return {"refunded": refunded, "emails_sent": sent, "emails_failed": failed}
+
+
+@register("tickets.bulk_unassign")
+def bulk_unassign(db: Session, ctx: JobContext) -> dict:
+    """Return unpaid/waived assigned tickets to inventory (as unassign_ticket does) and notify prior holders."""
+    where = and_(
+        _filter(ctx.params["filter"]),
+        Ticket.payment_status.in_(("unpaid", "waived")),
+        Ticket.customer_id.isnot(None),
+    )
+    reason = ctx.params.get("reason")
+    event_id = ctx.params["filter"]["event_id"]
+    title, when = _event_labels(db, event_id)
+    unassigned = sent = failed = 0
+    for rows in _batches(db, where, ctx, lock=True):
+        db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_([r.id for r in rows]))
+            .values(
+                ticket_number=None,
+                status="available",
+                customer_id=None,
+                assigned_at=None,
+                delivered_at=None,
+                delivery_status="not_sent",
+                hold_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        unassigned += len(rows)
+        s, f = _notify(db, 'unassign_email', event_id, rows,
+                       lambda: templates.unassign_email(title, when, reason))
+        sent += s
+        failed += f
+    return {"unassigned": unassigned, "emails_sent": sent, "emails_failed": failed}
+
+
+@register("tickets.bulk_resend")
+def bulk_resend(db: Session, ctx: JobContext) -> dict:
+    """Resend each holder's current email: the ticket once paid/waived, the pay link while unpaid."""
+    where = and_(
+        _filter(ctx.params["filter"]),
+        Ticket.customer_id.isnot(None),
+        Ticket.short_code.isnot(None),
+        Ticket.payment_status.in_(("unpaid", "paid", "waived")),
+    )
+    event_id = ctx.params["filter"]["event_id"]
+    sent = failed = 0
+    for rows in _batches(db, where, ctx, lock=False):
+        ev = db.get(Event, event_id)
+        batch = db.execute(
+            select(Ticket, Customer.email, TicketType)
+            .join(Customer, Customer.id == Ticket.customer_id)
+            .outerjoin(TicketType, TicketType.id == Ticket.ticket_type_id)
+            .where(Ticket.id.in_([r.id for r in rows]))
+            .order_by(Ticket.id)
+        ).all()
+        delivered = []
+        for ticket, email, tt in batch:
+            if not email:
+                continue
+            if ticket.payment_status == "unpaid":
+                ok = send_payment_reminder_email(db, ev=ev, ticket=ticket, to_email=email, ticket_type=tt)
+            else:
+                ok = send_assignment_email(db, ev=ev, ticket=ticket, to_email=email)
+                if ok:
+                    delivered.append(ticket.id)
+            if ok:
+                sent += 1
+            else:
+                failed += 1
+        if delivered:
+            db.execute(
+                update(Ticket)
+                .where(Ticket.id.in_(delivered))
+                .values(delivery_status="sent", delivered_at=datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    return {"emails_sent": sent, "emails_failed": failed}
@@ -0,0 +1,284 @@
+"""Live check-in counts pushed to dashboard watchers.
+
+`check_in_by_code` sends `NOTIFY checkin` inside its transaction, so every
+API worker hears about every committed check-in, whichever worker took it.
+Notifications are folded into per-event counters in memory and flushed to
+watchers at most once per FLUSH_INTERVAL as a single delta, however many
+scanners are busy. The database is queried once when an event gets its first
+watcher (and again after a LISTEN reconnect); open streams add no query load.
+The event is registered before that query runs, so check-ins notified while
+it is in flight are held and added once it returns instead of being lost.
+Each notification carries its transaction id and the query returns its MVCC
+snapshot, so a check-in the query already counted (one still waiting in the
+listener's batch, say) is never added a second time.
+
+Gate and device counts exist only in the notifications, so they cover the
+check-ins seen since the event started being watched on this worker.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.broadcast import Broadcaster
+from app.db.listener import listener
+from app.db.models.ticket import Ticket
+from app.services.checkin import CHECKIN_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+# How long a concurrent first watcher waits for another thread's totals query
+LOAD_TIMEOUT = 10.0
+
+
+@dataclass(frozen=True)
+class TxSnapshot:
+    """A txid_current_snapshot() value: which transactions a query could see."""
+
+    xmin: int
+    xmax: int
+    xip: frozenset[int]
+
+    @classmethod
+    def parse(cls, text: str) -> "TxSnapshot":
+        xmin, xmax, xip = text.split(":")
+        return cls(int(xmin), int(xmax), frozenset(int(x) for x in xip.split(",") if x))
+
+    def sees(self, xid: int) -> bool:
+        return xid < self.xmin or (xid < self.xmax and xid not in self.xip)
+
+
+def checkin_totals(db: Session, event_id: int) -> tuple[dict[int | None, dict[str, int]], TxSnapshot | None]:
+    """Registered and checked-in counts per ticket type, in one grouped query, with the snapshot it read.
+
+    Registered follows the reconciliation report: assigned + checked_in.
+    The snapshot is None when the event has no tickets.
+    """
+    rows = db.execute(
+        select(
+            Ticket.ticket_type_id,
+            func.count().filter(Ticket.status.in_(("assigned", "checked_in"))),
+            func.count().filter(Ticket.status == "checked_in"),
+            # Same statement, so the same snapshot the counts were read under
+            cast(func.txid_current_snapshot(), Text),
+        )
+        .where(Ticket.event_id == event_id)
+        .group_by(Ticket.ticket_type_id)
+    ).all()
+    snapshot = TxSnapshot.parse(rows[0][3]) if rows else None
+    return {tt: {"registered": int(reg), "checked_in": int(ci)} for tt, reg, ci, _ in rows}, snapshot
+
+
+class _EventState:
+    def __init__(self, by_type: dict[int | None, dict[str, int]] | None = None) -> None:
+        # None while a totals query is running
+        self.by_type = by_type
+        self.loaded = threading.Event()
+        # Snapshot by_type was read under; check-ins it saw are already counted
+        self.seen: TxSnapshot | None = None
+        # (txid, ticket type) of check-ins heard while by_type is None
+        self.early: list[tuple[int | None, int | None]] = []
+        self.by_gate: Counter[str] = Counter()
+        self.by_device: Counter[str] = Counter()
+        # Arrivals since the last flush
+        self.pending_type: Counter[int | None] = Counter()
+        self.pending_gate: Counter[str] = Counter()
+        self.pending_device: Counter[str] = Counter()
+
+    def _count(self, xid: int | None, tt: int | None) -> None:
+        if xid is not None and self.seen is not None and self.seen.sees(xid):
+            return
+        self.by_type.setdefault(tt, {"registered": 0, "checked_in": 0})["checked_in"] += 1
+
+    def record(self, xid: int | None, tt: int | None, gate: str | None, device: str | None) -> None:
+        if self.by_type is None:
+            self.early.append((xid, tt))
+        else:
+            self._count(xid, tt)
+        self.pending_type[tt] += 1
+        if gate:
+            self.by_gate[gate] += 1
+            self.pending_gate[gate] += 1
+        if device:
+            self.by_device[device] += 1
+            self.pending_device[device] += 1
+
+    def unload(self) -> dict[int | None, dict[str, int]] | None:
+        """Hold check-ins in `early` until the next `load`; returns the totals set aside."""
+        by_type, self.by_type = self.by_type, None
+        self.loaded.clear()
+        return by_type
+
+    def load(self, by_type: dict[int | None, dict[str, int]], seen: TxSnapshot | None) -> None:
+        """Install queried totals plus the check-ins heard while the query ran that it did not see."""
+        self.by_type, self.seen = by_type, seen
+        for xid, tt in self.early:
+            self._count(xid, tt)
+        self.early.clear()
+        self.loaded.set()
+
+    def totals(self) -> dict:
+        return {
+            "registered": sum(c["registered"] for c in self.by_type.values()),
+            "checked_in": sum(c["checked_in"] for c in self.by_type.values()),
+            "by_ticket_type": [
+                {"id": tt, **counts} for tt, counts in sorted(self.by_type.items(), key=lambda kv: (kv[0] is None, kv[0] or 0))
+            ],
+            "by_gate": dict(self.by_gate),
+            "by_device": dict(self.by_device),
+        }
+
+    def take_delta(self) -> dict | None:
+        if not self.pending_type:
+            return None
+        delta = {
+            "arrivals": sum(self.pending_type.values()),
+            "by_ticket_type": [{"id": tt, "arrivals": n} for tt, n in self.pending_type.items()],
+            "by_gate": dict(self.pending_gate),
+            "by_device": dict(self.pending_device),
+        }
+        self.pending_type.clear()
+        self.pending_gate.clear()
+        self.pending_device.clear()
+        return delta
+
+
+class CheckinFeed:
+    def __init__(self, interval: float = FLUSH_INTERVAL) -> None:
+        self.interval = interval
+        self.broadcaster = Broadcaster()
+        self._events: dict[int, _EventState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def ensure_listening(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="checkin-feed", daemon=True)
+            self._thread.start()
+        listener.subscribe(CHECKIN_CHANNEL, self._on_notify)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def snapshot(self, event_id: int) -> dict:
+        """Running totals; loaded from the database only for the first watcher."""
+        with self._lock:
+            state = self._events.get(event_id)
+            loading = state is None
+            if loading:
+                # Tracked from now on, so notifications during the query are kept
+                state = self._events[event_id] = _EventState()
+            elif state.by_type is not None:
+                return state.totals()
+        if not loading:
+            # Another watcher's (or a resync's) query is in flight
+            state.loaded.wait(LOAD_TIMEOUT)
+            with self._lock:
+                if state.by_type is not None:
+                    return state.totals()
+            return self.snapshot(event_id)
+        from app.db.session import SessionLocal
+
+        try:
+            with SessionLocal() as db:
+                by_type, seen = checkin_totals(db, event_id)
+        except Exception:
+            with self._lock:
+                if self._events.get(event_id) is state:
+                    del self._events[event_id]
+            state.loaded.set()
+            raise
+        with self._lock:
+            if state.by_type is None:
+                state.load(by_type, seen)
+            totals = state.totals()
+        return totals
+
+    def _on_notify(self, payloads: list[str] | None) -> None:
+        if payloads is None:
+            self._resync()
+            return
+        with self._lock:
+            for raw in payloads:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    logger.warning("Ignoring malformed check-in notification %r", raw)
+                    continue
+                # Events without watchers are not tracked; their first watcher loads totals
+                state = self._events.get(msg.get("e"))
+                if state is not None:
+                    state.record(msg.get("x"), msg.get("tt"), msg.get("g"), msg.get("d"))
+
+    def _resync(self) -> None:
+        # Check-ins may have been missed while LISTEN was down: reload and push full totals
+        with self._lock:
+            # Current totals, kept in case the reload fails; events whose first
+            # watcher's query is still running are skipped
+            previous = {
+                event_id: (state, state.unload())
+                for event_id, state in self._events.items()
+                if state.by_type is not None
+            }
+        if not previous:
+            return
+        from app.db.session import SessionLocal
+
+        try:
+            with SessionLocal() as db:
+                for event_id, (state, _) in list(previous.items()):
+                    by_type, seen = checkin_totals(db, event_id)
+                    with self._lock:
+                        state.load(by_type, seen)
+                        state.take_delta()
+                        totals = state.totals()
+                    del previous[event_id]
+                    self.broadcaster.publish(event_id, {"kind": "snapshot", "totals": totals})
+        finally:
+            with self._lock:
+                for state, by_type in previous.values():
+                    state.load(by_type, state.seen)
+
+    def flush(self) -> None:
+        """Publish one coalesced delta per watched event with new arrivals."""
+        watched = set(self.broadcaster.keys())
+        at = datetime.now(timezone.utc).isoformat()
+        out = []
+        with self._lock:
+            # Forget events nobody watches any more
+            for stale in set(self._events) - watched:
+                del self._events[stale]
+            for event_id, state in self._events.items():
+                if state.by_type is None:
+                    # Arrivals wait for the first watcher's totals
+                    continue
+                delta = state.take_delta()
+                if delta is not None:
+                    out.append((event_id, {"kind": "delta", "at": at, "delta": delta, "totals": state.totals()}))
+        for event_id, message in out:
+            self.broadcaster.publish(event_id, message)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Check-in feed flush failed")
+
+
+feed = CheckinFeed()
@@ -0,0 +1,135 @@
+"""Contact search and the contacts list page query.
+
+A term matches substrings of email, first name, last name or phone, as the
+contacts list always has:
+- terms shorter than 3 characters (typeahead) are too short for trigrams, so
+  they run as lower(col) LIKE '%t%' per column, a sequential scan that stays
+  cheap at contact-table sizes;
+- longer terms match substrings of the combined search document, served by
+  the pg_trgm GIN index.
+Either way results are ranked prefix-first, then by trigram similarity.
+
+Per-contact aggregates come from the contact_stats rollup, so the page is a
+single indexed join regardless of how many tickets a contact has. Writes to
+tickets, purchases and contacts only queue the affected contact ids
+(contact_stats_dirty, migration 0022); the page drains that queue before it
+reads, and the maintenance loop drains it when nobody is looking.
+"""
+from __future__ import annotations
+
+from sqlalchemy import String, func, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models.contact import Contact
+from app.db.models.contact_stats import ContactStats
+
+# Must match the expression of ix_contact_search_trgm (migration 0012) exactly,
+# otherwise the planner cannot use the index.
+SEARCH_DOCUMENT = literal_column(
+    "lower(coalesce(contact.email, '') || ' ' || coalesce(contact.first_name, '') || ' ' || "
+    "coalesce(contact.last_name, '') || ' ' || coalesce(contact.phone, ''))",
+    String,
+)
+TRIGRAM_MIN_LENGTH = 3
+# Queued contacts recomputed per statement
+STATS_BATCH = 1000
+
+_SEARCH_COLUMNS = (Contact.email, Contact.first_name, Contact.last_name, Contact.phone)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_match(term: str):
+    pattern = f"{_escape_like(term)}%"
+    return or_(*[func.lower(col).like(pattern, escape="\\") for col in _SEARCH_COLUMNS])
+
+
+def _substring_match(term: str):
+    pattern = f"%{_escape_like(term)}%"
+    return or_(*[func.lower(col).like(pattern, escape="\\") for col in _SEARCH_COLUMNS])
+
+
+def search_filter(term: str):
+    """WHERE clause for a search term (already lower-cased and stripped)."""
+    if len(term) < TRIGRAM_MIN_LENGTH:
+        return _substring_match(term)
+    return SEARCH_DOCUMENT.like(f"%{_escape_like(term)}%", escape="\\")
+
+
+def search_rank(term: str) -> list:
+    """ORDER BY terms: prefix hits first, then trigram similarity."""
+    return [_prefix_match(term).desc(), func.similarity(SEARCH_DOCUMENT, term).desc()]
+
+
+def refresh_queued_stats(db: Session) -> int:
+    """Recompute contact_stats for every queued contact; returns the queue rows drained."""
+    total = 0
+    while True:
+        n = db.execute(text("SELECT drain_contact_stats(:batch)"), {"batch": STATS_BATCH}).scalar() or 0
+        db.commit()
+        total += n
+        if n < STATS_BATCH:
+            return total
+
+
+def list_contacts_page(
+    db: Session,
+    *,
+    search: str | None,
+    buyer_only: bool = False,
+    holder_only: bool = False,
+    sort: str | None = None,
+    limit: int,
+    offset: int,
+) -> list[dict]:
+    refresh_queued_stats(db)
+    q = select(
+        Contact.id,
+        Contact.first_name,
+        Contact.last_name,
+        Contact.email,
+        Contact.phone,
+        ContactStats.events_purchased,
+        ContactStats.tickets_held,
+        ContactStats.last_activity_at,
+    ).join(ContactStats, ContactStats.contact_id == Contact.id)
+
+    order_by: list = []
+    term = (search or "").strip().lower()
+    if term:
+        q = q.where(search_filter(term))
+        if sort is None:
+            order_by.extend(search_rank(term))
+
+    # Role filters and sorts read the contact_stats rollup, so they run in SQL
+    # against its indexes and pagination only ever sees matching contacts.
+    role_clauses = []
+    if buyer_only:
+        role_clauses.append(ContactStats.events_purchased > 0)
+    if holder_only:
+        role_clauses.append(ContactStats.tickets_held > 0)
+    if role_clauses:
+        q = q.where(or_(*role_clauses))
+
+    if sort == "last_activity":
+        order_by.append(ContactStats.last_activity_at.desc().nulls_last())
+    elif sort == "tickets_held":
+        order_by.append(ContactStats.tickets_held.desc())
+    order_by.append(Contact.id.asc())
+
+    rows = db.execute(q.order_by(*order_by).limit(limit).offset(offset)).mappings().all()
+    return [
+        {
+            "id": r["id"],
+            "first_name": r["first_name"],
+            "last_name": r["last_name"],
+            "email": r["email"],
+            "phone": r["phone"],
+            "events_purchased": r["events_purchased"],
+            "tickets_held": r["tickets_held"],
+            "last_activity": r["last_activity_at"].isoformat() if r["last_activity_at"] else None,
+        }
+        for r in rows
+    ]
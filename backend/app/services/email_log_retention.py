@@ -0,0 +1,168 @@
+"""Monthly partitions and retention for email_log.
+
+email_log is range-partitioned on created_at into one table per calendar
+month (email_log_YYYYMM) plus email_log_default, which only catches rows no
+monthly partition covers. `maintain` keeps EMAIL_LOG_PARTITIONS_AHEAD future
+months created and drops whole months older than EMAIL_LOG_RETENTION_MONTHS:
+dropping a partition is a catalog change, not a DELETE, so retention costs
+nothing however many rows a month holds. Bodies no retained row can refer to
+are then pruned from email_body.
+
+The maintenance loop (app.services.maintenance) calls `maintain_if_due` on
+its own cadence; run it by hand with ``python -m app.services.email_log_retention``.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from datetime import date, datetime, timezone
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.email_log import EmailBody
+from app.integrations.email.bodies import TOUCH_AFTER
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 3600.0
+PRUNE_BATCH = 5000
+# pg_try_advisory_xact_lock key shared by every process doing maintenance
+_LOCK_KEY = 0x656D61696C6C6F67
+
+_PARTITION_RE = re.compile(r"^email_log_(\d{4})(\d{2})$")
+_last_run = 0.0
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"email_log_{month.year}{month.month:02d}"
+
+
+def existing_partitions(db: Session) -> dict[date, str]:
+    names = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i"
+            " JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = 'email_log'::regclass"
+        )
+    ).scalars()
+    out = {}
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if m:
+            out[date(int(m.group(1)), int(m.group(2)), 1)] = name
+    return out
+
+
+def _create_partition(db: Session, month: date) -> None:
+    """Create one monthly partition, first moving that month's rows out of email_log_default.
+
+    Postgres refuses CREATE ... PARTITION OF while the default partition holds
+    rows the new range would cover, which happens whenever maintenance fell
+    behind the clock. Those rows are copied into a standalone table and
+    deleted from the default, then the table is attached. The default
+    partition stays locked against writes until the transaction ends so no
+    row for the month lands there in between.
+    """
+    name = partition_name(month)
+    bounds = {"lo": month, "hi": add_months(month, 1)}
+    spec = f"FOR VALUES FROM ('{bounds['lo'].isoformat()}') TO ('{bounds['hi'].isoformat()}')"
+    in_month = "created_at >= :lo AND created_at < :hi"
+    db.execute(text("LOCK TABLE email_log_default IN EXCLUSIVE MODE"))
+    if not db.execute(text(f"SELECT EXISTS (SELECT 1 FROM email_log_default WHERE {in_month})"), bounds).scalar():
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF email_log {spec}"))
+        return
+    db.execute(text(f"CREATE TABLE {name} (LIKE email_log INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = db.execute(text(f"INSERT INTO {name} SELECT * FROM email_log_default WHERE {in_month}"), bounds).rowcount
+    db.execute(text(f"DELETE FROM email_log_default WHERE {in_month}"), bounds)
+    # Builds the partition's copies of the email_log indexes
+    db.execute(text(f"ALTER TABLE email_log ATTACH PARTITION {name} {spec}"))
+    logger.info("Moved %d rows from email_log_default into %s", moved, name)
+
+
+def ensure_partitions(db: Session, *, ahead: int, today: date | None = None) -> list[str]:
+    """Create the monthly partitions for this month and `ahead` more; returns those created."""
+    current = month_start(today or datetime.now(timezone.utc))
+    have = existing_partitions(db)
+    created = []
+    for i in range(ahead + 1):
+        month = add_months(current, i)
+        if month in have:
+            continue
+        name = partition_name(month)
+        try:
+            with db.begin_nested():
+                _create_partition(db, month)
+            created.append(name)
+        except Exception:
+            logger.exception("Could not create email_log partition %s", name)
+    return created
+
+
+def drop_expired_partitions(db: Session, *, keep_months: int, today: date | None = None) -> list[str]:
+    """Drop monthly partitions that end before the retention window; returns those dropped."""
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc)), -keep_months)
+    dropped = []
+    for month, name in sorted(existing_partitions(db).items()):
+        if add_months(month, 1) <= cutoff:
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def prune_bodies(db: Session, *, before: datetime) -> int:
+    """Delete email_body rows unused since `before`, in batches; returns the number deleted."""
+    stale_before = before - TOUCH_AFTER
+    total = 0
+    while True:
+        hashes = select(EmailBody.hash).where(EmailBody.last_used_at < stale_before).limit(PRUNE_BATCH).scalar_subquery()
+        n = db.execute(delete(EmailBody).where(EmailBody.hash.in_(hashes))).rowcount
+        db.commit()
+        total += n
+        if n < PRUNE_BATCH:
+            return total
+
+
+def maintain(db: Session) -> dict:
+    """Create upcoming partitions, drop expired ones and prune orphaned bodies (one process at a time)."""
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}).scalar():
+        db.rollback()
+        return {"skipped": True}
+    result: dict = {"created": ensure_partitions(db, ahead=settings.email_log_partitions_ahead)}
+    if settings.email_log_retention_months > 0:
+        result["dropped"] = drop_expired_partitions(db, keep_months=settings.email_log_retention_months)
+    # DDL holds locks on email_log until commit; keep it out of the body prune
+    db.commit()
+    if settings.email_log_retention_months > 0:
+        cutoff = add_months(month_start(datetime.now(timezone.utc)), -settings.email_log_retention_months)
+        result["bodies_pruned"] = prune_bodies(db, before=datetime(cutoff.year, cutoff.month, 1, tzinfo=timezone.utc))
+    if result["created"] or result.get("dropped"):
+        logger.info("email_log maintenance: %s", result)
+    return result
+
+
+def maintain_if_due(db: Session) -> None:
+    global _last_run
+    if _last_run and time.monotonic() - _last_run < MAINTENANCE_INTERVAL:
+        return
+    _last_run = time.monotonic()
+    maintain(db)
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        print(maintain(db))
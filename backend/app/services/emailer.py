@@ -4,6 +4,8 @@ from typing import Iterable, Optional
 from sqlalchemy.orm import Session
 import os
 import datetime as dt
+from html import escape
+from urllib.parse import quote
 
 from app.integrations.email.service import send_and_log
 from app.integrations.email.registry import code_for
@@ -120,6 +122,14 @@ def send_reserved_assignment_holder(
     )
 
 
+def _ticket_links(short_code: str, token: Optional[str], qr_data: Optional[str] = None) -> tuple[str, str]:
+    api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
+    app_origin = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
+    qr_url = f"{api_origin}/qr?data={quote(qr_data or short_code, safe='')}&scale=6&format=png"
+    view_link = f"{app_origin}/ticket?token={token}" if token else f"{app_origin}/ticket?code={short_code}"
+    return qr_url, view_link
+
+
 def send_ticket_email_active(
     db: Session,
     *,
@@ -130,11 +140,9 @@ def send_ticket_email_active(
     ticket_number: Optional[str],
     token: Optional[str] = None,
     related: Optional[dict] = None,
+    qr_data: Optional[str] = None,
 ) -> bool:
-    api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-    app_origin = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-    qr_url = f"{api_origin}/qr?data={short_code}&scale=6&format=png"
-    view_link = f"{app_origin}/ticket?token={token}" if token else f"{app_origin}/ticket?code={short_code}"
+    qr_url, view_link = _ticket_links(short_code, token, qr_data)
     template_code = code_for('ticket_email')
     subject, text, html = render(template_code, {
         'event_title': event_title,
@@ -154,3 +162,83 @@ def send_ticket_email_active(
         db=db,
         related=related or {},
     )
+
+
+def send_purchase_tickets_email(
+    db: Session,
+    *,
+    to_email: str,
+    event_title: str,
+    event_when_iso: str,
+    tickets: list[dict],
+    related: Optional[dict] = None,
+) -> bool:
+    """One email listing every ticket of a purchase a recipient holds.
+
+    `tickets` are dicts with `short_code`, `ticket_number` and optionally `token` and `qr` (the QR payload).
+    """
+    lines: list[str] = []
+    rows: list[str] = []
+    for t in tickets:
+        code = t['short_code']
+        number = t.get('ticket_number') or ''
+        qr_url, view_link = _ticket_links(code, t.get('token'), t.get('qr'))
+        lines.append(f"{number + ' — ' if number else ''}Code {code}\n  QR: {qr_url}\n  View: {view_link}")
+        rows.append(
+            '<p style="border-top:1px solid #ddd;padding-top:8px">'
+            + (f'<strong>Ticket Number:</strong> {escape(number)}<br/>' if number else '')
+            + f'<strong>Check-in code:</strong> <code>{escape(code)}</code><br/>'
+            + f'<img alt="Ticket QR" src="{escape(qr_url)}" style="width:180px;height:180px"/><br/>'
+            + f'<a href="{escape(view_link)}" style="color:#0b5fff;">View in browser</a></p>'
+        )
+    template_code = code_for('purchase_tickets_email')
+    subject, text, html = render(template_code, {
+        'event_title': event_title,
+        'event_when': event_when_iso,
+        'ticket_count': len(tickets),
+        'ticket_lines': "\n".join(lines),
+        'ticket_rows': "\n".join(rows),
+    })
+    return send_and_log(
+        to_email=to_email,
+        subject=subject,
+        text=text,
+        html=html,
+        template_name='purchase_tickets_email',
+        context={'codes': [t['short_code'] for t in tickets]},
+        db=db,
+        related=related or {},
+    )
+
+
+def send_tickets_email(
+    db: Session,
+    *,
+    to_email: str,
+    event_title: str,
+    event_when_iso: str,
+    tickets: list[dict],
+    related: Optional[dict] = None,
+) -> bool:
+    """Ticket email for one recipient: the single-ticket template for one ticket, the purchase template for several."""
+    if len(tickets) == 1:
+        t = tickets[0]
+        return send_ticket_email_active(
+            db,
+            to_email=to_email,
+            event_title=event_title,
+            event_when_iso=event_when_iso,
+            short_code=t['short_code'],
+            ticket_number=t.get('ticket_number'),
+            token=t.get('token'),
+            related={**(related or {}), 'ticket_id': t.get('id')},
+            qr_data=t.get('qr'),
+        )
+    return send_purchase_tickets_email(
+        db,
+        to_email=to_email,
+        event_title=event_title,
+        event_when_iso=event_when_iso,
+        tickets=tickets,
+        related=related,
+    )
@@ -0,0 +1,170 @@
+"""Reservation hold expiry.
+
+Unpaid tickets are held for HOLD_TTL from the moment they are reserved
+(ticket.hold_expires_at). The sweeper releases expired holds back to
+inventory in bounded batches: the scan is driven by the partial index on
+hold_expires_at and claims rows with FOR UPDATE SKIP LOCKED, so several API
+workers can sweep concurrently without blocking each other or checkouts.
+
+Run a one-off sweep with ``python -m app.services.holds``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.customer import Customer
+from app.db.models.event import Event
+from app.db.models.ticket import Ticket
+from app.integrations.email import templates
+from app.integrations.email.scheduler import BULK, email_lane
+from app.integrations.email.service import send_and_log
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = timedelta(hours=settings.hold_ttl_hours)
+EXPIRED_REASON = "Your reservation expired before payment was received."
+
+
+def hold_expiry(now: datetime | None = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) + HOLD_TTL
+
+
+def format_expiry(expires_at: datetime | None) -> str:
+    """Expiry as quoted in reservation emails."""
+    return (expires_at or hold_expiry()).astimezone(timezone.utc).strftime('%d/%m/%Y %I:%M%p UTC')
+
+
+def hold_lapsed(ticket: Ticket, now: datetime | None = None) -> bool:
+    """True when an unpaid ticket can no longer be paid: the sweeper released it or its hold expired.
+
+    Any other status is payable, as before holds existed: check-in and
+    delivery never required payment, so a checked-in or delivered ticket can
+    still be paid at the door.
+    """
+    if ticket.payment_status == "paid":
+        return False
+    if ticket.status == "available" or ticket.short_code is None:
+        return True
+    return ticket.hold_expires_at is not None and ticket.hold_expires_at <= (now or datetime.now(timezone.utc))
+
+
+def release_expired_holds(db: Session, *, batch_size: int = 500, now: datetime | None = None) -> int:
+    """Release one batch of expired unpaid holds; returns the number released.
+
+    Released tickets go back to `available` with their short code and ticket
+    number cleared, which returns both to their allocators (they only ever
+    look at non-null values). Prior holders get an unassign_email.
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = db.execute(
+        select(Ticket.id, Ticket.event_id, Ticket.customer_id)
+        .where(
+            Ticket.hold_expires_at <= now,
+            Ticket.payment_status == "unpaid",
+            Ticket.status.in_(["held", "assigned"]),
+        )
+        .order_by(Ticket.hold_expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    ids = [r.id for r in rows]
+    db.execute(
+        update(Ticket)
+        .where(Ticket.id.in_(ids))
+        .values(
+            status="available",
+            customer_id=None,
+            holder_contact_id=None,
+            purchase_id=None,
+            short_code=None,
+            ticket_number=None,
+            assigned_at=None,
+            delivered_at=None,
+            delivery_status="not_sent",
+            hold_expires_at=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    customer_ids = {r.customer_id for r in rows if r.customer_id}
+    emails = dict(
+        db.execute(select(Customer.id, Customer.email).where(Customer.id.in_(customer_ids))).all()
+    ) if customer_ids else {}
+    events = {
+        ev.id: ev for ev in db.execute(select(Event).where(Event.id.in_({r.event_id for r in rows}))).scalars()
+    }
+    for r in rows:
+        to_email = emails.get(r.customer_id)
+        if not to_email:
+            continue
+        ev = events.get(r.event_id)
+        try:
+            subject, text, html = templates.unassign_email(
+                ev.title if ev else "Event", ev.starts_at.isoformat() if ev else "", EXPIRED_REASON
+            )
+            send_and_log(to_email=to_email, subject=subject, text=text, html=html, template_name='unassign_email', context={'event_id': r.event_id, 'reason': 'hold_expired'}, db=db, related={'event_id': r.event_id, 'ticket_id': r.id})
+        except Exception:
+            logger.exception("Failed to notify holder of expired ticket %s", r.id)
+    logger.info("Released %d expired holds", len(ids))
+    return len(ids)
+
+
+def sweep(db: Session, *, batch_size: int | None = None) -> int:
+    """Release expired holds batch by batch until none are left."""
+    batch_size = batch_size or settings.hold_sweep_batch_size
+    total = 0
+    while True:
+        n = release_expired_holds(db, batch_size=batch_size)
+        total += n
+        if n < batch_size:
+            return total
+
+
+class HoldSweeper:
+    """Background thread running `sweep` every `interval` seconds."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="hold-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        from app.db.session import SessionLocal
+
+        while not self._stop.wait(self.interval):
+            try:
+                with SessionLocal() as db, email_lane(BULK):
+                    sweep(db)
+            except Exception:
+                logger.exception("Hold sweep failed")
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        print(f"Released {sweep(db)} expired holds")
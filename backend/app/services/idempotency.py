@@ -0,0 +1,146 @@
+"""Idempotency-Key storage for checkout and payment endpoints.
+
+A key is claimed before the handler runs and the handler's response is stored
+against it once it succeeds. Retries then cost a single primary-key lookup
+and get the stored response back without re-running allocation or email.
+
+Keys live on their own short sessions, never on the request session, so a
+claim is visible to concurrent retries immediately and a stored response
+survives whatever the handler does with its own transaction.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.idempotency_key import IdempotencyKey
+from app.db.session import SessionLocal
+
+# An in-progress claim older than this is assumed abandoned (crashed worker) and can be re-claimed
+IN_PROGRESS_TTL = timedelta(minutes=5)
+
+
+class IdempotencyMismatch(Exception):
+    """The key was already used with a different request payload."""
+
+
+class IdempotencyInProgress(Exception):
+    """Another request holding the same key has not finished yet."""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: Any
+
+
+def request_hash(payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _stored(row: IdempotencyKey, req_hash: str) -> StoredResponse:
+    if row.request_hash != req_hash:
+        raise IdempotencyMismatch()
+    if row.status != "completed":
+        raise IdempotencyInProgress()
+    return StoredResponse(status_code=row.status_code or 200, body=row.response)
+
+
+def claim(scope: str, key: str, req_hash: str) -> StoredResponse | None:
+    """Claim `key` for this request.
+
+    Returns None when the caller now owns the key and must run the handler,
+    or the stored response when this is a replay. Raises IdempotencyMismatch
+    or IdempotencyInProgress otherwise.
+    """
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as s:
+        row = s.get(IdempotencyKey, (scope, key))
+        if row is not None and row.expires_at > now:
+            return _stored(row, req_hash)
+
+        # Insert, or take over an expired/abandoned row; a live row is left alone
+        stmt = pg_insert(IdempotencyKey).values(
+            scope=scope, key=key, request_hash=req_hash, status="in_progress", expires_at=now + IN_PROGRESS_TTL
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "status": "in_progress",
+                "status_code": None,
+                "response": None,
+                "created_at": now,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now,
+        ).returning(IdempotencyKey.key)
+        claimed = s.execute(stmt).first()
+        s.commit()
+        if claimed:
+            return None
+
+        # Lost a race with a concurrent request for the same key
+        row = s.execute(
+            select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if row is None:
+            raise IdempotencyInProgress()
+        return _stored(row, req_hash)
+
+
+def complete(scope: str, key: str, *, status_code: int, body: Any) -> None:
+    with SessionLocal() as s:
+        s.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .values(
+                status="completed",
+                status_code=status_code,
+                response=body,
+                expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.idempotency_ttl_hours),
+            )
+        )
+        s.commit()
+
+
+def release(scope: str, key: str) -> None:
+    """Drop an in-progress claim after the handler failed so the client can retry."""
+    with SessionLocal() as s:
+        s.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == "in_progress",
+            )
+        )
+        s.commit()
+
+
+def purge_expired(db: Session, *, batch_size: int = 1000) -> int:
+    """Delete one batch of expired keys (driven by ix_idempotency_key_expires_at)."""
+    rows = db.execute(
+        select(IdempotencyKey.scope, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+        .order_by(IdempotencyKey.expires_at)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    db.execute(
+        delete(IdempotencyKey)
+        .where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_([tuple(r) for r in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(rows)
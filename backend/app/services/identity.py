@@ -0,0 +1,85 @@
+"""Contact/customer resolution by email.
+
+Every flow that attaches a person to a ticket or purchase needs both a
+`customer` row (ticket.customer_id) and a `contact` row (holder/buyer). Both
+are upserted set-based with INSERT ... ON CONFLICT (email) DO UPDATE ...
+RETURNING, so a batch of any size costs two statements and concurrent buyers
+with the same email never hit a duplicate-key error.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.contact import Contact
+from app.db.models.customer import Customer
+
+
+@dataclass(frozen=True)
+class PersonInput:
+    email: str
+    first_name: str | None = None
+    last_name: str | None = None
+    phone: str | None = None
+
+
+@dataclass(frozen=True)
+class Identity:
+    customer_id: int
+    contact_id: int
+
+
+def _merge(people: Iterable[PersonInput]) -> list[dict]:
+    """Collapse duplicate emails (ON CONFLICT cannot touch one row twice per statement).
+
+    The first non-empty value for each field wins. Rows are sorted by email so
+    concurrent batches lock rows in the same order and cannot deadlock.
+    """
+    merged: dict[str, dict] = {}
+    for p in people:
+        if not p.email:
+            continue
+        row = merged.setdefault(p.email, {"email": p.email, "first_name": None, "last_name": None, "phone": None})
+        for key in ("first_name", "last_name", "phone"):
+            if row[key] is None and getattr(p, key):
+                row[key] = getattr(p, key)
+    return [merged[k] for k in sorted(merged)]
+
+
+def _upsert(db: Session, model, rows: list[dict]) -> dict[str, int]:
+    stmt = pg_insert(model).values(rows)
+    # Only fill gaps: existing names/phones are never overwritten by a later checkout.
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.email],
+        set_={
+            "first_name": func.coalesce(model.first_name, stmt.excluded.first_name),
+            "last_name": func.coalesce(model.last_name, stmt.excluded.last_name),
+            "phone": func.coalesce(model.phone, stmt.excluded.phone),
+        },
+    ).returning(model.email, model.id)
+    return {email: id_ for email, id_ in db.execute(stmt).all()}
+
+
+def resolve_identities(db: Session, people: Iterable[PersonInput]) -> dict[str, Identity]:
+    """Resolve (or create) customer and contact ids for every email in `people`."""
+    rows = _merge(people)
+    if not rows:
+        return {}
+    customer_ids = _upsert(db, Customer, rows)
+    contact_ids = _upsert(db, Contact, rows)
+    return {r["email"]: Identity(customer_id=customer_ids[r["email"]], contact_id=contact_ids[r["email"]]) for r in rows}
+
+
+def resolve_identity(
+    db: Session,
+    *,
+    email: str,
+    first_name: str | None = None,
+    last_name: str | None = None,
+    phone: str | None = None,
+) -> Identity:
+    return resolve_identities(db, [PersonInput(email=email, first_name=first_name, last_name=last_name, phone=phone)])[email]
@@ -0,0 +1,303 @@
+"""Postgres-backed job queue for operations too large for one request.
+
+A job is a `job` row (kind, params, progress, result) plus a registered
+handler for its kind. `enqueue` stores the row; workers claim due jobs with
+FOR UPDATE SKIP LOCKED, so any number of worker threads and processes share
+the queue without double-running a job. Clients poll `GET /jobs/{id}`.
+
+Handlers are plain functions registered with `@register("kind")` in the
+modules listed in HANDLER_MODULES. They get a session and a `JobContext`
+carrying the params and a `progress()` callback, and return a JSON-compatible
+result dict. A handler that raises is retried with exponential backoff until
+`max_attempts`; a retry starts over, so handlers must be safe to re-run.
+Cancellation is cooperative: `progress()` raises JobCancelled once a cancel
+has been requested.
+
+Workers run embedded in each API process (JOB_THREADS) and/or standalone:
+``python -m app.worker``.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.job import Job
+from app.db.session import SessionLocal
+from app.integrations.email.scheduler import BULK, email_lane
+
+logger = logging.getLogger(__name__)
+
+# Modules whose import registers job handlers
+HANDLER_MODULES = (
+    "app.services.bulk_tickets",
+    "app.services.bulk_import",
+    "app.services.seeding",
+)
+
+RETRY_BASE = timedelta(seconds=10)
+RETRY_MAX = timedelta(minutes=10)
+HEARTBEAT_INTERVAL = 30.0
+# A running job whose worker has been silent this long is assumed dead and re-queued
+STALE_AFTER = timedelta(minutes=5)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once cancellation of its job has been requested."""
+
+
+class JobContext:
+    def __init__(self, job_id: int, params: dict) -> None:
+        self.job_id = job_id
+        self.params = params
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """Record progress on its own short transaction; raises JobCancelled if a cancel is pending."""
+        values: dict[str, Any] = {"progress_done": done, "heartbeat_at": datetime.now(timezone.utc)}
+        if total is not None:
+            values["progress_total"] = total
+        with SessionLocal() as db:
+            cancel = db.execute(
+                update(Job).where(Job.id == self.job_id).values(**values).returning(Job.cancel_requested)
+            ).scalar_one_or_none()
+            db.commit()
+        if cancel:
+            raise JobCancelled()
+
+
+Handler = Callable[[Session, JobContext], dict]
+HANDLERS: dict[str, Handler] = {}
+
+
+def register(kind: str) -> Callable[[Handler], Handler]:
+    def decorator(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def load_handlers() -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    params: dict,
+    *,
+    max_attempts: int | None = None,
+    run_after: datetime | None = None,
+    commit: bool = True,
+) -> Job:
+    """Store a job; with commit=False it joins the caller's transaction and runs only if that commits."""
+    if kind not in HANDLERS:
+        load_handlers()
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind}")
+    job = Job(kind=kind, params=params, status="queued", max_attempts=max_attempts or settings.job_max_attempts)
+    if run_after is not None:
+        job.run_after = run_after
+    db.add(job)
+    if not commit:
+        db.flush()
+        return job
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def cancel(db: Session, job_id: int) -> Job | None:
+    """Cancel a queued job outright, or ask a running one to stop at its next progress report."""
+    job = db.execute(select(Job).where(Job.id == job_id).with_for_update()).scalar_one_or_none()
+    if job is None:
+        return None
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.now(timezone.utc)
+    elif job.status == "running":
+        job.cancel_requested = True
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+# A job going back to the queue stays stopped if a cancel arrived while it ran
+_REQUEUED_STATUS = case((Job.cancel_requested, "cancelled"), else_="queued")
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE * (2 ** max(attempts - 1, 0)), RETRY_MAX)
+
+
+def requeue_stale(db: Session) -> int:
+    """Put running jobs whose worker stopped heartbeating back in the queue.
+
+    A dead worker used up the attempt it claimed, so a job already at
+    max_attempts is failed instead: a job that kills its worker must not be
+    retried forever.
+    """
+    now = datetime.now(timezone.utc)
+    exhausted = Job.attempts >= Job.max_attempts
+    status = case((Job.cancel_requested, "cancelled"), (exhausted, "failed"), else_="queued")
+    rows = db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.heartbeat_at < now - STALE_AFTER)
+        .values(
+            status=status,
+            locked_by=None,
+            run_after=now,
+            error=case(
+                (Job.cancel_requested, Job.error),
+                (exhausted, "Worker stopped responding on the final attempt"),
+                else_=Job.error,
+            ),
+            finished_at=case((Job.cancel_requested | exhausted, now), else_=Job.finished_at),
+        )
+        .returning(Job.id, Job.status)
+    ).all()
+    db.commit()
+    requeued = [r.id for r in rows if r.status == "queued"]
+    failed = [r.id for r in rows if r.status == "failed"]
+    if requeued:
+        logger.warning("Re-queued %d stale jobs: %s", len(requeued), requeued)
+    if failed:
+        logger.error("Failed %d stale jobs out of attempts: %s", len(failed), failed)
+    return len(rows)
+
+
+def claim_next(db: Session, worker_id: str) -> Job | None:
+    """Claim the oldest due queued job, or None. The claim commits before the handler runs."""
+    now = datetime.now(timezone.utc)
+    job = db.execute(
+        select(Job)
+        .where(Job.status == "queued", Job.run_after <= now, Job.attempts < Job.max_attempts)
+        .order_by(Job.run_after, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        db.rollback()
+        return None
+    job.status = "running"
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.heartbeat_at = now
+    job.started_at = job.started_at or now
+    job.error = None
+    db.commit()
+    return job
+
+
+def _finish(job_id: int, **values: Any) -> None:
+    with SessionLocal() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(locked_by=None, **values))
+        db.commit()
+
+
+def execute(db: Session, job: Job) -> None:
+    """Run a claimed job's handler and record the outcome (success, retry, failure or cancellation)."""
+    job_id, kind, attempts, max_attempts = job.id, job.kind, job.attempts, job.max_attempts
+    params = dict(job.params or {})
+    handler = HANDLERS.get(kind)
+    if handler is None:
+        _finish(job_id, status="failed", error=f"No handler registered for {kind}", finished_at=datetime.now(timezone.utc))
+        return
+    try:
+        # Job emails queue behind interactive ones
+        with email_lane(BULK):
+            result = handler(db, JobContext(job_id, params))
+    except JobCancelled:
+        db.rollback()
+        logger.info("Job %s (%s) cancelled", job_id, kind)
+        _finish(job_id, status="cancelled", finished_at=datetime.now(timezone.utc))
+        return
+    except Exception as exc:
+        db.rollback()
+        error = f"{exc.__class__.__name__}: {exc}"
+        if attempts < max_attempts:
+            delay = retry_delay(attempts)
+            logger.warning("Job %s (%s) attempt %d failed (%s); retrying in %ss", job_id, kind, attempts, error, int(delay.total_seconds()))
+            _finish(job_id, status=_REQUEUED_STATUS, error=error, run_after=datetime.now(timezone.utc) + delay)
+        else:
+            logger.exception("Job %s (%s) failed after %d attempts", job_id, kind, attempts)
+            _finish(job_id, status="failed", error=error, finished_at=datetime.now(timezone.utc))
+        return
+    _finish(job_id, status="succeeded", result=result, finished_at=datetime.now(timezone.utc))
+
+
+class Worker:
+    """Claims and runs jobs on `concurrency` threads until stopped."""
+
+    def __init__(self, concurrency: int, poll_interval: float | None = None) -> None:
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or settings.job_poll_interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._running: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        load_handlers()
+        self._stop.clear()
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, args=(f"{self.worker_id}:{i}",), name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        hb = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        hb.start()
+        self._threads.append(hb)
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def wait(self) -> None:
+        while not self._stop.wait(1.0):
+            pass
+
+    def _loop(self, slot_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                with SessionLocal() as db:
+                    job = claim_next(db, slot_id)
+                    if job is None:
+                        self._stop.wait(self.poll_interval)
+                        continue
+                    with self._lock:
+                        self._running[slot_id] = job.id
+                    try:
+                        execute(db, job)
+                    finally:
+                        with self._lock:
+                            self._running.pop(slot_id, None)
+            except Exception:
+                logger.exception("Job worker %s loop error", slot_id)
+                self._stop.wait(self.poll_interval)
+
+    def _heartbeat(self) -> None:
+        # Keeps long handlers that rarely report progress from looking stale, and recovers others' dead jobs
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self._lock:
+                    ids = list(self._running.values())
+                with SessionLocal() as db:
+                    if ids:
+                        db.execute(update(Job).where(Job.id.in_(ids)).values(heartbeat_at=datetime.now(timezone.utc)))
+                        db.commit()
+                    requeue_stale(db)
+            except Exception:
+                logger.exception("Job heartbeat failed")
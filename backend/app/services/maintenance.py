@@ -0,0 +1,67 @@
+"""Periodic database housekeeping, independent of the hold sweeper.
+
+`MaintenanceLoop` runs `run_once` every MAINTENANCE_INTERVAL_SECONDS in each
+API process. Every task is safe to run from several processes at once, so the
+loop keeps going even when HOLD_SWEEP_INTERVAL_SECONDS=0 leaves hold release to
+cron. Run one pass by hand with ``python -m app.services.maintenance``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.services.contact_search import refresh_queued_stats
+from app.services.email_log_retention import maintain_if_due
+from app.services.idempotency import purge_expired
+
+logger = logging.getLogger(__name__)
+
+
+def run_once(db: Session) -> None:
+    # Expired Idempotency-Key rows, one batch per pass
+    purge_expired(db)
+    # email_log partitions and retention, at most hourly
+    maintain_if_due(db)
+    # contact_stats for contacts touched since the last pass or contacts page view
+    refresh_queued_stats(db)
+
+
+class MaintenanceLoop:
+    """Background thread running `run_once` every `interval` seconds."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        from app.db.session import SessionLocal
+
+        while not self._stop.wait(self.interval):
+            try:
+                with SessionLocal() as db:
+                    run_once(db)
+            except Exception:
+                logger.exception("Database maintenance failed")
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        run_once(db)
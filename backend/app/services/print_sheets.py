@@ -0,0 +1,152 @@
+"""Printable ticket and badge sheets for will-call and comp desks.
+
+A sheet is an HTML document of A4 pages, each page one SVG holding a grid of
+cut-out cards: QR, ticket number, holder name, ticket type and code. Browsers
+print it one page per sheet of paper, and the SVG stays sharp at any DPI.
+
+Pages are rendered in the QR process pool (`render_page` runs there) while
+tickets are read in id order a few pages at a time, and each page is sent as
+soon as it and those before it are ready. At most PAGES_IN_FLIGHT pages per
+pool process exist at once, so a 5,000-ticket event streams in constant
+memory.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from html import escape
+from typing import Any, AsyncIterator
+
+import segno
+from sqlalchemy import func, select
+
+from app.db.models.contact import Contact
+from app.db.models.customer import Customer
+from app.db.models.ticket import Ticket
+from app.db.models.ticket_type import TicketType
+from app.db.session import SessionLocal
+from app.services.qr import renderer
+from app.services.qr_signing import qr_payload
+
+# (columns, rows) of cards per A4 page
+LAYOUTS = {"tickets": (2, 4), "badges": (2, 3)}
+PAGE_W, PAGE_H, MARGIN = 210, 297, 8  # mm
+PAGES_IN_FLIGHT = 2
+PAGES_PER_QUERY = 8
+
+_HEAD = (
+    "<!doctype html><html><head><meta charset=\"utf-8\"><title>{title}</title><style>"
+    "@page{{size:A4;margin:0}}body{{margin:0}}"
+    "svg.page{{display:block;width:210mm;height:297mm;page-break-after:always;break-after:page}}"
+    "</style></head><body>\n"
+)
+_TAIL = "</body></html>\n"
+
+
+def _qr_svg(data: str, x: float, y: float, size: float) -> str:
+    inner = segno.make(data, error='m').svg_inline(scale=1, border=0, omitsize=True)
+    return inner.replace("<svg ", f'<svg x="{x:.1f}" y="{y:.1f}" width="{size:.1f}" height="{size:.1f}" ', 1)
+
+
+def _text(x: float, y: float, size: float, value: str | None, *, bold: bool = False, anchor: str = "start") -> str:
+    if not value:
+        return ""
+    weight = ' font-weight="bold"' if bold else ""
+    return f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" text-anchor="{anchor}"{weight}>{escape(value)}</text>'
+
+
+def render_page(event_title: str, cards: list[dict[str, Any]], layout: str) -> str:
+    """One A4 page as SVG; runs in a pool process."""
+    cols, rows = LAYOUTS[layout]
+    cw = (PAGE_W - 2 * MARGIN) / cols
+    ch = (PAGE_H - 2 * MARGIN) / rows
+    out = [
+        f'<svg class="page" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {PAGE_W} {PAGE_H}"'
+        ' font-family="Helvetica, Arial, sans-serif">'
+    ]
+    for i, card in enumerate(cards):
+        x = MARGIN + (i % cols) * cw
+        y = MARGIN + (i // cols) * ch
+        out.append(
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{cw:.1f}" height="{ch:.1f}"'
+            ' fill="none" stroke="#999" stroke-width="0.2" stroke-dasharray="2 1"/>'
+        )
+        number = f"No. {card['number']}" if card["number"] else None
+        code = f"Code {card['code']}"
+        if layout == "badges":
+            # Name across the top, QR centred below
+            cx = x + cw / 2
+            out.append(_text(cx, y + 18, 9, card["name"] or "Guest", bold=True, anchor="middle"))
+            out.append(_text(cx, y + 26, 5, card["type"], anchor="middle"))
+            qs = min(cw, ch) * 0.45
+            out.append(_qr_svg(card["qr"], cx - qs / 2, y + 32, qs))
+            out.append(_text(cx, y + 38 + qs, 4, " · ".join(filter(None, [number, code])), anchor="middle"))
+            out.append(_text(cx, y + ch - 5, 3.5, event_title, anchor="middle"))
+        else:
+            # QR on the left, details on the right
+            qs = min(ch - 12, cw * 0.5)
+            out.append(_qr_svg(card["qr"], x + 5, y + (ch - qs) / 2, qs))
+            tx = x + qs + 9
+            out.append(_text(tx, y + 14, 3.5, event_title))
+            out.append(_text(tx, y + 24, 5, card["name"], bold=True))
+            out.append(_text(tx, y + 31, 4, card["type"]))
+            out.append(_text(tx, y + 38, 4, number))
+            out.append(_text(tx, y + 45, 4, code, bold=True))
+    out.append("</svg>\n")
+    return "".join(out)
+
+
+def _fetch(filters: dict[str, Any], after_id: int, limit: int) -> list[dict[str, Any]]:
+    holder = func.coalesce(
+        func.nullif(func.concat_ws(" ", Contact.first_name, Contact.last_name), ""),
+        func.nullif(func.concat_ws(" ", Customer.first_name, Customer.last_name), ""),
+    )
+    stmt = (
+        select(Ticket.id, Ticket.event_id, Ticket.ticket_type_id, Ticket.short_code, Ticket.ticket_number,
+               TicketType.name.label("type_name"), holder.label("holder"))
+        .outerjoin(TicketType, TicketType.id == Ticket.ticket_type_id)
+        .outerjoin(Contact, Contact.id == Ticket.holder_contact_id)
+        .outerjoin(Customer, Customer.id == Ticket.customer_id)
+        .where(Ticket.event_id == filters["event_id"], Ticket.short_code.is_not(None), Ticket.id > after_id)
+        .order_by(Ticket.id)
+        .limit(limit)
+    )
+    if filters.get("ticket_type_ids"):
+        stmt = stmt.where(Ticket.ticket_type_id.in_(filters["ticket_type_ids"]))
+    if filters.get("statuses"):
+        stmt = stmt.where(Ticket.status.in_(filters["statuses"]))
+    if filters.get("payment_statuses"):
+        stmt = stmt.where(Ticket.payment_status.in_(filters["payment_statuses"]))
+    with SessionLocal() as db:
+        rows = db.execute(stmt).all()
+    return [
+        {"id": r.id, "qr": qr_payload(r), "code": r.short_code, "number": r.ticket_number, "name": r.holder, "type": r.type_name}
+        for r in rows
+    ]
+
+
+async def stream_sheet(event_title: str, filters: dict[str, Any], layout: str) -> AsyncIterator[str]:
+    """Yield the sheet document page by page, rendering ahead across the pool."""
+    cols, rows = LAYOUTS[layout]
+    per_page = cols * rows
+    window = max(renderer.processes, 1) * PAGES_IN_FLIGHT
+    pending: deque[asyncio.Future] = deque()
+    yield _HEAD.format(title=escape(event_title))
+    try:
+        after_id = 0
+        while True:
+            cards = await asyncio.to_thread(_fetch, filters, after_id, per_page * PAGES_PER_QUERY)
+            for i in range(0, len(cards), per_page):
+                pending.append(asyncio.ensure_future(renderer.run_async(render_page, event_title, cards[i:i + per_page], layout)))
+                while len(pending) >= window:
+                    yield await pending.popleft()
+            if len(cards) < per_page * PAGES_PER_QUERY:
+                break
+            after_id = cards[-1]["id"]
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # Client went away: drop pages not yet started
+        for f in pending:
+            f.cancel()
+    yield _TAIL
@@ -0,0 +1,149 @@
+"""QR rendering off the request path.
+
+segno's encoder is pure Python and holds the GIL, so a burst of PNG renders
+in the API process stalls every other request on that worker. Renders run in
+a process pool of QR_PROCESSES workers instead (0 renders in a worker thread,
+never on the event loop). Identical `(data, scale, kind)` requests in flight
+share one render, and at most QR_MAX_PENDING distinct renders may be queued;
+past that `submit` raises QrBusy and /qr answers 503 rather than queueing
+without bound.
+Printable sheets (app.services.print_sheets) render whole pages in the same
+pool through `run`.
+
+The pool uses spawn, not fork: the API process runs sender, log and sweeper
+threads whose locks a forked child could inherit held.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable
+
+import segno
+
+from app.core import metrics
+from app.core.config import settings
+
+KINDS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+class QrBusy(RuntimeError):
+    """Raised by `QrRenderer.submit` when QR_MAX_PENDING renders are already queued."""
+
+
+def render(data: str, scale: int, kind: str) -> bytes:
+    """Encode one QR; runs in a pool process."""
+    buf = io.BytesIO()
+    segno.make(data, error='m').save(buf, kind=kind, scale=scale)
+    return buf.getvalue()
+
+
+class QrRenderer:
+    def __init__(self, processes: int, max_pending: int) -> None:
+        self.processes = processes
+        self.max_pending = max_pending
+        self._pool: ProcessPoolExecutor | None = None
+        self._inflight: dict[tuple[str, int, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, data: str, scale: int, kind: str) -> Future:
+        """Future for the rendered bytes, shared with any identical render already in flight."""
+        key = (data, scale, kind)
+        pooled = False
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                metrics.QR_RENDERS.inc(outcome="coalesced")
+                return future
+            if self.processes <= 0:
+                future = Future()
+            else:
+                if len(self._inflight) >= self.max_pending:
+                    metrics.QR_RENDERS.inc(outcome="rejected")
+                    raise QrBusy(f"{len(self._inflight)} QR renders pending")
+                try:
+                    future = self._executor().submit(render, data, scale, kind)
+                except BrokenProcessPool:
+                    # A worker died (OOM kill, crash); start a fresh pool
+                    self._pool = None
+                    future = self._executor().submit(render, data, scale, kind)
+                self._inflight[key] = future
+                pooled = True
+            metrics.QR_RENDERS.inc(outcome="rendered")
+        if pooled:
+            # Outside the lock: an already finished future runs the callback right here
+            future.add_done_callback(lambda _f: self._forget(key))
+        else:
+            try:
+                future.set_result(render(data, scale, kind))
+            except Exception as exc:
+                future.set_exception(exc)
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Run another picklable, module-level render function in the pool (inline with QR_PROCESSES=0)."""
+        if self.processes <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        with self._lock:
+            try:
+                return self._executor().submit(fn, *args)
+            except BrokenProcessPool:
+                self._pool = None
+                return self._executor().submit(fn, *args)
+
+    def _forget(self, key: tuple[str, int, str]) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def render(self, data: str, scale: int, kind: str) -> bytes:
+        return self.submit(data, scale, kind).result()
+
+    async def render_async(self, data: str, scale: int, kind: str) -> bytes:
+        if self.processes <= 0:
+            # Inline renders must not run on the event loop
+            return await asyncio.to_thread(self.render, data, scale, kind)
+        return await asyncio.wrap_future(self.submit(data, scale, kind))
+
+    async def run_async(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.processes <= 0:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.wrap_future(self.run(fn, *args))
+
+    async def render_many(self, items: Iterable[str], scale: int, kind: str) -> list[bytes]:
+        """Render every payload across the pool; results in input order.
+
+        Submits in windows of half QR_MAX_PENDING so a whole event never trips QrBusy on its own.
+        """
+        items = list(items)
+        out: list[bytes] = []
+        window = max(self.max_pending // 2, 1)
+        for i in range(0, len(items), window):
+            out.extend(await asyncio.gather(*(self.render_async(d, scale, kind) for d in items[i:i + window])))
+        return out
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stop(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+renderer = QrRenderer(processes=settings.qr_processes, max_pending=settings.qr_max_pending)
@@ -0,0 +1,48 @@
+"""Pre-create an event's ticket inventory up to its capacity."""
+from __future__ import annotations
+
+from typing import Callable
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models.event import Event
+from app.db.models.ticket import Ticket
+from app.services.jobs import JobContext, register
+
+SEED_BATCH = 1000
+
+
+def seed_event_tickets(
+    db: Session,
+    *,
+    event_id: int,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict:
+    """Create `available` tickets until the event has `capacity` tickets.
+
+    Inserts in multi-row batches, committing each, so a large event neither
+    holds one huge transaction nor builds thousands of ORM objects. Safe to
+    re-run: it only ever tops up to capacity.
+    """
+    ev = db.get(Event, event_id)
+    if not ev:
+        raise ValueError("Event not found")
+    capacity = ev.capacity
+    existing = db.execute(select(func.count()).select_from(Ticket).where(Ticket.event_id == event_id)).scalar_one()
+    to_create = max(capacity - existing, 0)
+    created = 0
+    while created < to_create:
+        n = min(SEED_BATCH, to_create - created)
+        db.execute(insert(Ticket), [{"event_id": event_id, "uuid": str(uuid4())} for _ in range(n)])
+        db.commit()
+        created += n
+        if progress is not None:
+            progress(created, to_create)
+    return {"event_id": event_id, "capacity": capacity, "existing": existing, "created": to_create}
+
+
+@register("events.seed_tickets")
+def seed_event_tickets_job(db: Session, ctx: JobContext) -> dict:
+    return seed_event_tickets(db, event_id=ctx.params["event_id"], progress=ctx.progress)
@@ -3,28 +3,21 @@ import os
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
+from app.core import metrics
 from app.db.models.event import Event
 from app.db.models.ticket import Ticket
 from app.db.models.customer import Customer
-from app.db.models.contact import Contact
 from app.db.models.purchase import Purchase
 from app.db.models.ticket_type import TicketType
-from app.utils.codes import generate_short_code
+from app.utils.codes import generate_short_code, lock_event_codes
 from app.services.allocator import allocate_next_ticket_number
+from app.services.holds import format_expiry, hold_expiry
+from app.services.identity import resolve_identity
+from app.services.qr_signing import qr_url as ticket_qr_url
 from app.integrations.email.service import send_and_log
 from app.integrations.email import templates
 
 
-def find_or_create_customer(db: Session, *, email: str, first_name: str | None, last_name: str | None, phone: str | None) -> Customer:
-    existing = db.execute(select(Customer).where(Customer.email == email)).scalar_one_or_none()
-    if existing:
-        return existing
-    c = Customer(email=email, first_name=first_name, last_name=last_name, phone=phone)
-    db.add(c)
-    db.flush()
-    return c
-
-
 def assign_ticket(
     db: Session,
     *,
@@ -73,16 +66,12 @@ def assign_ticket(
             if used_of_type >= tt.max_quantity:
                 raise RuntimeError("Ticket type at max quantity")
 
-    customer = find_or_create_customer(db, email=customer_email, first_name=first_name, last_name=last_name, phone=phone)
-    # Ensure a contact exists for this email as well (unified contacts)
-    contact = db.execute(select(Contact).where(Contact.email == customer_email)).scalar_one_or_none()
-    if not contact:
-        contact = Contact(email=customer_email, first_name=first_name, last_name=last_name, phone=phone)
-        db.add(contact)
-        db.flush()
+    # Customer + contact for this email (unified contacts)
+    identity = resolve_identity(db, email=customer_email, first_name=first_name, last_name=last_name, phone=phone)
 
     if desired_short_code is not None:
         # Validate desired code availability
+        lock_event_codes(db, event_id)
         exists = db.execute(
             select(Ticket.id).where(Ticket.event_id == event_id, Ticket.short_code == desired_short_code)
         ).scalar_one_or_none()
@@ -93,7 +82,7 @@ def assign_ticket(
         code = generate_short_code(db, event_id)
 
     # Assign
-    ticket.customer_id = customer.id
+    ticket.customer_id = identity.customer_id
     ticket.short_code = code
     # Allocate a human-visible ticket number if not already present
     if not ticket.ticket_number:
@@ -111,19 +100,53 @@ def assign_ticket(
         ticket.payment_status = "unpaid"
     else:
         ticket.payment_status = payment_status
+    # Unpaid reservations are held for HOLD_TTL, then released by the sweeper
+    ticket.hold_expires_at = hold_expiry(now) if ticket.payment_status == "unpaid" else None
     # If paid/waived at assignment time, create a purchase and associate
     if ticket.payment_status in ("paid", "waived"):
         from uuid import uuid4
-        p = Purchase(buyer_contact_id=contact.id, uuid=str(uuid4()))
+        p = Purchase(buyer_contact_id=identity.contact_id, uuid=str(uuid4()))
         db.add(p)
         db.flush()
         ticket.purchase_id = p.id
     db.add(ticket)
     db.commit()
     db.refresh(ticket)
+    if ticket.payment_status == "unpaid":
+        metrics.TICKET_RESERVATIONS.inc(ticket_type_id=ticket.ticket_type_id or "none")
+    elif ticket.payment_status == "paid":
+        metrics.TICKET_CHECKOUTS.inc(ticket_type_id=ticket.ticket_type_id or "none")
 
     # Deliver email based on payment status
-    event_when = ev.starts_at.isoformat()
+    tt_name = None
+    if ticket.payment_status == "unpaid" and ticket_type_id is not None:
+        tt = db.get(TicketType, ticket_type_id)
+        tt_name = tt.name if tt else None
+    if send_assignment_email(db, ev=ev, ticket=ticket, to_email=customer_email, ticket_type_name=tt_name):
+        ticket.delivery_status = "sent"
+        ticket.delivered_at = now
+    db.add(ticket)
+    db.commit()
+    db.refresh(ticket)
+
+    return ticket
+
+
+def send_assignment_email(
+    db: Session,
+    *,
+    ev: Event,
+    ticket: Ticket,
+    to_email: str,
+    ticket_type_name: str | None = None,
+) -> bool:
+    """Email a newly assigned holder: the reservation email while unpaid, the ticket (with QR) otherwise.
+
+    Returns True when a ticket email was sent, so the caller can record delivery.
+    Failures are swallowed; assignment never fails because of email.
+    """
+    app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
+    view_link = f"{app_origin2}/ticket?ref={ticket.uuid}"
     if ticket.payment_status == "unpaid":
         # Send reserved assignment to holder
         try:
@@ -138,44 +161,59 @@ def assign_ticket(
             s_str = f"{_pad(s.day)}/{_pad(s.month)}/{s.year} {_time(s)}"
             e_str = f"{_pad(e.day)}/{_pad(e.month)}/{e.year} {_time(e)}" if e else None
             event_dt = f"{s_str}{(' — ' + e_str) if e_str else ''}"
-            expires = (_dt.datetime.now(_dt.timezone.utc) + _dt.timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
-            app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-            view_link = f"{app_origin2}/ticket?ref={ticket.uuid}"
-            tt_name = None
-            if ticket_type_id is not None:
-                tt = db.get(TicketType, ticket_type_id)
-                tt_name = tt.name if tt else None
+            expires = format_expiry(ticket.hold_expires_at)
             subject, text, html = templates.reserved_assignment_holder(
-                buyer_name=customer_email,  # placeholder if buyer name unknown in this flow
+                buyer_name=to_email,  # placeholder if buyer name unknown in this flow
                 event_title=ev.title,
                 event_datetime=event_dt,
-                ticket_type_name=tt_name or 'Ticket',
+                ticket_type_name=ticket_type_name or 'Ticket',
                 reservation_expires_at=expires,
                 ticket_number=ticket.ticket_number,
                 view_ticket_link=view_link,
             )
-            send_and_log(to_email=customer_email, subject=subject, text=text, html=html, template_name='reserved_assignment_holder', context={'event_id': ev.id}, db=db, related={'event_id': ev.id, 'ticket_id': ticket.id})
-        except Exception:
-            pass
-    else:
-        # Send the actual ticket email (with QR) for paid/waived
-        api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-        qr_url = f"{api_origin}/qr?data={code}&scale=6&format=png"
-        app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-        view_link = f"{app_origin2}/ticket?ref={ticket.uuid}"
-        try:
-            subject, text, html = templates.ticket_email(ev.title, event_when, code, qr_url, view_link, ticket.ticket_number)
-            ok = send_and_log(to_email=customer_email, subject=subject, text=text, html=html, template_name='ticket_email', context={'event_id': ev.id, 'code': code}, db=db, related={'event_id': ev.id, 'ticket_id': ticket.id})
-            if ok:
-                ticket.delivery_status = "sent"
-                ticket.delivered_at = now
+            send_and_log(to_email=to_email, subject=subject, text=text, html=html, template_name='reserved_assignment_holder', context={'event_id': ev.id}, db=db, related={'event_id': ev.id, 'ticket_id': ticket.id})
         except Exception:
             pass
-    db.add(ticket)
-    db.commit()
-    db.refresh(ticket)
+        return False
+    # Send the actual ticket email (with QR) for paid/waived
+    code = ticket.short_code
+    qr_url = ticket_qr_url(ticket)
+    try:
+        subject, text, html = templates.ticket_email(ev.title, ev.starts_at.isoformat(), code, qr_url, view_link, ticket.ticket_number)
+        return bool(send_and_log(to_email=to_email, subject=subject, text=text, html=html, template_name='ticket_email', context={'event_id': ev.id, 'code': code}, db=db, related={'event_id': ev.id, 'ticket_id': ticket.id}))
+    except Exception:
+        return False
 
-    return ticket
+
+def send_payment_reminder_email(
+    db: Session,
+    *,
+    ev: Event | None,
+    ticket: Ticket,
+    to_email: str,
+    ticket_type: TicketType | None = None,
+) -> bool:
+    """Reservation-style confirmation with a pay link for an unpaid ticket; False if sending failed."""
+    app_origin = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
+    pay_link = f"{app_origin}/pay?token={ticket.uuid}"
+    # Minimal line and total
+    tt = ticket_type
+    lines = f"1 x {tt.name if tt else 'Ticket'} — {(tt.price_baht or 0) if tt else 0} THB each"
+    total = f"{(tt.price_baht or 0) if tt else 0} THB"
+    import datetime as _dt
+    s = ev.starts_at.astimezone(_dt.timezone.utc) if ev else _dt.datetime.now(_dt.timezone.utc)
+    e = ev.ends_at.astimezone(_dt.timezone.utc) if ev and ev.ends_at else None
+    def _pad(n:int): return str(n).zfill(2)
+    def _time(d: _dt.datetime):
+        h=d.hour; m=d.minute; am=h<12; h12=(h%12) or 12
+        return f"{h12}{(':'+_pad(m)) if m else ''}{'am' if am else 'pm'}"
+    event_dt = f"{_pad(s.day)}/{_pad(s.month)}/{s.year} {_time(s)}" + (f" — {_pad(e.day)}/{_pad(e.month)}/{e.year} {_time(e)}" if e else '')
+    expires = format_expiry(ticket.hold_expires_at)
+    try:
+        subject, text, html = templates.confirm_ticket_reservation(ev.title if ev else "Event", event_dt, 1, lines, total, expires, pay_link)
+        return bool(send_and_log(to_email=to_email, subject=subject, text=text, html=html, template_name='confirm_ticket_reservation', context={'event_id': ev.id if ev else None, 'payment_link': pay_link}, db=db, related={'event_id': ev.id if ev else None, 'ticket_id': ticket.id}))
+    except Exception:
+        return False
 
 
 def resend_code(db: Session, *, ticket_id: int) -> Ticket:
@@ -193,31 +231,12 @@ def resend_code(db: Session, *, ticket_id: int) -> Ticket:
     event_when = ev.starts_at.isoformat() if ev else ""
     if ticket.payment_status == "unpaid":
         # Use reservation-style confirmation with pay link
-        app_origin = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-        pay_link = f"{app_origin}/pay?token={ticket.uuid}"
-        # Minimal line and total
         tt = db.get(TicketType, ticket.ticket_type_id) if ticket.ticket_type_id else None
-        lines = f"1 x {tt.name if tt else 'Ticket'} — {(tt.price_baht or 0) if tt else 0} THB each"
-        total = f"{(tt.price_baht or 0) if tt else 0} THB"
-        import datetime as _dt
-        s = ev.starts_at.astimezone(_dt.timezone.utc) if ev else _dt.datetime.now(_dt.timezone.utc)
-        e = ev.ends_at.astimezone(_dt.timezone.utc) if ev and ev.ends_at else None
-        def _pad(n:int): return str(n).zfill(2)
-        def _time(d: _dt.datetime):
-            h=d.hour; m=d.minute; am=h<12; h12=(h%12) or 12
-            return f"{h12}{(':'+_pad(m)) if m else ''}{'am' if am else 'pm'}"
-        event_dt = f"{_pad(s.day)}/{_pad(s.month)}/{s.year} {_time(s)}" + (f" — {_pad(e.day)}/{_pad(e.month)}/{e.year} {_time(e)}" if e else '')
-        expires = (_dt.datetime.now(_dt.timezone.utc) + _dt.timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
-        try:
-            subject, text, html = templates.confirm_ticket_reservation(ev.title if ev else "Event", event_dt, 1, lines, total, expires, pay_link)
-            send_and_log(to_email=cust.email, subject=subject, text=text, html=html, template_name='confirm_ticket_reservation', context={'event_id': ev.id if ev else None, 'payment_link': pay_link}, db=db, related={'event_id': ev.id if ev else None, 'ticket_id': ticket.id})
-        except Exception:
-            pass
+        send_payment_reminder_email(db, ev=ev, ticket=ticket, to_email=cust.email, ticket_type=tt)
     else:
-        api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-        qr_url = f"{api_origin}/qr?data={ticket.short_code}&scale=6&format=png"
+        qr_url = ticket_qr_url(ticket)
         app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-        view_link = f"{app_origin2}/ticket?code={ticket.short_code}"
+        view_link = f"{app_origin2}/ticket?ref={ticket.uuid}"
         try:
             send_ticket_email(
                 to_email=cust.email,
@@ -254,6 +273,7 @@ def unassign_ticket(db: Session, *, ticket_id: int, reason: str | None = None) -
     t.assigned_at = None
     t.delivered_at = None
     t.delivery_status = "not_sent"
+    t.hold_expires_at = None
     db.add(t)
     db.commit()
     db.refresh(t)
@@ -320,20 +340,18 @@ def reassign_ticket(
         raise ValueError("Ticket not found")
 
     # Find or create customer + contact for new holder
-    cust = find_or_create_customer(db, email=email, first_name=first_name, last_name=last_name, phone=phone)
-    contact = db.execute(select(Contact).where(Contact.email == email)).scalar_one_or_none()
-    if not contact:
-        contact = Contact(email=email, first_name=first_name, last_name=last_name, phone=phone)
-        db.add(contact)
-        db.flush()
+    identity = resolve_identity(db, email=email, first_name=first_name, last_name=last_name, phone=phone)
 
     # Apply change
-    t.customer_id = cust.id
-    t.holder_contact_id = contact.id
+    t.customer_id = identity.customer_id
+    t.holder_contact_id = identity.contact_id
     # Transition held -> assigned on first assignment
     if t.status == "held":
         t.status = "assigned"
         t.assigned_at = datetime.now(timezone.utc)
+    # A new holder inherits the existing hold; it is never extended by reassigning
+    if t.payment_status == "unpaid" and t.hold_expires_at is None and t.status in ("held", "assigned"):
+        t.hold_expires_at = hold_expiry()
     db.add(t)
     db.commit()
     db.refresh(t)
@@ -359,14 +377,13 @@ def reassign_ticket(
                 h=d.hour; m=d.minute; am=h<12; h12=(h%12) or 12
                 return f"{h12}{(':'+_pad(m)) if m else ''}{'am' if am else 'pm'}"
             event_dt = f"{_pad(s.day)}/{_pad(s.month)}/{s.year} {_time(s)}" + (f" — {_pad(e.day)}/{_pad(e.month)}/{e.year} {_time(e)}" if e else '')
-            expires = ( _dt.datetime.now(_dt.timezone.utc) + _dt.timedelta(hours=24)).strftime('%d/%m/%Y %I:%M%p UTC')
+            expires = format_expiry(t.hold_expires_at)
             subject, text, html = templates.confirm_ticket_reservation(ev.title if ev else "Event", event_dt, 1, lines, total, expires, pay_link)
             send_and_log(to_email=email, subject=subject, text=text, html=html, template_name='confirm_ticket_reservation', context={'event_id': ev.id if ev else None, 'payment_link': pay_link}, db=db, related={'event_id': ev.id if ev else None, 'ticket_id': t.id})
         else:
-            api_origin = os.getenv("PUBLIC_API_ORIGIN", os.getenv("API_BASE_URL", "http://localhost:8000"))
-            qr_url = f"{api_origin}/qr?data={t.short_code}&scale=6&format=png" if t.short_code else None
+            qr_url = ticket_qr_url(t) if t.short_code else None
             app_origin2 = os.getenv("PUBLIC_APP_ORIGIN", "http://localhost:5173")
-            view_link = f"{app_origin2}/ticket?code={t.short_code}" if t.short_code else None
+            view_link = f"{app_origin2}/ticket?ref={t.uuid}"
             subject, text, html = templates.ticket_email(ev.title if ev else "Event", event_when, t.short_code or "", qr_url, view_link, t.ticket_number)
             send_and_log(to_email=email, subject=subject, text=text, html=html, template_name='ticket_email', context={'event_id': ev.id if ev else None, 'code': t.short_code}, db=db, related={'event_id': ev.id if ev else None, 'ticket_id': t.id})
     except Exception:
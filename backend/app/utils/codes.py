@@ -1,15 +1,26 @@
 import random
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, text
+from app.core import metrics
 from app.db.models.ticket import Ticket
 
 
+def lock_event_codes(db: Session, event_id: int) -> None:
+    """Take the per-event advisory lock held by bulk imports and the ticket number
+    allocator until the caller's transaction ends, so no concurrent import chunk
+    can hand out a code this transaction is about to use."""
+    with metrics.ALLOCATOR_LOCK_WAIT.time():
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(event_id)})
+
+
 def generate_short_code(db: Session, event_id: int, max_attempts: int = 20) -> str:
     """
     Generate a 3-digit code (000-999) unique per event.
     Tries random attempts first, then falls back to scanning.
+    Holds the per-event code lock (see lock_event_codes).
     """
+    lock_event_codes(db, event_id)
     for _ in range(max_attempts):
         code = f"{random.randint(0, 999):03d}"
         if _is_code_free(db, event_id, code):
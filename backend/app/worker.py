@@ -0,0 +1,34 @@
+"""Standalone job worker: ``python -m app.worker [--concurrency N]``.
+
+Runs the same queue as the workers embedded in API processes; start as many
+as needed, on any host that can reach the database.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+
+from app.core.config import settings
+from app.services.jobs import Worker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs from the job table")
+    parser.add_argument("--concurrency", type=int, default=max(settings.job_threads, 1))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = Worker(concurrency=args.concurrency)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    worker.start()
+    logging.getLogger(__name__).info("Job worker %s running with %d threads", worker.worker_id, args.concurrency)
+    try:
+        worker.wait()
+    except KeyboardInterrupt:
+        pass
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
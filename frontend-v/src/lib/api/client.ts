@@ -12,7 +12,7 @@ console.log('🔍 Environment Debug:', {
   API_TOKEN: API_TOKEN ? '***TOKEN_PRESENT***' : 'NO_TOKEN'
 });
 
-async function request<T>(path: string, options?: RequestInit): Promise<T> {
+async function send(path: string, options?: RequestInit): Promise<Response> {
   const headers: Record<string, string> = { 'Content-Type': 'application/json', ...(options?.headers as any || {}) };
   if (API_TOKEN) headers['X-Auth-Token'] = API_TOKEN;
   const res = await fetch(`${API_BASE}${path}`, {
@@ -27,13 +27,64 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
     } catch {}
     throw new Error(msg);
   }
+  return res;
+}
+
+async function request<T>(path: string, options?: RequestInit): Promise<T> {
+  const res = await send(path, options);
   if (res.status === 204) return undefined as unknown as T;
   return res.json() as Promise<T>;
 }
 
+// Keyset-paginated lists: pass `next` back as `cursor` until it is null
+async function requestPage<T>(path: string): Promise<{ items: T[]; next: string | null }> {
+  const res = await send(path);
+  return { items: await res.json(), next: res.headers.get('X-Next-Cursor') };
+}
+
+// Server-Sent Events over fetch (EventSource cannot send X-Auth-Token). Reconnects until stopped.
+export function streamEvents(path: string, onEvent: (event: string, data: any) => void): () => void {
+  const ctrl = new AbortController();
+  (async () => {
+    while (!ctrl.signal.aborted) {
+      try {
+        const headers: Record<string, string> = { Accept: 'text/event-stream' };
+        if (API_TOKEN) headers['X-Auth-Token'] = API_TOKEN;
+        const res = await fetch(`${API_BASE}${path}`, { headers, signal: ctrl.signal });
+        if (!res.ok || !res.body) throw new Error(`${res.status} ${res.statusText}`);
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buf = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buf += decoder.decode(value, { stream: true });
+          let idx;
+          while ((idx = buf.indexOf('\n\n')) >= 0) {
+            const chunk = buf.slice(0, idx);
+            buf = buf.slice(idx + 2);
+            let event = 'message';
+            const data: string[] = [];
+            for (const line of chunk.split('\n')) {
+              if (line.startsWith('event:')) event = line.slice(6).trim();
+              else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+            }
+            if (data.length) onEvent(event, JSON.parse(data.join('\n')));
+          }
+        }
+      } catch {
+        if (ctrl.signal.aborted) return;
+      }
+      await new Promise(r => setTimeout(r, 3000));
+    }
+  })();
+  return () => ctrl.abort();
+}
+
 export const api = {
   listEvents: (limit = 50, offset = 0) => request(`/events?limit=${limit}&offset=${offset}`),
   resolveEvent: (public_id: string) => request(`/events/public/${encodeURIComponent(public_id)}`),
+  getPublicEventPage: (public_id: string) => request(`/events/public/${encodeURIComponent(public_id)}/page`),
   createEvent: (body: any) => request('/events', { method: 'POST', body: JSON.stringify(body) }),
   updateEvent: (id: number, body: any) => request(`/events/${id}`, { method: 'PATCH', body: JSON.stringify(body) }),
   getEvent: (id: number) => request(`/events/${id}`),
@@ -70,6 +121,11 @@ export const api = {
   resendPurchasePayment: (purchase_id: number) => request(`/purchases/${purchase_id}/resend_payment`, { method: 'POST' }),
   unassignTicket: (ticket_id: number) => request('/tickets/unassign', { method: 'POST', body: JSON.stringify({ ticket_id }) }),
   refundTicket: (ticket_id: number) => request('/tickets/refund', { method: 'POST', body: JSON.stringify({ ticket_id }) }),
+  bulkRefund: (filter: any, reason?: string) => request('/tickets/bulk/refund', { method: 'POST', body: JSON.stringify({ filter, reason }) }),
+  bulkUnassign: (filter: any, reason?: string) => request('/tickets/bulk/unassign', { method: 'POST', body: JSON.stringify({ filter, reason }) }),
+  bulkResend: (filter: any) => request('/tickets/bulk/resend', { method: 'POST', body: JSON.stringify({ filter }) }),
+  getJob: (job_id: number) => request(`/jobs/${job_id}`),
+  cancelJob: (job_id: number) => request(`/jobs/${job_id}/cancel`, { method: 'POST' }),
   checkin: (event_id: number, code: string) => request('/checkin', { method: 'POST', body: JSON.stringify({ event_id, code }) }),
   reconciliation: (event_id: number) => request(`/reports/reconciliation?event_id=${event_id}`),
   reconciliationCsvUrl: (event_id: number) => `${API_BASE}/reports/reconciliation.csv?event_id=${event_id}`,
@@ -89,6 +145,12 @@ export const api = {
   payByToken: (token: string) => request('/tickets/pay', { method: 'POST', body: JSON.stringify({ token }) }),
   contentCheckout: (body: any) => request('/content/checkout', { method: 'POST', body: JSON.stringify(body) }),
   reserveConfirm: (body: { event_id: number; email: string; hold_hours?: number; items?: Array<{ ticket_type_id: number; qty: number }> }) => request('/content/reserve_confirm', { method: 'POST', body: JSON.stringify(body) }),
-  listEmailLogs: (limit = 50, offset = 0) => request(`/admin/email_logs?limit=${limit}&offset=${offset}`),
+  listEmailLogs: (opts?: { limit?: number; cursor?: string | null; event_id?: number; ticket_id?: number; purchase_id?: number; status?: string; to_email?: string; template_name?: string }) => {
+    const p = new URLSearchParams()
+    for (const [k, v] of Object.entries(opts || {})) if (v != null && v !== '') p.set(k, String(v))
+    const qs = p.toString() ? `?${p.toString()}` : ''
+    return requestPage<any>(`/admin/email_logs${qs}`)
+  },
+  getEmailLog: (id: number) => request(`/admin/email_logs/${id}`),
   sendTestEmail: (to: string) => request(`/test_email?to=${encodeURIComponent(to)}`, { method: 'POST' }),
 };
@@ -1,32 +1,50 @@
-import { useEffect, useState } from 'react'
+import { Fragment, useEffect, useState } from 'react'
 import { api } from '@/lib/api/client'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table'
 import { Input } from '@/components/ui/input'
 import { Button } from '@/components/ui/button'
 import { useToast } from '@/hooks/use-toast'
 import { logEmail } from '@/lib/devlog'
-import { Copy } from 'lucide-react'
+import { Copy, Eye } from 'lucide-react'
 
 export default function AdminEmailLogsPage() {
   const [rows, setRows] = useState<any[]>([])
   const [loading, setLoading] = useState(false)
   const [err, setErr] = useState('')
   const [q, setQ] = useState('')
+  // Server-side filters; the text box above only narrows the loaded rows
+  const [toEmail, setToEmail] = useState('')
+  const [status, setStatus] = useState('')
+  const [next, setNext] = useState<string | null>(null)
   const [testTo, setTestTo] = useState('')
+  // Bodies are not in the list response; fetched per row on demand
+  const [details, setDetails] = useState<Record<number, any>>({})
+  const [openId, setOpenId] = useState<number | null>(null)
   const { toast } = useToast()
 
-  async function load() {
+  async function load(more = false) {
     setLoading(true); setErr('')
-    try { setRows(await api.listEmailLogs(100, 0)) } catch (e:any) { setErr(e.message || 'Failed to load logs') }
+    try {
+      const page = await api.listEmailLogs({ limit: 100, cursor: more ? next : null, to_email: toEmail.trim(), status })
+      setRows(prev => more ? [...prev, ...page.items] : page.items)
+      setNext(page.next)
+    } catch (e:any) { setErr(e.message || 'Failed to load logs') }
     finally { setLoading(false) }
   }
 
   useEffect(() => { load() }, [])
 
+  async function detail(id: number) {
+    if (details[id]) return details[id]
+    const d = await api.getEmailLog(id)
+    setDetails(prev => ({ ...prev, [id]: d }))
+    return d
+  }
+
   const filtered = rows.filter(r => {
     const text = q.trim().toLowerCase()
     if (!text) return true
-    const hay = [r.to_email, r.template_name, r.subject, r.status, r.text_body].map((v:any)=> String(v||'').toLowerCase()).join(' ')
+    const hay = [r.to_email, r.template_name, r.subject, r.status].map((v:any)=> String(v||'').toLowerCase()).join(' ')
     return hay.includes(text)
   })
 
@@ -34,11 +52,18 @@ export default function AdminEmailLogsPage() {
     <section className="space-y-4">
       <div className="flex items-center gap-2">
         <h2 className="text-xl font-semibold">Email Logs</h2>
-        <Button variant="outline" size="sm" onClick={load} disabled={loading}>{loading ? 'Refreshing…' : 'Refresh'}</Button>
+        <Button variant="outline" size="sm" onClick={()=> load()} disabled={loading}>{loading ? 'Refreshing…' : 'Refresh'}</Button>
       </div>
       {err && <div className="text-sm text-destructive">{err}</div>}
       <div className="flex items-center gap-2 flex-wrap">
         <Input placeholder="Filter…" value={q} onChange={(e)=> setQ(e.target.value)} className="max-w-xs" />
+        <Input placeholder="Recipient" value={toEmail} onChange={(e)=> setToEmail(e.target.value)} onKeyDown={(e)=> { if (e.key === 'Enter') load() }} className="max-w-xs" />
+        <select className="h-9 rounded-md border bg-background px-2 text-sm" value={status} onChange={(e)=> setStatus(e.target.value)}>
+          <option value="">Any status</option>
+          <option value="sent">Sent</option>
+          <option value="failed">Failed</option>
+        </select>
+        <Button variant="outline" size="sm" onClick={()=> load()} disabled={loading}>Apply</Button>
         <div className="ml-auto flex items-center gap-2">
           <Input placeholder="Email address" value={testTo} onChange={(e)=> setTestTo(e.target.value)} className="max-w-xs" />
           <Button
@@ -69,24 +94,41 @@ export default function AdminEmailLogsPage() {
               <TableHead>Subject</TableHead>
               <TableHead>Status</TableHead>
               <TableHead>Refs</TableHead>
-              <TableHead className="w-[80px]"></TableHead>
+              <TableHead className="w-[170px]"></TableHead>
             </TableRow>
           </TableHeader>
           <TableBody>
             {filtered.map((r:any) => (
-              <TableRow key={r.id}>
+              <Fragment key={r.id}>
+              <TableRow>
                 <TableCell className="text-xs text-muted-foreground">{new Date(r.created_at).toLocaleString()}</TableCell>
                 <TableCell className="text-xs">{r.to_email}</TableCell>
                 <TableCell className="text-xs">{r.template_name}</TableCell>
                 <TableCell className="text-xs">{r.subject}</TableCell>
                 <TableCell className="text-xs capitalize">{r.status}</TableCell>
                 <TableCell className="text-xs text-muted-foreground">{[r.event_id && `ev:${r.event_id}`, r.ticket_id && `t:${r.ticket_id}`, r.purchase_id && `p:${r.purchase_id}`].filter(Boolean).join(' · ')}</TableCell>
-                <TableCell className="text-right">
+                <TableCell className="text-right space-x-1 whitespace-nowrap">
                   <Button
                     size="sm"
                     variant="outline"
                     onClick={async ()=> {
+                      if (openId === r.id) { setOpenId(null); return }
                       try {
+                        await detail(r.id)
+                        setOpenId(r.id)
+                      } catch (e:any) {
+                        toast({ title: e?.message || 'Failed to load email', variant: 'destructive' as any })
+                      }
+                    }}
+                  >
+                    <Eye className="h-4 w-4 mr-1" /> {openId === r.id ? 'Hide' : 'View'}
+                  </Button>
+                  <Button
+                    size="sm"
+                    variant="outline"
+                    onClick={async ()=> {
+                      try {
+                        const d = await detail(r.id)
                         const payload = {
                           id: r.id,
                           created_at: r.created_at,
@@ -98,7 +140,7 @@ export default function AdminEmailLogsPage() {
                           ticket_id: r.ticket_id,
                           purchase_id: r.purchase_id,
                           context: r.context || {},
-                          text_body: r.text_body || '',
+                          text_body: d.text_body || '',
                         }
                         await navigator.clipboard.writeText(JSON.stringify(payload, null, 2))
                         toast({ title: 'Copied email JSON' })
@@ -111,13 +153,27 @@ export default function AdminEmailLogsPage() {
                   </Button>
                 </TableCell>
               </TableRow>
+              {openId === r.id && details[r.id] && (
+                <TableRow>
+                  <TableCell colSpan={7}>
+                    {details[r.id].error_message && <div className="text-xs text-destructive mb-2">{details[r.id].error_message}</div>}
+                    <pre className="text-xs whitespace-pre-wrap max-h-96 overflow-auto">{details[r.id].text_body ?? 'Body no longer retained.'}</pre>
+                  </TableCell>
+                </TableRow>
+              )}
+              </Fragment>
             ))}
             {filtered.length === 0 && (
-              <TableRow><TableCell colSpan={6} className="text-center text-sm text-muted-foreground">No email logs.</TableCell></TableRow>
+              <TableRow><TableCell colSpan={7} className="text-center text-sm text-muted-foreground">No email logs.</TableCell></TableRow>
             )}
           </TableBody>
         </Table>
       </div>
+      {next && (
+        <div className="flex justify-center">
+          <Button variant="outline" size="sm" onClick={()=> load(true)} disabled={loading}>{loading ? 'Loading…' : 'Load more'}</Button>
+        </div>
+      )}
     </section>
   )
 }
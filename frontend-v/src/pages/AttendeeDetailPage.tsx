@@ -371,13 +371,13 @@ export default function AttendeeDetailPage() {
                             <TableRow key={`actions-${t.id}`}>
                               <TableCell colSpan={6}>
                                 <div className="flex flex-wrap gap-2">
-                                  <Button size="sm" variant="outline" onClick={()=> window.open(`/ticket?code=${encodeURIComponent(t.short_code || '')}`, '_blank')} disabled={!t.short_code}>
+                                  <Button size="sm" variant="outline" onClick={()=> window.open(t.ticket_uuid ? `/ticket?ref=${encodeURIComponent(t.ticket_uuid)}` : `/ticket?code=${encodeURIComponent(t.short_code || '')}`, '_blank')} disabled={!t.short_code}>
                                     <ScanEye className="h-4 w-4 mr-1" /> Preview
                                   </Button>
                                   <Button size="sm" variant="outline" onClick={async ()=> { try { await api.resendTicket(t.id); toast({ title: 'Ticket resent' }) } catch (e:any) { toast({ title: e.message || 'Failed to resend', variant: 'destructive' as any }) } }}>
                                     <Send className="h-4 w-4 mr-1" /> Resend Ticket
                                   </Button>
-                                  <Button size="sm" variant="outline" onClick={async ()=> { try { await navigator.clipboard.writeText(window.location.origin + `/ticket?code=${encodeURIComponent(t.short_code || '')}`); toast({ title: 'Link copied' }) } catch (e:any) { toast({ title: e.message || 'Copy failed', variant: 'destructive' as any }) } }} disabled={!t.short_code}>
+                                  <Button size="sm" variant="outline" onClick={async ()=> { try { await navigator.clipboard.writeText(window.location.origin + (t.ticket_uuid ? `/ticket?ref=${encodeURIComponent(t.ticket_uuid)}` : `/ticket?code=${encodeURIComponent(t.short_code || '')}`)); toast({ title: 'Link copied' }) } catch (e:any) { toast({ title: e.message || 'Copy failed', variant: 'destructive' as any }) } }} disabled={!t.short_code}>
                                     <Copy className="h-4 w-4 mr-1" /> Ticket Link
                                   </Button>
                                   <Button size="sm" variant="outline" onClick={()=> { setReassignFor(t); setREmail(contact?.email || ''); setRFirst(contact?.first_name || ''); setRLast(contact?.last_name || ''); setRPhone(contact?.phone || ''); }}>
@@ -11,6 +11,8 @@ import { Input } from '@/components/ui/input'
 export default function CheckinPage() {
   const [eventId, setEventId] = useState<number | ''>('' as any)
   const [code, setCode] = useState('')
+  // Signed QR payload behind the scanned code; sent to /checkin in place of the bare code
+  const [signed, setSigned] = useState('')
   const [message, setMessage] = useState('')
   const [loading, setLoading] = useState(false)
   const [events, setEvents] = useState<any[]>([])
@@ -89,11 +91,15 @@ export default function CheckinPage() {
   }, [attendees, code])
   const alreadyChecked = !!(person && person.checked_in_at)
 
+  useEffect(() => {
+    if (signed && code !== signed.split('.')[3]) setSigned('')
+  }, [code, signed])
+
   async function confirmCheckin() {
     if (!eventId || code.length !== 3 || !valid) return
     setChecking(true); setMessage('')
     try {
-      const res = await api.checkin(Number(eventId), code)
+      const res = await api.checkin(Number(eventId), signed || code)
       // Show success state on the button briefly, then clear for next code
       setJustChecked(true)
       setTimeout(() => {
@@ -137,6 +143,13 @@ export default function CheckinPage() {
         const barcodes = await detector.detect(videoRef.current)
         if (barcodes && barcodes.length > 0) {
           const raw = String(barcodes[0].rawValue || '')
+          // Signed payload: T1.<event>.<ticket>.<code>.<type>.<signature>
+          if (raw.startsWith('T1.') && raw.split('.').length === 6) {
+            setSigned(raw)
+            setCode(raw.split('.')[3].toUpperCase())
+            closeScanner()
+            return
+          }
           // Accept either token URL or short code
           const m = raw.match(/code=([A-Z0-9]{3})/i)
           const c = m ? m[1] : raw.trim()
@@ -1,6 +1,6 @@
 import { useEffect, useState, useMemo } from 'react'
 import { useLocation } from 'react-router-dom'
-import { api } from '@/lib/api/client'
+import { api, streamEvents } from '@/lib/api/client'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Input } from '@/components/ui/input'
 import { Button } from '@/components/ui/button'
@@ -41,19 +41,30 @@ export default function PublicEventPage() {
     (async () => {
       try {
         if (!publicId) { setErr('Missing event id'); return }
-        const e = await api.resolveEvent(publicId)
-        setId(e.id)
-        const [p, t] = await Promise.all([
-          api.getEventPromotion(e.id).catch(()=>({})),
-          api.listTicketTypes(e.id).catch(()=>[]),
-        ])
-        setEv(e); setPromo(p); setTypes(t)
+        // One request: event, active ticket types with remaining counts, and promotion
+        const page: any = await api.getPublicEventPage(publicId)
+        setId(page.event.id)
+        setEv(page.event); setPromo(page.promotion || {}); setTypes(page.ticket_types || [])
       } catch (e:any) {
         setErr(e.message || 'Failed to load')
       }
     })()
   }, [publicId])
 
+  // Live remaining counts while the page is open
+  useEffect(() => {
+    if (!id) return
+    return streamEvents(`/events/${id}/availability/stream`, (_event, data) => {
+      const remaining = new Map<number, number | null>((data.ticket_types || []).map((t: any) => [t.id, t.remaining]))
+      setTypes(prev => prev.map((t: any) => remaining.has(t.id) ? { ...t, remaining: remaining.get(t.id) } : t))
+      setQty(prev => {
+        const next = { ...prev }
+        for (const [tid, n] of remaining) if (n != null && (next[tid] || 0) > n) next[tid] = n
+        return next
+      })
+    })
+  }, [id])
+
   const totalSelected = useMemo(() => Object.values(qty).reduce((a,b)=> a + (b||0), 0), [qty])
   function startPurchase() {
     const items = Object.entries(qty).filter(([_, n]) => (n||0) > 0).map(([k,n])=> ({ ticket_type_id: Number(k), qty: Number(n) }))
@@ -116,10 +127,14 @@ export default function PublicEventPage() {
             <div className="grid gap-2">
               {types.filter((t:any)=>t.active).map((t:any) => {
                 const v = qty[t.id] || 0
-                const setVal = (n: number) => setQty(prev => ({ ...prev, [t.id]: Math.max(0, Math.min(999, n)) }))
+                const max = t.remaining != null ? Math.min(999, t.remaining) : 999
+                const setVal = (n: number) => setQty(prev => ({ ...prev, [t.id]: Math.max(0, Math.min(max, n)) }))
                 return (
                   <div key={t.id} className={`flex items-center justify-between border rounded p-2 ${v>0 ? 'bg-secondary/40' : ''}`}>
-                    <div className="text-sm">{t.name} {t.price_baht != null ? `— ${t.price_baht} THB` : ''}</div>
+                    <div className="text-sm">
+                      {t.name} {t.price_baht != null ? `— ${t.price_baht} THB` : ''}
+                      {t.remaining === 0 && <span className="ml-2 text-muted-foreground">Sold out</span>}
+                    </div>
                     <div className="flex items-center gap-2">
                       <Button size="icon" variant="outline" onClick={()=> setVal((v||0) - 1)} aria-label="Decrease">-</Button>
                       <Button size="icon" variant="outline" onClick={()=> setVal((v||0) + 1)} aria-label="Increase">+</Button>
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from 'react'
-import { api } from '../lib/api/client'
+import { api, streamEvents } from '../lib/api/client'
 import { PageHeader, Stat } from '@/components/kit'
 import { Card, CardContent } from '@/components/ui/card'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
@@ -12,6 +12,7 @@ export default function ReportsPage() {
   const [events, setEvents] = useState<any[]>([])
   const [loadingEvents, setLoadingEvents] = useState(false)
   const [scope, setScope] = useState<'active' | 'all'>('active')
+  const [live, setLive] = useState<any>(null)
 
   useEffect(() => {
     (async () => {
@@ -36,6 +37,19 @@ export default function ReportsPage() {
     })()
   }, [])
 
+  // Live check-in totals for the loaded event (one push per second at most)
+  const liveEventId = summary?.event?.id
+  useEffect(() => {
+    setLive(null)
+    if (!liveEventId) return
+    return streamEvents(`/reports/checkins/stream?event_id=${liveEventId}`, (event, data) => {
+      setLive((prev: any) => ({
+        totals: data.totals,
+        arrivals: event === 'checkins' ? data.arrivals : (prev?.arrivals ?? 0),
+      }))
+    })
+  }, [liveEventId])
+
   const filtered = useMemo(() => {
     if (scope === 'all') return events
     const now = new Date()
@@ -82,13 +96,13 @@ export default function ReportsPage() {
       </div>
       {error && <p className="text-sm text-destructive">{error}</p>}
       {summary && (
-        <ReportSummary summary={summary} />
+        <ReportSummary summary={summary} live={live} />
       )}
     </section>
   )
 }
 
-function ReportSummary({ summary }: { summary: any }) {
+function ReportSummary({ summary, live }: { summary: any; live: any }) {
   const ev = summary.event || {}
   const starts = ev.starts_at ? new Date(ev.starts_at) : null
   const ends = ev.ends_at ? new Date(ev.ends_at) : null
@@ -98,7 +112,8 @@ function ReportSummary({ summary }: { summary: any }) {
   const endDelta = ends ? (ends > now ? `Ends in ${formatDistance(now, ends)}` : `Ended ${formatDistance(ends, now)} ago`) : '—'
 
   const registered = summary.registered ?? ((summary.assigned||0) + (summary.delivered||0) + (summary.checked_in||0))
-  const attended = summary.checked_in || 0
+  const attended = live?.totals?.checked_in ?? (summary.checked_in || 0)
+  const gates = Object.entries(live?.totals?.by_gate || {}) as [string, number][]
   const rate = registered > 0 ? `${Math.round((attended/registered)*100)}%` : '0%'
   const revenue = typeof summary.revenue_baht === 'number' ? summary.revenue_baht : 0
 
@@ -113,6 +128,8 @@ function ReportSummary({ summary }: { summary: any }) {
           <Stat label="Attended" value={String(attended)} />
           <Stat label="Attendance rate" value={rate} />
           <Stat label="Revenue (THB)" value={String(revenue)} />
+          {live && <Stat label="Arrivals (last second)" value={String(live.arrivals)} />}
+          {gates.map(([gate, n]) => <Stat key={gate} label={`Gate ${gate}`} value={String(n)} />)}
         </div>
       </CardContent>
     </Card>
@@ -25,7 +25,8 @@ export default function TicketViewPage() {
   }, [code, token])
 
   const qrUrl = useMemo(() => {
-    const c = data?.ticket?.code
+    // `qr` is the signed payload when the server signs QRs, otherwise the code
+    const c = data?.ticket?.qr || data?.ticket?.code
     return c ? api.qrUrl(String(c), 6) : null
   }, [data])
 